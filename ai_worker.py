@@ -0,0 +1,198 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from constants import *
+
+# AIの手が決まった時にワーカーから投げられるイベント
+AI_MOVE_EVENT = pygame.USEREVENT + 1
+
+class AIWorker:
+    """AIの手をフレームループとは別スレッドで計算するワーカー
+
+    盤面のスナップショットに対して ai_qlearning_move を実行し（Q値の更新もワーカー側で行う）、
+    結果を AI_MOVE_EVENT としてイベントキューに投げる。描画側はその間もアニメーションを続けられる。
+    think_time_ms > 0 の場合は持ち時間つきの反復深化で手を決め、その手でQ値を更新する。
+    人間の手番の間は ponder() で人間の手ごとのAIの応手を先読みしておき、当たればすぐに打つ。
+    定跡ファイル（opening_book.obk）があれば、探索やQ値より先に定跡を引く。
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-worker")
+        self.future = None
+        # 依頼ごとに増える世代番号（リセット等で古くなった結果を捨てるため）
+        self.generation = 0
+        self.pending_game = None
+        self.request_start_time = 0
+        # 反復深化の探索器（置換表を手をまたいで使い回すので最初の探索時に作って保持する）
+        self.searcher = None
+        # 定跡（最初の思考時にファイルがあれば開く。False は未確認）
+        self.book = False
+        # 先読み（人間の手番中の探索）の世代番号・対象の局面・結果（人間が打った後の盤面のキー -> (手, 深さ)）
+        self.ponder_generation = 0
+        self.ponder_key = None
+        self.ponder_cache = {}
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    def is_thinking(self):
+        """AIが思考中かどうか"""
+        return self.future is not None and not self.future.done()
+
+    def has_pending(self, game):
+        """指定のゲームに対する依頼が未処理かどうか（結果イベント待ちも含む）"""
+        return self.pending_game is game
+
+    def get_elapsed_ms(self):
+        """現在の依頼を出してからの経過時間（ミリ秒）"""
+        if self.pending_game is None:
+            return 0
+        return int((time.perf_counter() - self.request_start_time) * 1000)
+
+    def request_move(self, game, qtable, player=PLAYER_WHITE, ai_learn_count=0, think_time_ms=0):
+        """盤面のスナップショットからAIの手を非同期に計算する（以前の依頼の結果は破棄される）
+
+        qtable が None（読み込み中）の場合は学習せずにランダムに打つ。
+        think_time_ms > 0 なら、その時間内で反復深化の探索を行って手を決める（0 なら探索しない）。
+        """
+        self.generation += 1
+        self.pending_game = game
+        self.request_start_time = time.perf_counter()
+        snapshot = game.snapshot()
+        # 先読みが当たっていればその手を使い、外れていれば先読みを打ち切る
+        pondered = None
+        if qtable is not None and think_time_ms > 0 and self.ponder_key is not None:
+            pondered = self.ponder_cache.get(snapshot.get_board_state_key())
+            if pondered is not None:
+                self.ponder_hits += 1
+            else:
+                self.ponder_misses += 1
+        self.stop_pondering()
+        self.future = self.executor.submit(self._think, self.generation, snapshot, qtable, player, ai_learn_count,
+                                           think_time_ms, pondered)
+
+    def ponder(self, game, qtable, ai_player=PLAYER_WHITE, think_time_ms=0):
+        """人間の手番の間に、人間の各手に対するAIの応手を先読みする（同じ局面では1回だけ）
+
+        探索を使う設定（think_time_ms > 0 で qtable が読み込み済み）の時だけ行う。
+        人間の手は打たれそうな順（Q値・位置の重みの大きい順）に読む。
+        """
+        if qtable is None or think_time_ms <= 0:
+            return
+        state_key = game.get_board_state_key()
+        if self.ponder_key == state_key:
+            return
+        self.stop_pondering()
+        self.ponder_key = state_key
+        self.ponder_cache = {}
+        self.executor.submit(self._ponder, self.ponder_generation, game.snapshot(), qtable, ai_player, think_time_ms)
+
+    def stop_pondering(self):
+        """先読みを打ち切る（先読みの結果も捨てる）"""
+        self.ponder_generation += 1
+        self.ponder_key = None
+        if self.searcher is not None:
+            self.searcher.stop()
+
+    def _ponder(self, generation, snapshot, qtable, ai_player, think_time_ms):
+        """ワーカースレッドで実行される先読み処理"""
+        human = PLAYER_BLACK if ai_player == PLAYER_WHITE else PLAYER_WHITE
+        try:
+            searcher = self._get_searcher(qtable)
+            # ここより後の stop_pondering() は世代番号か stop() の印で必ず効く（印は先読みの途中では消さない）
+            searcher.clear_stop()
+            for r, c in searcher.order_moves(snapshot, snapshot.get_valid_moves(human)):
+                if generation != self.ponder_generation:
+                    return
+                flipped = snapshot.apply_move(r, c, human)
+                if snapshot.get_valid_moves(ai_player):
+                    move, _, depth = searcher.iterative_deepening(snapshot, ai_player, think_time_ms)
+                    # 途中で打ち切られた探索は浅いので保存しない
+                    if generation == self.ponder_generation:
+                        self.ponder_cache[snapshot.get_board_state_key()] = (move, depth)
+                snapshot.undo_move(r, c, human, flipped)
+        except Exception as e:
+            print(f"AI先読みエラー: {e}")
+
+    def _get_searcher(self, qtable):
+        if self.searcher is None:
+            from endgame import EndgameSolver
+            from search import AlphaBetaSearch
+            from transposition import TranspositionTable
+            self.searcher = AlphaBetaSearch(tt=TranspositionTable(), endgame=EndgameSolver())
+        # Qテーブルは再読み込み等で入れ替わるので毎回渡し直す
+        self.searcher.qtable = qtable
+        self.searcher.evaluator.qtable = qtable
+        return self.searcher
+
+    def _book_move(self, snapshot, player):
+        """定跡に手があれば返す（定跡ファイルが無ければ None）"""
+        if self.book is False:
+            from opening_book import load_opening_book
+            self.book = load_opening_book()
+        if self.book is None:
+            return None
+        return self.book.probe_move(snapshot, player)
+
+    def _search_move(self, snapshot, qtable, player, think_time_ms):
+        """持ち時間つきの反復深化で手を決め、(手, 読み終えた深さ) を返す"""
+        searcher = self._get_searcher(qtable)
+        searcher.clear_stop()  # 先読みを打ち切った印を残したまま読まないように
+        move, _, depth = searcher.iterative_deepening(snapshot, player, think_time_ms)
+        return move, depth
+
+    def _think(self, generation, snapshot, qtable, player, ai_learn_count, think_time_ms=0, pondered=None):
+        """ワーカースレッドで実行される思考処理（pondered は先読みで決めた (手, 深さ)）"""
+        depth = 0
+        book_move = None
+        try:
+            if qtable is not None:
+                book_move = self._book_move(snapshot, player)
+            if qtable is None:
+                moved = snapshot.ai_random_move(player)
+            elif book_move is not None:
+                moved = snapshot.ai_qlearning_move(qtable, learn=True, player=player, ai_learn_count=ai_learn_count, action=book_move)
+            elif think_time_ms > 0:
+                if pondered is not None:
+                    move, depth = pondered
+                else:
+                    move, depth = self._search_move(snapshot, qtable, player, think_time_ms)
+                moved = snapshot.ai_qlearning_move(qtable, learn=True, player=player, ai_learn_count=ai_learn_count, action=move)
+            else:
+                moved = snapshot.ai_qlearning_move(qtable, learn=True, player=player, ai_learn_count=ai_learn_count)
+        except Exception as e:
+            print(f"AI思考エラー: {e}")
+            moved = False
+            snapshot.last_ai_move = None
+            snapshot.ai_last_reward = 0
+            snapshot.message = "AIの思考中にエラーが発生しました。"
+        pygame.event.post(pygame.event.Event(AI_MOVE_EVENT, {
+            "generation": generation,
+            "player": player,
+            "moved": moved,
+            "learned": qtable is not None,
+            "move": snapshot.last_ai_move,
+            "reward": snapshot.ai_last_reward,
+            "message": snapshot.message,
+            "depth": depth,
+            "pondered": pondered is not None,
+            "book": book_move is not None,
+        }))
+
+    def accept_result(self, event, game):
+        """AI_MOVE_EVENT が現在のゲームへの最新の結果なら受け取る（古い結果は None）"""
+        if event.generation != self.generation or self.pending_game is not game:
+            return None
+        self.pending_game = None
+        return event
+
+    def cancel(self):
+        """現在の依頼と先読みを無効にする（ゲームのリセット時など）"""
+        self.generation += 1
+        self.pending_game = None
+        self.stop_pondering()
+
+    def shutdown(self):
+        """ワーカースレッドを終了する"""
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""モジュールごとの起動（インポート）時間を python -X importtime で計測し、予算を超えていないか確認する
+
+使い方:
+    python bench_import_time.py            # 全モジュールを計測して予算と比較
+    python bench_import_time.py --repeat 5 # 5回計測して最小値で比較
+終了コードは予算超過や禁止モジュールの読み込みがあれば 1。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# モジュール名 -> (予算ミリ秒, 読み込まれてはいけないモジュール)
+# ゲームロジック・AI側はpygame(SDL)を、画面側はmatplotlibを読み込まないこと
+IMPORT_BUDGETS = {
+    "constants": (30, ("pygame", "matplotlib")),
+    "game_logic": (60, ("pygame", "matplotlib")),
+    "ai_learning": (60, ("pygame", "matplotlib")),
+    "ai_worker": (400, ("matplotlib",)),
+    "learning_dialogs": (400, ("matplotlib",)),
+    "ui_components": (500, ("matplotlib",)),
+    "settings": (500, ("matplotlib",)),
+    "main": (800, ("matplotlib",)),
+}
+
+def measure_import(module_name):
+    """新しいプロセスでモジュールをインポートし、(累積ミリ秒, 読み込まれたモジュール名の集合) を返す"""
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module_name} のインポートに失敗しました:\n{result.stderr[-2000:]}")
+
+    total_us = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # 見出し行
+        name = parts[2].strip()
+        loaded.add(name.split(".")[0])
+        if name == module_name:
+            total_us = int(parts[1])
+    if total_us is None:
+        raise RuntimeError(f"{module_name} の計測結果が見つかりません")
+    return total_us / 1000, loaded
+
+def run_benchmark(modules, repeat=3):
+    """各モジュールを repeat 回計測し、予算を超えたものの一覧を返す"""
+    failures = []
+    print(f"{'モジュール':<16}{'最小(ms)':>10}{'予算(ms)':>10}  判定")
+    for module_name in modules:
+        budget_ms, forbidden = IMPORT_BUDGETS[module_name]
+        times = []
+        loaded = set()
+        for _ in range(repeat):
+            elapsed_ms, loaded = measure_import(module_name)
+            times.append(elapsed_ms)
+        best_ms = min(times)
+        problems = []
+        if best_ms > budget_ms:
+            problems.append("予算超過")
+        bad_modules = sorted(set(forbidden) & loaded)
+        if bad_modules:
+            problems.append("禁止モジュール: " + ", ".join(bad_modules))
+        status = "NG (" + " / ".join(problems) + ")" if problems else "OK"
+        print(f"{module_name:<16}{best_ms:>10.1f}{budget_ms:>10}  {status}")
+        if problems:
+            failures.append(module_name)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="モジュールのインポート時間の予算チェック")
+    parser.add_argument("modules", nargs="*", help="計測するモジュール（省略時は全て）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最小値で判定）")
+    args = parser.parse_args()
+
+    modules = args.modules or list(IMPORT_BUDGETS)
+    unknown = [m for m in modules if m not in IMPORT_BUDGETS]
+    if unknown:
+        parser.error(f"予算が未定義のモジュール: {', '.join(unknown)}")
+
+    failures = run_benchmark(modules, max(1, args.repeat))
+    if failures:
+        print(f"予算を満たしていないモジュール: {', '.join(failures)}")
+        sys.exit(1)
+    print("全てのモジュールが予算内です。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""自己対戦学習のスループット計測（固定シード）
+
+画面なし（headless_trainer、dict と SQLiteQTable）と、pygameの事前学習（main.run_pretrain_mode、描画モードON/OFF）の
+それぞれについて、局/秒・手/秒・Q値更新/秒・最大メモリ使用量・1000局あたりのQテーブルの増加を測り、JSONに書く。
+計測は空のQテーブルから始め、1つずつ一時ディレクトリの別プロセスで行う（qtable.pkl などは書き換えない）。
+
+使い方:
+    python bench_selfplay.py                                  # 計測して bench_selfplay.json に書く
+    python bench_selfplay.py --path headless --games 500  # 画面なしだけ500局
+    python bench_selfplay.py --save-baseline                  # 計測結果を基準（bench_selfplay_baseline.json）にする
+    python bench_selfplay.py --compare bench_selfplay_baseline.json --threshold 0.1
+終了コードは基準より threshold 以上悪化した項目があれば 1。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_OUTPUT = "bench_selfplay.json"
+DEFAULT_BASELINE = "bench_selfplay_baseline.json"
+DEFAULT_THRESHOLD = 0.10
+
+# 計測する経路 -> 既定の対局数（描画モードONは1手ごとに30FPSで描くので少なくする）
+BENCH_PATHS = {
+    "headless": 200,
+    "headless_sqlite": 200,
+    "pygame_draw_off": 50,
+    "pygame_draw_on": 2,
+}
+
+# 指標 -> 大きい方が良いなら True（小さい方が良いなら False、None は比較せず変化だけ表示）
+METRICS = {
+    "games_per_sec": True,
+    "plies_per_sec": True,
+    "q_updates_per_sec": True,
+    "peak_rss_mb": False,
+    "qtable_growth_per_1000_games": None,
+}
+
+def _peak_rss_mb():
+    """このプロセスの最大常駐メモリ（MB、取れない環境では None）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux はKB、macOS はバイト
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _make_result(games, plies, q_updates, elapsed, qtable_size):
+    return {
+        "games": games,
+        "plies": plies,
+        "q_updates": q_updates,
+        "elapsed": elapsed,
+        "games_per_sec": games / elapsed if elapsed > 0 else 0.0,
+        "plies_per_sec": plies / elapsed if elapsed > 0 else 0.0,
+        "q_updates_per_sec": q_updates / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "qtable_growth_per_1000_games": qtable_size / games * 1000 if games else 0.0,
+    }
+
+def measure_headless(games, seed, sqlite=False):
+    """headless_trainer で games 局対戦して計測する（sqlite=True なら SQLiteQTable で、最後の書き込みまで含める）"""
+    from headless_trainer import SelfPlayTrainer
+    random.seed(seed)
+    if sqlite:
+        from qtable_sqlite import SQLiteQTable
+        qtable = SQLiteQTable("bench_qtable.db")
+    else:
+        qtable = {}
+    trainer = SelfPlayTrainer(qtable)
+    start_time = time.perf_counter()
+    trainer.run(games)
+    if sqlite:
+        qtable.flush()
+    elapsed = time.perf_counter() - start_time
+    return _make_result(trainer.games, trainer.plies, trainer.ai_learn_count, elapsed, len(trainer.qtable))
+
+def measure_pygame(games, seed, draw_mode):
+    """main.run_pretrain_mode で games 局対戦して計測する（開始・終了画面の待ち時間は除く）"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    import main
+
+    waited = [0.0]
+    real_wait = pygame.time.wait
+
+    def timed_wait(ms):
+        start = time.perf_counter()
+        result = real_wait(ms)
+        waited[0] += time.perf_counter() - start
+        return result
+
+    pygame.time.wait = timed_wait
+    main.wait_for_qtable(main.screen)
+    main.pretrain_total = games
+    main.draw_mode = draw_mode
+    main.fast_mode = True
+    random.seed(seed)
+    start_time = time.perf_counter()
+    main.run_pretrain_mode(main.screen, main.font)
+    elapsed = time.perf_counter() - start_time - waited[0]
+    # 自己対戦では全ての手でQ値を更新するので、手数は学習回数と同じ
+    result = _make_result(main.pretrain_now, main.ai_learn_count, main.ai_learn_count, elapsed, len(main.qtable))
+    main.ai_worker.shutdown()
+    return result
+
+def _run_child(path, games, seed):
+    """別プロセスで1つの経路を計測して結果の辞書を返す"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = repo_dir + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run(
+            [sys.executable, os.path.join(repo_dir, "bench_selfplay.py"), "--child", path,
+             "--games", str(games), "--seed", str(seed)],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"{path} の計測に失敗しました:\n{result.stderr[-2000:]}")
+    # 子プロセスは最後の行に結果のJSONを書く
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(paths, games_override=None, seed=1):
+    """各経路を計測し、JSONに書く内容を返す"""
+    results = {}
+    for path in paths:
+        games = games_override or BENCH_PATHS[path]
+        print(f"{path}: {games}局を計測中...", flush=True)
+        results[path] = _run_child(path, games, seed)
+        r = results[path]
+        rss = f"{r['peak_rss_mb']:.1f}MB" if r["peak_rss_mb"] is not None else "不明"
+        print(f"  {r['games_per_sec']:.2f}局/秒 {r['plies_per_sec']:.0f}手/秒 {r['q_updates_per_sec']:.0f}更新/秒 "
+              f"最大メモリ={rss} Qテーブル増加={r['qtable_growth_per_1000_games']:.0f}/1000局")
+    return {
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """基準と比べて threshold を超えて悪化した (経路, 指標) の一覧を返す"""
+    regressions = []
+    for path, result in current["results"].items():
+        base = baseline.get("results", {}).get(path)
+        if base is None:
+            print(f"{path}: 基準に無いので比較しません")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            value, base_value = result.get(metric), base.get(metric)
+            if value is None or not base_value:
+                continue
+            change = (value - base_value) / base_value
+            if higher_is_better is None:
+                status = "変化あり" if abs(change) > threshold else "OK"
+            elif (change < -threshold) if higher_is_better else (change > threshold):
+                status = "悪化"
+                regressions.append((path, metric))
+            else:
+                status = "OK"
+            print(f"{path:<16} {metric:<30} 基準={base_value:12.2f} 今回={value:12.2f} ({change * 100:+6.1f}%) {status}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="自己対戦学習のスループット計測")
+    parser.add_argument("--path", choices=list(BENCH_PATHS), action="append", help="計測する経路（省略時は全て、複数指定可）")
+    parser.add_argument("--games", type=int, default=None, help="対局数（省略時は経路ごとの既定値）")
+    parser.add_argument("--seed", type=int, default=1, help="乱数のシード")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="結果を書くJSONファイル")
+    parser.add_argument("--save-baseline", action="store_true", help=f"結果を基準として {DEFAULT_BASELINE} にも書く")
+    parser.add_argument("--compare", metavar="BASELINE", help="基準のJSONファイルと比較する")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="悪化とみなす変化の割合")
+    parser.add_argument("--child", choices=list(BENCH_PATHS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if args.child in ("headless", "headless_sqlite"):
+            result = measure_headless(args.games, args.seed, sqlite=args.child == "headless_sqlite")
+        else:
+            result = measure_pygame(args.games, args.seed, draw_mode=args.child == "pygame_draw_on")
+        print(json.dumps(result))
+        return
+
+    current = run_benchmark(args.path or list(BENCH_PATHS), args.games, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"結果を {args.output} に書きました")
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"基準を {DEFAULT_BASELINE} に書きました")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print("悪化した項目: " + ", ".join(f"{path}.{metric}" for path, metric in regressions))
+            sys.exit(1)
+        print("基準から悪化した項目はありません。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ビットボード（64bit整数）による盤面の表現と合法手・裏返る石の計算
+
+マス (行, 列) はビット 行*8+列 に対応する。盤面は手番側の石 P と相手の石 O の2つの整数で表す。
+OthelloGame の二次元リストより速く、終盤の読み切りなど大量の局面を扱う処理で使う。
+"""
+
+from constants import *
+
+FULL_MASK = (1 << 64) - 1
+# 左右の端をまたいだシフトを防ぐマスク（A列・H列を除く）
+_NOT_EDGE_COLUMNS = 0x7E7E7E7E7E7E7E7E
+
+# 8方向の (行の増分, 列の増分)
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def _build_rays():
+    """RAYS[マス番号] = そのマスから各方向に伸びる半直線のビットの並び（長さ2未満の方向は除く）"""
+    rays = []
+    for sq in range(64):
+        r, c = divmod(sq, BOARD_SIZE)
+        sq_rays = []
+        for dr, dc in DIRECTIONS:
+            ray = []
+            nr, nc = r + dr, c + dc
+            while 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE:
+                ray.append(1 << (nr * BOARD_SIZE + nc))
+                nr += dr
+                nc += dc
+            if len(ray) >= 2:
+                sq_rays.append(tuple(ray))
+        rays.append(tuple(sq_rays))
+    return tuple(rays)
+
+RAYS = _build_rays()
+
+def popcount(x):
+    """立っているビットの数（Python 3.9 でも動くように bin を使う）"""
+    return bin(x).count("1")
+
+def board_to_bitboards(board, player):
+    """OthelloGame.board から (手番側の石, 相手の石) のビットボードを作る"""
+    p = o = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == player:
+                p |= bit
+            elif cell:
+                o |= bit
+            bit <<= 1
+    return p, o
+
+def square_to_move(sq):
+    """マス番号を (行, 列) に変換"""
+    return divmod(sq, BOARD_SIZE)
+
+def move_to_square(row, col):
+    """(行, 列) をマス番号に変換"""
+    return row * BOARD_SIZE + col
+
+def get_moves(p, o):
+    """手番側 p の合法手のビットボード"""
+    empty = ~(p | o) & FULL_MASK
+    moves = 0
+    # 横方向・斜め方向は端をまたがないように相手の石をマスクする
+    for shift, mask in ((1, o & _NOT_EDGE_COLUMNS), (8, o), (7, o & _NOT_EDGE_COLUMNS), (9, o & _NOT_EDGE_COLUMNS)):
+        t = mask & (p << shift)
+        t |= mask & (t << shift)
+        t |= mask & (t << shift)
+        t |= mask & (t << shift)
+        t |= mask & (t << shift)
+        t |= mask & (t << shift)
+        moves |= t << shift
+        t = mask & (p >> shift)
+        t |= mask & (t >> shift)
+        t |= mask & (t >> shift)
+        t |= mask & (t >> shift)
+        t |= mask & (t >> shift)
+        t |= mask & (t >> shift)
+        moves |= t >> shift
+    return moves & empty
+
+def get_flips(p, o, sq):
+    """手番側 p がマス sq に打った時に裏返る石のビットボード（合法でなければ 0）"""
+    flips = 0
+    for ray in RAYS[sq]:
+        f = 0
+        for bit in ray:
+            if o & bit:
+                f |= bit
+            elif p & bit:
+                flips |= f
+                break
+            else:
+                break
+    return flips
+
+def iter_squares(bits):
+    """ビットボードの立っているビットのマス番号を小さい順に返す"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
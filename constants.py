@@ -1,5 +1,5 @@
-import pygame
 import os
+from functools import lru_cache
 
 # ゲーム定数
 BOARD_SIZE = 8
@@ -49,6 +49,8 @@ REWARD_PASS_FORCE = 5       # 相手のパスを強制した場合のボーナ
 
 # Q学習用定数（自己対戦最適化）
 QTABLE_PATH = "qtable.pkl"  # Qテーブル保存ファイル名
+OPENING_BOOK_PATH = "opening_book.obk"  # 定跡ファイル名（opening_book.py で作る）
+GAME_RECORDS_PATH = "game_records.bin"  # 対局記録のログ（索引は game_records.idx）
 ALPHA = 0.12                # 学習率（0.15→0.12に調整、より安定した学習）
 GAMMA = 0.98                # 割引率（0.95→0.98に増加、より長期的視点）
 EPSILON = 0.1               # ε-greedy法のランダム行動確率
@@ -69,11 +71,25 @@ MODE_HUMAN_TRAIN = 0  # 人間vsAIで学習
 MODE_AI_PRETRAIN = 1  # AI同士で訓練→人間vsAI
 
 # Pygame初期化・フォント・画面サイズ
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("オセロゲーム")
+# ゲームロジックやAIだけを使う場合（テスト・バッチ学習・ワーカープロセス）にSDLを読み込まないよう、
+# ウィンドウは init_display() を呼んだ時に初めて作成する
+screen = None
 
+def init_display():
+    """pygameを初期化してウィンドウを作成し、画面を返す（2回目以降は作成済みの画面を返す）"""
+    global screen
+    import pygame
+    if screen is None:
+        pygame.init()
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("オセロゲーム")
+    return screen
+
+@lru_cache(maxsize=None)
 def get_japanese_font(size):
+    import pygame
+    if not pygame.font.get_init():
+        pygame.font.init()
     font_path = os.path.join(os.path.dirname(__file__), "NotoSansCJKjp-Regular.otf")
     if os.path.exists(font_path):
         return pygame.font.Font(font_path, size)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""終盤の完全読み（空きマスが少ない局面を最後まで読み切って最善手と石差を求める）
+
+終盤はQテーブルにほとんど値が無いので、空きマスが閾値以下になったらこのソルバーで読み切る。
+ビットボード・偶数理論（奇数個の空きがある領域を優先）・速さ優先（相手の合法手が少ない順）の
+手の並べ替えと、ソルバー専用の小さなハッシュ表を使う。
+
+使い方（読み切りの速度計測）:
+    python endgame.py --empties 14 --positions 5
+"""
+
+import argparse
+import random
+import time
+
+from constants import *
+from bitboard import (
+    FULL_MASK, board_to_bitboards, get_moves, get_flips, popcount, iter_squares,
+    square_to_move, move_to_square
+)
+
+# この空きマス数以下になったら読み切る（純粋なPythonなので、持ち時間に収まる程度にしている）
+DEFAULT_ENDGAME_EMPTIES = 12
+# この空きマス数より多い時は速さ優先、以下では偶数理論だけで手を並べる
+FASTEST_FIRST_MIN_EMPTIES = 7
+# この空きマス数以上の局面だけハッシュ表に保存する（浅い局面は読み直した方が速い）
+HASH_MIN_EMPTIES = 7
+# ハッシュ表のエントリ数の上限（超えたら消去する）
+DEFAULT_HASH_ENTRIES = 1 << 18
+# この空きマス数以下では合法手の一覧を作らずに空きマスを直接試す
+SHALLOW_EMPTIES = 6
+# 持ち時間を確認するノード間隔
+DEADLINE_CHECK_INTERVAL = 1024
+
+def _build_quadrant_ids():
+    """各マスが属する4x4の領域の番号（偶数理論で使う）"""
+    ids = []
+    for sq in range(64):
+        r, c = square_to_move(sq)
+        ids.append(1 << ((r // 4) * 2 + c // 4))
+    return tuple(ids)
+
+# QUADRANT_BITS[マス番号] = 領域を表すビット。空きの偶奇を領域ごとに1ビットで持ち、打つたびにXORする
+QUADRANT_BITS = _build_quadrant_ids()
+# 角は速さ優先の並べ替えでも優先する
+_CORNER_SQUARES = frozenset(move_to_square(r, c) for r, c in [(0, 0), (0, 7), (7, 0), (7, 7)])
+
+class EndgameTimeout(Exception):
+    """読み切りの途中で持ち時間を使い切った"""
+
+class EndgameSolver:
+    """終盤の完全読みソルバー
+
+    評価値は手番側から見た最終的な石差（get_score と同じく石の数の差で、空きマスは数えない）。
+    """
+    def __init__(self, empties_threshold=DEFAULT_ENDGAME_EMPTIES, hash_entries=DEFAULT_HASH_ENTRIES):
+        self.empties_threshold = empties_threshold
+        self.hash_entries = hash_entries
+        # (手番側の石, 相手の石) -> (下限, 上限, 最善手のマス番号)
+        self.table = {}
+        self.deadline = None
+        # 別スレッドからの打ち切り（AlphaBetaSearch.stop() が立て、clear_stop() まで残る）
+        self.stopped = False
+        self.nodes = 0
+        self.elapsed = 0.0
+
+    def should_solve(self, game):
+        """空きマス数が閾値以下なら True"""
+        return count_empties(game.board) <= self.empties_threshold
+
+    def clear(self):
+        """ハッシュ表を消去"""
+        self.table.clear()
+
+    def solve(self, board, player, deadline=None):
+        """(最善手, 石差) を返す（打てる手が無ければ手は None）
+
+        deadline（time.perf_counter() の値）を過ぎたら EndgameTimeout を投げる。
+        """
+        p, o = board_to_bitboards(board, player)
+        self.deadline = deadline
+        self.nodes = 0
+        start_time = time.perf_counter()
+        try:
+            sq, score = self._solve_root(p, o)
+        finally:
+            self.deadline = None
+            self.elapsed = time.perf_counter() - start_time
+        return (square_to_move(sq) if sq is not None else None), score
+
+    def solve_moves(self, board, player, deadline=None):
+        """合法手ごとの正確な石差を {(行, 列): 石差} で返す（学習に正確な終局値を与えるため）"""
+        p, o = board_to_bitboards(board, player)
+        self.deadline = deadline
+        self.nodes = 0
+        start_time = time.perf_counter()
+        results = {}
+        try:
+            parity = _empty_parity(p, o)
+            empties = 64 - popcount(p | o)
+            for sq in iter_squares(get_moves(p, o)):
+                flips = get_flips(p, o, sq)
+                bit = 1 << sq
+                score = -self._solve(o ^ flips, p | bit | flips, -64, 64, empties - 1, parity ^ QUADRANT_BITS[sq], False)
+                results[square_to_move(sq)] = score
+        finally:
+            self.deadline = None
+            self.elapsed = time.perf_counter() - start_time
+        return results
+
+    def update_qtable(self, qtable, game, player, deadline=None):
+        """読み切った結果を勝ち・負け・引き分けの報酬としてQテーブルに書き込み、書き込んだ数を返す"""
+        state_key = game.get_board_state_key()
+        results = self.solve_moves(game.board, player, deadline)
+        for (r, c), score in results.items():
+            if score > 0:
+                value = REWARD_WIN
+            elif score < 0:
+                value = REWARD_LOSE
+            else:
+                value = REWARD_DRAW
+            qtable[f"{state_key}_{r}_{c}"] = value
+        return len(results)
+
+    def _solve_root(self, p, o):
+        empties = 64 - popcount(p | o)
+        parity = _empty_parity(p, o)
+        moves = get_moves(p, o)
+        if not moves:
+            return None, self._solve(p, o, -64, 64, empties, parity, False)
+        best_sq = None
+        best_score = -65
+        alpha = -64
+        for sq, flips in self._order_moves(p, o, moves, empties, parity, None):
+            bit = 1 << sq
+            score = -self._solve(o ^ flips, p | bit | flips, -64, -alpha, empties - 1, parity ^ QUADRANT_BITS[sq], False)
+            if score > best_score:
+                best_score = score
+                best_sq = sq
+            if score > alpha:
+                alpha = score
+        return best_sq, best_score
+
+    def _order_moves(self, p, o, moves, empties, parity, hash_sq):
+        """(マス番号, 裏返る石) を読む順に並べる"""
+        entries = []
+        if empties > FASTEST_FIRST_MIN_EMPTIES:
+            # 速さ優先: 打った後の相手の合法手が少ない手から（角とハッシュ表の最善手は先に）
+            for sq in iter_squares(moves):
+                flips = get_flips(p, o, sq)
+                bit = 1 << sq
+                mobility = popcount(get_moves(o ^ flips, p | bit | flips))
+                if sq == hash_sq:
+                    key = -100
+                else:
+                    key = mobility * 4 - (2 if sq in _CORNER_SQUARES else 0) - (1 if parity & QUADRANT_BITS[sq] else 0)
+                entries.append((key, sq, flips))
+        else:
+            # 偶数理論: 空きが奇数個の領域の手から
+            for sq in iter_squares(moves):
+                key = -1 if parity & QUADRANT_BITS[sq] else 0
+                if sq == hash_sq:
+                    key = -2
+                entries.append((key, sq, get_flips(p, o, sq)))
+        entries.sort()
+        return [(sq, flips) for _, sq, flips in entries]
+
+    def _solve(self, p, o, alpha, beta, empties, parity, passed):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % DEADLINE_CHECK_INTERVAL == 0 and (self.stopped or time.perf_counter() >= self.deadline):
+            raise EndgameTimeout()
+
+        if empties == 1:
+            return self._solve_last(p, o)
+        if empties <= SHALLOW_EMPTIES:
+            return self._solve_shallow(p, o, alpha, beta, empties, parity, passed)
+
+        moves = get_moves(p, o)
+        if not moves:
+            if passed or not get_moves(o, p):
+                return popcount(p) - popcount(o)
+            return -self._solve(o, p, -beta, -alpha, empties, parity, True)
+
+        # ハッシュ表の下限・上限で窓を狭める
+        use_hash = empties >= HASH_MIN_EMPTIES
+        hash_sq = None
+        lower, upper = -64, 64
+        if use_hash:
+            entry = self.table.get((p, o))
+            if entry is not None:
+                lower, upper, hash_sq = entry
+                if lower >= beta:
+                    return lower
+                if upper <= alpha:
+                    return upper
+                if lower == upper:
+                    return lower
+                if lower > alpha:
+                    alpha = lower
+                if upper < beta:
+                    beta = upper
+        alpha_orig = alpha
+
+        best_score = -65
+        best_sq = None
+        for sq, flips in self._order_moves(p, o, moves, empties, parity, hash_sq):
+            bit = 1 << sq
+            child_p, child_o, child_parity = o ^ flips, p | bit | flips, parity ^ QUADRANT_BITS[sq]
+            if best_sq is None:
+                score = -self._solve(child_p, child_o, -beta, -alpha, empties - 1, child_parity, False)
+            else:
+                # 2手目以降はαを超えるかだけを幅0の窓で調べ、超えた時だけ読み直す
+                score = -self._solve(child_p, child_o, -alpha - 1, -alpha, empties - 1, child_parity, False)
+                if alpha < score < beta:
+                    score = -self._solve(child_p, child_o, -beta, -score, empties - 1, child_parity, False)
+            if score > best_score:
+                best_score = score
+                best_sq = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break  # βカット
+
+        if use_hash:
+            if len(self.table) >= self.hash_entries:
+                self.table.clear()
+            # 窓の外に出た値は上限・下限として、前に分かっている範囲と合わせて保存する
+            if best_score <= alpha_orig:
+                upper = best_score
+            elif best_score >= beta:
+                lower = best_score
+            else:
+                lower = upper = best_score
+            self.table[(p, o)] = (lower, upper, best_sq)
+        return best_score
+
+    def _solve_shallow(self, p, o, alpha, beta, empties, parity, passed):
+        """空きが少ない局面: 合法手の一覧を作らず、空きマスを偶数理論の順に試す"""
+        empty = ~(p | o) & FULL_MASK
+        odd = []
+        even = []
+        for sq in iter_squares(empty):
+            (odd if parity & QUADRANT_BITS[sq] else even).append(sq)
+        best_score = -65
+        for sq in odd + even:
+            flips = get_flips(p, o, sq)
+            if not flips:
+                continue
+            child_p, child_o = o ^ flips, p | (1 << sq) | flips
+            if empties == 2:
+                score = -self._solve_last(child_p, child_o)
+                self.nodes += 1
+            else:
+                score = -self._solve(child_p, child_o, -beta, -alpha, empties - 1, parity ^ QUADRANT_BITS[sq], False)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break  # βカット
+        if best_score == -65:
+            # 打てる手が無い
+            if passed or not any(get_flips(o, p, sq) for sq in odd + even):
+                return popcount(p) - popcount(o)
+            return -self._solve(o, p, -beta, -alpha, empties, parity, True)
+        return best_score
+
+    def _solve_last(self, p, o):
+        """残り1マスの局面の石差（打てる側が打って終局）"""
+        empty = ~(p | o) & FULL_MASK
+        sq = empty.bit_length() - 1
+        flips = get_flips(p, o, sq)
+        if flips:
+            n = popcount(flips)
+            return popcount(p) - popcount(o) + 2 * n + 1
+        flips = get_flips(o, p, sq)
+        if flips:
+            n = popcount(flips)
+            return popcount(p) - popcount(o) - 2 * n - 1
+        return popcount(p) - popcount(o)
+
+def count_empties(board):
+    """空きマスの数"""
+    return sum(row.count(0) for row in board)
+
+def _empty_parity(p, o):
+    """領域ごとの空きの偶奇（奇数ならビットが立つ）"""
+    parity = 0
+    for sq in iter_squares(~(p | o) & FULL_MASK):
+        parity ^= QUADRANT_BITS[sq]
+    return parity
+
+def benchmark(empties=14, positions=5, seed=1, threshold=None):
+    """ランダムに進めた空きマス数 empties の局面を読み切り、ノード数と時間を表示する"""
+    from search import make_random_position
+    rng = random.Random(seed)
+    solver = EndgameSolver(threshold if threshold is not None else empties)
+    total_nodes = 0
+    total_time = 0.0
+    solved = 0
+    while solved < positions:
+        game, player = make_random_position(rng, 60 - empties)
+        if count_empties(game.board) != empties or not game.get_valid_moves(player):
+            continue  # 途中で終局・パスした局面は使わない
+        solver.clear()
+        move, score = solver.solve(game.board, player)
+        solved += 1
+        total_nodes += solver.nodes
+        total_time += solver.elapsed
+        move_text = f"{chr(ord('A') + move[1])}{move[0] + 1}" if move else "パス"
+        print(f"局面{solved:3d}: 最善手={move_text:>4} 石差={score:+3d} ノード数={solver.nodes:9d} "
+              f"時間={solver.elapsed:6.2f}秒 nps={solver.nodes / solver.elapsed if solver.elapsed > 0 else 0:9.0f}")
+    print(f"合計: ノード数={total_nodes} 時間={total_time:.2f}秒 平均={total_time / positions:.2f}秒/局面")
+    return solver
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="終盤の完全読みの速度計測")
+    parser.add_argument("--empties", type=int, default=14, help="読み切る局面の空きマス数")
+    parser.add_argument("--positions", type=int, default=5, help="計測する局面数")
+    parser.add_argument("--seed", type=int, default=1, help="局面を作る乱数のシード")
+    args = parser.parse_args()
+    benchmark(args.empties, args.positions, args.seed)
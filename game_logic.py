@@ -1,8 +1,13 @@
 import random
 import pickle
+from time import perf_counter_ns
 from typing import Optional
 from constants import *
-from ai_learning import LearningHistory, LearningLogger
+import instrumentation
+from instrumentation import (
+    PHASE_LEGAL_MOVES, PHASE_STATE_KEY, PHASE_Q_LOOKUP, PHASE_REWARD,
+    PHASE_MAKE_MOVE, PHASE_MOBILITY, PHASE_Q_UPDATE
+)
 
 # グローバル変数
 qtable = {}
@@ -28,9 +33,19 @@ class OthelloGame:
         self.notice_message = ""
         self.notice_start_time = 0
         self.notice_display_duration = 1000
+        # 打たれた手 [(手番, 行, 列)]（make_move で打った手だけ。探索用の apply_move は含まない）
+        self.move_history = []
         global move_count
         move_count = 0
 
+    def snapshot(self):
+        """盤面を複製したゲームを返す（別スレッドのAIが元の盤面を書き換えないように）"""
+        clone = OthelloGame.__new__(OthelloGame)
+        clone.__dict__.update(self.__dict__)
+        clone.board = [row[:] for row in self.board]
+        clone.move_history = list(self.move_history)
+        return clone
+
     def _get_flipped_stones(self, r, c, player):
         """指定された位置(r, c)にplayerが石を置いた場合に裏返せる石のリストを返す"""
         if self.board[r][c] != 0:
@@ -106,9 +121,25 @@ class OthelloGame:
         
         if player == PLAYER_WHITE:
             self.ai_last_reward = len(flipped_stones) * REWARD_FLIP_PER_STONE
+        self.move_history.append((player, row, col))
         
         return len(flipped_stones)
 
+    def apply_move(self, row, col, player):
+        """探索用に石を置いて裏返し、元に戻すための裏返した石のリストを返す（合法手の確認はしない）"""
+        flipped_stones = self._get_flipped_stones(row, col, player)
+        self.board[row][col] = player
+        for fr, fc in flipped_stones:
+            self.board[fr][fc] = player
+        return flipped_stones
+
+    def undo_move(self, row, col, player, flipped_stones):
+        """apply_move で打った手を取り消す"""
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        self.board[row][col] = 0
+        for fr, fc in flipped_stones:
+            self.board[fr][fc] = opponent
+
     def _flip_in_direction(self, row, col, dr, dc, player, opponent):
         """指定された方向の石を裏返す"""
         to_flip = []
@@ -233,13 +264,24 @@ class OthelloGame:
         """盤面状態を文字列キーに変換"""
         return ''.join(str(cell) for row in self.board for cell in row)
 
-    def ai_qlearning_move(self, qtable, learn=True, player=None, ai_learn_count=0):
-        """Q学習に基づくAIの手選び・Q値更新"""
+    def ai_qlearning_move(self, qtable, learn=True, player=None, ai_learn_count=0, action=None):
+        """Q学習に基づくAIの手選び・Q値更新
+
+        action に手 (行, 列) を渡すと、ε-greedy法で選ばずにその手を打つ（探索で決めた手のQ値更新用）。
+        instrumentation が有効な時はフェーズごとの時間を記録する。
+        """
         if player is None:
             player = self.current_player
+        timing = instrumentation.enabled
+        if timing:
+            t = perf_counter_ns()
         
         state_key = self.get_board_state_key()
+        if timing:
+            t = instrumentation.lap(PHASE_STATE_KEY, t)
         valid_moves = self.get_valid_moves(player)
+        if timing:
+            t = instrumentation.lap(PHASE_LEGAL_MOVES, t)
         if not valid_moves:
             self.ai_last_reward = 0
             self.last_ai_move = None
@@ -253,7 +295,9 @@ class OthelloGame:
         current_epsilon = max(min_epsilon, initial_epsilon * (decay_rate ** ai_learn_count))
 
         # ε-greedy法で行動選択
-        if random.random() < current_epsilon:
+        if action is not None:
+            pass  # 呼び出し元が決めた手を打つ
+        elif random.random() < current_epsilon:
             action = random.choice(valid_moves)
         else:
             # Q値が最大の行動を選択
@@ -269,6 +313,8 @@ class OthelloGame:
                 action = random.choice(valid_moves)
             else:
                 action = best_move
+        if timing:
+            t = instrumentation.lap(PHASE_Q_LOOKUP, t)
 
         # 実際に手を打つ
         r, c = action
@@ -296,15 +342,24 @@ class OthelloGame:
         if (r, c) in center_positions:
             reward += REWARD_TERRITORY
         
+        if timing:
+            t = instrumentation.lap(PHASE_REWARD, t)
+        
         # モビリティ（合法手の数）の報酬
         opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
         opponent_moves_before = len(self.get_valid_moves(opponent))
+        if timing:
+            t = instrumentation.lap(PHASE_MOBILITY, t)
         
         self.make_move(r, c, player)
+        if timing:
+            t = instrumentation.lap(PHASE_MAKE_MOVE, t)
         
         opponent_moves_after = len(self.get_valid_moves(opponent))
         mobility_change = opponent_moves_before - opponent_moves_after
         reward += mobility_change * REWARD_MOBILITY
+        if timing:
+            t = instrumentation.lap(PHASE_MOBILITY, t)
         
         self.message = f"{'黒' if player == PLAYER_BLACK else '白'} (Q学習AI) が {chr(ord('A') + c)}{r+1} に置きました。(報酬: {reward})"
         self.ai_last_reward = reward
@@ -325,6 +380,27 @@ class OthelloGame:
             current_q = qtable.get(action_key, 0.0)
             new_q = current_q + ALPHA * (reward + GAMMA * max_next_q - current_q)
             qtable[action_key] = new_q
+            if timing:
+                instrumentation.lap(PHASE_Q_UPDATE, t)
+        return True
+
+    def ai_random_move(self, player=None):
+        """Qテーブルを使わずにランダムな手を打つ（Qテーブルの読み込みが終わるまでの代わり）"""
+        if player is None:
+            player = self.current_player
+        
+        valid_moves = self.get_valid_moves(player)
+        if not valid_moves:
+            self.ai_last_reward = 0
+            self.last_ai_move = None
+            self.message = f"AI（{'黒' if player == PLAYER_BLACK else '白'}）はパスしました。"
+            return False
+        
+        r, c = random.choice(valid_moves)
+        self.make_move(r, c, player)
+        self.ai_last_reward = 0
+        self.last_ai_move = (r, c)
+        self.message = f"{'黒' if player == PLAYER_BLACK else '白'} (ランダム) が {chr(ord('A') + c)}{r+1} に置きました。"
         return True
 
     def get_ai_move(self):
@@ -396,4 +472,5 @@ class OthelloGame:
         self.last_ai_move = None
         self.game_over_displayed = False
         self.error_message = ""
-        self.error_start_time = 0 
\ No newline at end of file
+        self.error_start_time = 0 
+        self.move_history = []
\ No newline at end of file
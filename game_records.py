@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""対局記録の保存（追記専用のバイナリログ + 索引ファイル）
+
+自己対戦も人間との対戦も、1局ごとに手順（1手1バイト、パスも含む）と結果を追記する。
+LearningHistory は集計値しか持たないので、対局を再生したり、定跡作り・オフライン学習・分析に使ったりするためのもの。
+
+ファイル形式（リトルエンディアン）:
+    game_records.bin  "GRL1" + 対局レコードの並び
+        レコード  手数(uint16) + 時刻(float64, UNIX時間) + 対戦タイプ(uint8) + 黒の石数(uint8) + 白の石数(uint8)
+                  + フラグ(uint8, bit0=終局まで打った) + 手(uint8 × 手数, マス番号 r*8+c、パスは 64)
+    game_records.idx  "GRI1" + 各レコードの game_records.bin 内の位置(uint64)。対局IDは索引の何番目か
+手番は黒から交互で、パスも1手として入るので、手の並びだけで誰が打ったかが分かる。
+書き込み中に落ちても、開く時に索引とログを突き合わせて直す（書きかけのレコードは捨てる）。
+
+使い方:
+    python game_records.py stats                 # 対局数と勝敗
+    python game_records.py show 12               # 12番の対局を表示
+    python game_records.py export -o games.txt   # テキストに書き出す（1行1局）
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+from constants import *
+
+LOG_MAGIC = b"GRL1"
+INDEX_MAGIC = b"GRI1"
+RECORD_HEADER = struct.Struct("<HdBBBB")
+INDEX_ENTRY = struct.Struct("<Q")
+PASS_MOVE = 64
+FLAG_FINISHED = 1
+
+# LearningHistory の game_type と同じ名前
+GAME_TYPES = ("unknown", "ai_vs_ai", "human_vs_ai")
+
+def _opponent(player):
+    return PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+
+def encode_moves(move_history):
+    """[(手番, 行, 列)] を1手1バイトの列にする（手番が続いた所には相手のパスを入れる）"""
+    encoded = bytearray()
+    expected = PLAYER_BLACK
+    for player, r, c in move_history:
+        if player != expected:
+            encoded.append(PASS_MOVE)
+        encoded.append(r * BOARD_SIZE + c)
+        expected = _opponent(player)
+    return bytes(encoded)
+
+def decode_moves(moves):
+    """1手1バイトの列を [(手番, 行, 列)] に戻す（パスは (手番, None, None)）"""
+    decoded = []
+    player = PLAYER_BLACK
+    for sq in moves:
+        if sq == PASS_MOVE:
+            decoded.append((player, None, None))
+        else:
+            decoded.append((player, sq // BOARD_SIZE, sq % BOARD_SIZE))
+        player = _opponent(player)
+    return decoded
+
+def move_to_text(r, c):
+    """(行, 列) を "F5" の形にする（パスは "pass"）"""
+    if r is None:
+        return "pass"
+    return f"{chr(ord('A') + c)}{r + 1}"
+
+class GameRecord:
+    """1局分の記録"""
+    __slots__ = ("game_id", "timestamp", "game_type", "black_score", "white_score", "finished", "moves")
+
+    def __init__(self, game_id, timestamp, game_type, black_score, white_score, finished, moves):
+        self.game_id = game_id
+        self.timestamp = timestamp
+        self.game_type = game_type
+        self.black_score = black_score
+        self.white_score = white_score
+        self.finished = finished
+        self.moves = moves
+
+    def __repr__(self):
+        return (f"GameRecord({self.game_id}, {self.game_type}, 黒{self.black_score}-白{self.white_score}, "
+                f"{len(self.moves)}手)")
+
+    def iter_moves(self):
+        """(手番, 行, 列) を順に返す（パスは (手番, None, None)）"""
+        return iter(decode_moves(self.moves))
+
+    def to_move_list(self):
+        """パスを除いた [(手番, 行, 列)]（opening_book.count_position_visits などに渡す形）"""
+        return [(player, r, c) for player, r, c in decode_moves(self.moves) if r is not None]
+
+    def replay(self):
+        """最終局面まで打った OthelloGame を返す"""
+        from game_logic import OthelloGame
+        game = OthelloGame()
+        for player, r, c in self.to_move_list():
+            game.apply_move(r, c, player)
+        return game
+
+    def to_text(self):
+        """1行のテキスト（ID、時刻、対戦タイプ、黒-白、終局したか、手順）"""
+        when = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.timestamp))
+        moves = " ".join(move_to_text(r, c) for _, r, c in decode_moves(self.moves))
+        return (f"{self.game_id}\t{when}\t{self.game_type}\t{self.black_score}-{self.white_score}\t"
+                f"{'finished' if self.finished else 'unfinished'}\t{moves}")
+
+def _index_path(path):
+    return os.path.splitext(path)[0] + ".idx"
+
+class GameRecordStore:
+    """対局記録のログと索引（追記・ID での読み出し・先頭からの走査）
+
+    readonly=True なら読むだけで、ファイルを作ったり直したりしない（別プロセスから同時に読む時用）。
+    """
+    def __init__(self, path=GAME_RECORDS_PATH, readonly=False):
+        self.path = path
+        self.index_path = _index_path(path)
+        self.readonly = readonly
+        self._log = None
+        self._index = None
+        self._reader = None
+        self._open()
+
+    def _open(self):
+        for file_path, magic in ((self.path, LOG_MAGIC), (self.index_path, INDEX_MAGIC)):
+            if self.readonly and not os.path.exists(file_path):
+                raise FileNotFoundError(f"対局記録がありません: {file_path}")
+            if not self.readonly and (not os.path.exists(file_path) or os.path.getsize(file_path) == 0):
+                with open(file_path, "wb") as f:
+                    f.write(magic)
+            else:
+                with open(file_path, "rb") as f:
+                    if f.read(len(magic)) != magic:
+                        raise ValueError(f"対局記録のファイルではありません: {file_path}")
+        mode = "rb" if self.readonly else "r+b"
+        self._log = open(self.path, mode)
+        self._index = open(self.index_path, mode)
+        self._recover()
+        self._reader = open(self.path, "rb")
+
+    def _recover(self):
+        """索引とログの食い違い（書き込み中に落ちた場合）を直す"""
+        log_size = os.fstat(self._log.fileno()).st_size
+        index_size = os.fstat(self._index.fileno()).st_size
+        count = (index_size - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        # 普段は索引の最後の項目がログの最後のレコードを指しているかだけ確かめる
+        if index_size == len(INDEX_MAGIC) + count * INDEX_ENTRY.size:
+            if count == 0:
+                consistent = log_size == len(LOG_MAGIC)
+            else:
+                self._index.seek(len(INDEX_MAGIC) + (count - 1) * INDEX_ENTRY.size)
+                last_offset, = INDEX_ENTRY.unpack(self._index.read(INDEX_ENTRY.size))
+                consistent = self._record_end(last_offset, log_size) == log_size
+            if consistent:
+                self._index.seek(0, os.SEEK_END)
+                self._log.seek(0, os.SEEK_END)
+                self.count = count
+                return
+        # 索引の端数と、ログの範囲外を指す項目は捨てる
+        offsets_end = len(LOG_MAGIC)
+        valid = 0
+        for i in range(count):
+            self._index.seek(len(INDEX_MAGIC) + i * INDEX_ENTRY.size)
+            offset, = INDEX_ENTRY.unpack(self._index.read(INDEX_ENTRY.size))
+            end = self._record_end(offset, log_size)
+            if offset != offsets_end or end is None:
+                break
+            offsets_end = end
+            valid += 1
+        if self.readonly:
+            self.count = valid
+            return
+        # 索引に載っていないログの続き（索引を書く前に落ちた分）を索引に足し、書きかけは捨てる
+        offset = offsets_end
+        new_offsets = []
+        while True:
+            end = self._record_end(offset, log_size)
+            if end is None:
+                break
+            new_offsets.append(offset)
+            offset = end
+        self._index.truncate(len(INDEX_MAGIC) + valid * INDEX_ENTRY.size)
+        self._index.seek(0, os.SEEK_END)
+        for entry in new_offsets:
+            self._index.write(INDEX_ENTRY.pack(entry))
+        self._index.flush()
+        if offset != log_size:
+            self._log.truncate(offset)
+        self._log.seek(0, os.SEEK_END)
+        self.count = valid + len(new_offsets)
+
+    def _record_end(self, offset, log_size):
+        """offset から始まるレコードの終わりの位置（レコードが途中で切れていれば None）"""
+        if offset + RECORD_HEADER.size > log_size:
+            return None
+        self._log.seek(offset)
+        move_count = RECORD_HEADER.unpack(self._log.read(RECORD_HEADER.size))[0]
+        end = offset + RECORD_HEADER.size + move_count
+        return end if end <= log_size else None
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for f in (self._log, self._index, self._reader):
+            if f is not None:
+                f.close()
+        self._log = self._index = self._reader = None
+
+    def append(self, move_history, black_score, white_score, game_type="unknown", finished=True, timestamp=None):
+        """1局を追記して対局IDを返す（move_history は OthelloGame.move_history の形）"""
+        moves = encode_moves(move_history)
+        type_code = GAME_TYPES.index(game_type) if game_type in GAME_TYPES else 0
+        offset = self._log.tell()
+        self._log.write(RECORD_HEADER.pack(len(moves), time.time() if timestamp is None else timestamp,
+                                           type_code, black_score, white_score, FLAG_FINISHED if finished else 0))
+        self._log.write(moves)
+        self._log.flush()
+        # ログを書いてから索引を書く（間で落ちても次に開いた時に索引を足せる）
+        self._index.write(INDEX_ENTRY.pack(offset))
+        self._index.flush()
+        game_id = self.count
+        self.count += 1
+        return game_id
+
+    def append_game(self, game, game_type="unknown"):
+        """OthelloGame の手順と石数をそのまま追記する"""
+        black_score, white_score = game.get_score()
+        return self.append(game.move_history, black_score, white_score, game_type, game.game_over)
+
+    def _read_record(self, game_id, offset):
+        self._reader.seek(offset)
+        header = self._reader.read(RECORD_HEADER.size)
+        move_count, timestamp, type_code, black_score, white_score, flags = RECORD_HEADER.unpack(header)
+        moves = self._reader.read(move_count)
+        game_type = GAME_TYPES[type_code] if type_code < len(GAME_TYPES) else "unknown"
+        return GameRecord(game_id, timestamp, game_type, black_score, white_score, bool(flags & FLAG_FINISHED), moves)
+
+    def get(self, game_id):
+        """対局IDの記録を索引から直接読む"""
+        if not 0 <= game_id < self.count:
+            raise IndexError(f"対局IDが範囲外です: {game_id}（{self.count}局）")
+        return self._read_record(game_id, self._offset(game_id))
+
+    def __getitem__(self, game_id):
+        return self.get(game_id)
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def iter_records(self, start=0, stop=None):
+        """start 番から stop 番の手前まで順に記録を返す（ログを順に読むだけなので速い）"""
+        count = self.count if stop is None else min(stop, self.count)
+        if start >= count:
+            return
+        reader = open(self.path, "rb")
+        try:
+            reader.seek(self._offset(start) if start > 0 else len(LOG_MAGIC))
+            for game_id in range(start, count):
+                header = reader.read(RECORD_HEADER.size)
+                move_count, timestamp, type_code, black_score, white_score, flags = RECORD_HEADER.unpack(header)
+                moves = reader.read(move_count)
+                game_type = GAME_TYPES[type_code] if type_code < len(GAME_TYPES) else "unknown"
+                yield GameRecord(game_id, timestamp, game_type, black_score, white_score,
+                                 bool(flags & FLAG_FINISHED), moves)
+        finally:
+            reader.close()
+
+    def _offset(self, game_id):
+        # 索引の書き込み位置は末尾に戻しておく
+        self._index.seek(len(INDEX_MAGIC) + game_id * INDEX_ENTRY.size)
+        offset, = INDEX_ENTRY.unpack(self._index.read(INDEX_ENTRY.size))
+        self._index.seek(0, os.SEEK_END)
+        return offset
+
+    def export_text(self, out, start=0):
+        """記録を1行1局のテキストで out に書き出し、書いた局数を返す"""
+        written = 0
+        for record in self.iter_records(start):
+            out.write(record.to_text() + "\n")
+            written += 1
+        return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="対局記録の表示と書き出し")
+    parser.add_argument("--records", default=GAME_RECORDS_PATH, help="対局記録のファイル")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="対局数と勝敗を表示")
+    show_parser = subparsers.add_parser("show", help="1局を表示")
+    show_parser.add_argument("game_id", type=int, help="対局ID")
+    export_parser = subparsers.add_parser("export", help="テキストに書き出す（1行1局）")
+    export_parser.add_argument("-o", "--output", default="-", help="出力ファイル（- なら標準出力）")
+    export_parser.add_argument("--start", type=int, default=0, help="この対局IDから書き出す")
+    args = parser.parse_args()
+
+    with GameRecordStore(args.records) as store:
+        if args.command == "stats":
+            by_type = {}
+            for record in store:
+                stats = by_type.setdefault(record.game_type, [0, 0, 0, 0])
+                stats[0] += 1
+                if record.black_score > record.white_score:
+                    stats[1] += 1
+                elif record.white_score > record.black_score:
+                    stats[2] += 1
+                else:
+                    stats[3] += 1
+            print(f"{args.records}: {len(store)}局, {os.path.getsize(args.records)} バイト")
+            for game_type, (games, black, white, draws) in sorted(by_type.items()):
+                print(f"  {game_type}: {games}局 黒{black}勝 白{white}勝 引き分け{draws}")
+        elif args.command == "show":
+            record = store.get(args.game_id)
+            print(record.to_text())
+            game = record.replay()
+            for row in game.board:
+                print(" ".join(".XO"[cell] for cell in row))
+        else:
+            if args.output == "-":
+                store.export_text(sys.stdout, args.start)
+            else:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    count = store.export_text(f, args.start)
+                print(f"{args.output} に {count} 局を書き出しました")
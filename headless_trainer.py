@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""画面を使わない自己対戦学習（main.run_pretrain_mode と同じ対戦をpygameなしで行う）
+
+使い方:
+    python headless_trainer.py --games 1000            # qtable.pkl を読み込んで学習し、保存する
+    python headless_trainer.py --games 100 --no-save   # 保存しない（速度確認など）
+    python headless_trainer.py --games 100 --instrument  # フェーズ別の時間も表示する
+    python headless_trainer.py --games 100000 --profile-games 20   # kill -USR1 <pid> で途中の20局をプロファイル
+    python headless_trainer.py --games 100000 --checkpoint-every 1000 --metrics-port 9108   # 夜間の学習を監視する
+    python headless_trainer.py --games 100000 --checkpoint-every 1000 --evict-near-zero 0.01 --max-memory-mb 2048
+    python headless_trainer.py --games 100000 --checkpoint-every 1000 --sqlite qtable.db   # メモリに載らないQテーブル
+"""
+
+import argparse
+import os
+import random
+import signal
+import time
+from time import perf_counter_ns
+
+from constants import *
+from game_logic import OthelloGame
+import instrumentation
+from instrumentation import PHASE_GAME_OVER
+
+class SelfPlayTrainer:
+    """同じQテーブルを使うAI同士の自己対戦で学習する
+
+    白も黒も ai_qlearning_move で手を選んでQ値を更新する（run_pretrain_mode と同じ）。
+    対局数・手数・Q値の更新回数などの統計を持つ。records（game_records.GameRecordStore）を渡すと各局を記録する。
+    """
+    def __init__(self, qtable, max_moves=200, records=None):
+        self.qtable = qtable
+        self.max_moves = max_moves
+        self.records = records
+        self.games = 0
+        self.plies = 0
+        self.ai_learn_count = 0
+        self.ai_total_reward = 0
+        self.win_black = 0
+        self.win_white = 0
+        self.draws = 0
+
+    def get_avg_reward(self):
+        return self.ai_total_reward / self.ai_learn_count if self.ai_learn_count > 0 else 0
+
+    def play_game(self):
+        """1局対戦して (黒の石数, 白の石数) を返す"""
+        game = OthelloGame()
+        qtable = self.qtable
+        game_move_count = 0
+        while not game.game_over and game_move_count < self.max_moves:
+            player = game.current_player
+            if game.get_valid_moves(player):
+                if game.ai_qlearning_move(qtable, learn=True, player=player, ai_learn_count=self.ai_learn_count):
+                    self.ai_learn_count += 1
+                    self.ai_total_reward += game.ai_last_reward
+                    self.plies += 1
+            game.switch_player()
+            if instrumentation.enabled:
+                t = perf_counter_ns()
+                game.check_game_over()
+                instrumentation.lap(PHASE_GAME_OVER, t)
+            else:
+                game.check_game_over()
+            game_move_count += 1
+
+        black_score, white_score = game.get_score()
+        if black_score > white_score:
+            self.win_black += 1
+        elif white_score > black_score:
+            self.win_white += 1
+        else:
+            self.draws += 1
+        if self.records is not None:
+            self.records.append_game(game, "ai_vs_ai")
+        self.games += 1
+        return black_score, white_score
+
+    def run(self, games, on_game_end=None, profiler=None):
+        """games 局対戦する（on_game_end(trainer, 黒の石数, 白の石数) を毎局呼ぶ）
+
+        profiler（profiling.GameWindowProfiler）を渡すと、予約された時にその局からプロファイルを取る。
+        """
+        try:
+            for _ in range(games):
+                if profiler is not None:
+                    profiler.on_game_start()
+                black_score, white_score = self.play_game()
+                if profiler is not None:
+                    profiler.on_game_end()
+                if on_game_end is not None:
+                    on_game_end(self, black_score, white_score)
+        finally:
+            if profiler is not None:
+                profiler.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description="画面を使わない自己対戦学習")
+    parser.add_argument("--games", type=int, default=100, help="対局数")
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード（再現したい時）")
+    parser.add_argument("--no-save", action="store_true", help="Qテーブルと学習履歴と対局記録を保存しない")
+    parser.add_argument("--no-record", action="store_true", help="対局記録（game_records.bin）を保存しない")
+    parser.add_argument("--instrument", action="store_true",
+                        help=f"フェーズ別の時間を計測して表示する（環境変数 {instrumentation.ENV_VAR}=1 と同じ）")
+    parser.add_argument("--profile-games", type=int, default=None,
+                        help="SIGUSR1 を受けたら、次の局からこの局数だけプロファイルを取る")
+    parser.add_argument("--profile-at", type=int, default=None, help="この局からプロファイルを取る（シグナルを使わない場合）")
+    parser.add_argument("--profile-prefix", default="profile", help="プロファイルの出力ファイル名の先頭")
+    parser.add_argument("--checkpoint-every", type=int, default=0, help="この局数ごとにQテーブルを保存する（0なら最後だけ）")
+    parser.add_argument("--metrics-file", default=None, help="Prometheus 形式のメトリクスを定期的に書き出すファイル")
+    parser.add_argument("--metrics-port", type=int, default=None, help="メトリクスを http://127.0.0.1:<port>/metrics で返す")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="メトリクスのファイルを書き出す間隔（秒）")
+    parser.add_argument("--value-type", choices=["float32", "float16", "int16"], default=None,
+                        help="Q値を型付きの配列に詰めて持つ（qtable_array.ArrayQTable、メモリを減らす）")
+    parser.add_argument("--sqlite", default=None,
+                        help="qtable.pkl の代わりにこの SQLite のQテーブルで学習する（qtable_sqlite.SQLiteQTable）")
+    from qtable_store import add_policy_arguments, policy_from_args, as_tracked
+    add_policy_arguments(parser)
+    args = parser.parse_args()
+    eviction_policy = policy_from_args(args)
+    if args.value_type is not None and eviction_policy.is_enabled():
+        parser.error("--value-type と刈り込みの条件は一緒に使えません")
+    if args.sqlite is not None and (args.value_type is not None or eviction_policy.is_enabled()):
+        parser.error("--sqlite と --value-type・刈り込みの条件は一緒に使えません")
+
+    if args.instrument:
+        instrumentation.set_enabled(True)
+    profiler = None
+    if args.profile_games is not None or args.profile_at is not None:
+        from profiling import GameWindowProfiler, DEFAULT_PROFILE_GAMES
+        profiler = GameWindowProfiler(args.profile_games or DEFAULT_PROFILE_GAMES, args.profile_prefix)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request())
+            print(f"プロファイル: kill -USR1 {os.getpid()} で次の局から{profiler.games}局分を取ります")
+
+    from ai_learning import LearningHistory, load_qtable, save_qtable
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.sqlite is not None:
+        from qtable_sqlite import SQLiteQTable, DEFAULT_BATCH_SIZE
+        # 保存しない時は途中で書き戻さず、全部メモリに置いたまま最後に捨てる
+        qtable = SQLiteQTable(args.sqlite, batch_size=None if args.no_save else DEFAULT_BATCH_SIZE)
+    else:
+        qtable = load_qtable()
+        if args.value_type is not None:
+            from qtable_array import from_mapping
+            qtable = from_mapping(qtable, args.value_type)
+        elif eviction_policy.is_enabled():
+            if not isinstance(qtable, dict):
+                parser.error("ArrayQTable で保存されたQテーブルは刈り込めません")
+            # 刈り込む時だけ更新回数と最終更新エポックを記録する（1件あたりのメモリが増えるため。
+            # 保存したファイルにも残り、次回以降の刈り込みに使う）
+            qtable = as_tracked(qtable)
+    learning_history = None if args.no_save else LearningHistory(max_history=50)
+    records = None
+    if not args.no_save and not args.no_record:
+        from game_records import GameRecordStore
+        records = GameRecordStore()
+    trainer = SelfPlayTrainer(qtable, records=records)
+    exporter = None
+    if args.metrics_file or args.metrics_port is not None:
+        from metrics import MetricsExporter, TrainingMetrics
+        exporter = MetricsExporter(TrainingMetrics("headless"), args.metrics_file, args.metrics_port, args.metrics_interval)
+        if exporter.server is not None:
+            print(f"メトリクス: http://127.0.0.1:{exporter.server.port}/metrics")
+
+    def on_evict(stats):
+        print(stats)
+        if exporter is not None:
+            exporter.metrics.observe_eviction(stats)
+
+    if eviction_policy.is_enabled():
+        qtable.on_evict = on_evict
+        # 件数・メモリの上限はエポックごとにも確かめ、他の条件はチェックポイントで使う
+        qtable.auto_policy = eviction_policy
+    start_time = time.perf_counter()
+
+    def checkpoint():
+        if eviction_policy.is_enabled():
+            qtable.evict(eviction_policy)
+        checkpoint_start = time.perf_counter()
+        if args.sqlite is not None:
+            qtable.flush()
+        else:
+            save_qtable(qtable)
+        if exporter is not None:
+            exporter.metrics.observe_checkpoint(time.perf_counter() - checkpoint_start)
+
+    def on_game_end(trainer, black_score, white_score):
+        if profiler is not None and args.profile_at is not None and trainer.games + 1 == args.profile_at:
+            profiler.request()
+        if learning_history is not None:
+            learning_history.add_record(
+                trainer.games, trainer.ai_learn_count, trainer.win_white, trainer.win_black,
+                trainer.draws, trainer.ai_total_reward, trainer.get_avg_reward(), len(trainer.qtable),
+                black_score, white_score, "ai_vs_ai"
+            )
+        if not args.no_save and args.checkpoint_every > 0 and trainer.games % args.checkpoint_every == 0:
+            checkpoint()
+        if exporter is not None:
+            exporter.metrics.update(trainer.games, trainer.ai_learn_count, len(trainer.qtable), trainer.get_avg_reward(),
+                                    trainer.win_black, trainer.win_white, trainer.draws)
+            exporter.tick()
+        if trainer.games % 100 == 0:
+            elapsed = time.perf_counter() - start_time
+            print(f"{trainer.games}/{args.games}局 白{trainer.win_white}勝 黒{trainer.win_black}勝 "
+                  f"Qテーブル={len(trainer.qtable)} {trainer.games / elapsed:.1f}局/秒")
+
+    if profiler is not None and args.profile_at is not None and args.profile_at <= 1:
+        profiler.request()
+    try:
+        trainer.run(args.games, on_game_end, profiler)
+        elapsed = time.perf_counter() - start_time
+        print(f"完了: {trainer.games}局 {elapsed:.1f}秒 平均報酬={trainer.get_avg_reward():.2f} Qテーブル={len(qtable)}")
+        if instrumentation.enabled:
+            print("フェーズ別の時間:")
+            for line in instrumentation.format_summary():
+                print(f"  {line}")
+        if not args.no_save:
+            checkpoint()
+    finally:
+        if args.sqlite is not None:
+            qtable.close(discard=args.no_save)
+        if exporter is not None:
+            exporter.close()
+        if records is not None:
+            records.close()
+
+if __name__ == "__main__":
+    main()
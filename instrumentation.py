@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""1手の処理のフェーズ別の時間計測（合法手生成・盤面キー・Q値の参照など）
+
+環境変数 OTHELLO_INSTRUMENT=1 か set_enabled(True)（デバッグモード、headless_trainer.py --instrument）で有効になる。
+計測する側は関数の最初に enabled を1回だけ読み、無効な時はローカル変数の判定だけで済むようにする:
+
+    timing = instrumentation.enabled
+    if timing:
+        t = perf_counter_ns()
+    ...（フェーズの処理）
+    if timing:
+        t = instrumentation.lap(PHASE_LEGAL_MOVES, t)
+
+時間はフェーズごとに対数の区間（2倍ごとに4分割）のヒストグラムに入れ、p50/p95/p99 はその区間の上端で近似する。
+メインスレッドとAIワーカーのスレッドから同時に記録すると、まれに回数が1つずれることがある（統計なので気にしない）。
+"""
+
+import math
+import os
+from time import perf_counter_ns
+
+ENV_VAR = "OTHELLO_INSTRUMENT"
+
+# フェーズ名（表示もこの順）
+PHASE_LEGAL_MOVES = "合法手生成"
+PHASE_STATE_KEY = "盤面キー"
+PHASE_Q_LOOKUP = "Q値参照"
+PHASE_REWARD = "報酬計算"
+PHASE_MAKE_MOVE = "着手"
+PHASE_MOBILITY = "合法手数"
+PHASE_Q_UPDATE = "Q値更新"
+PHASE_GAME_OVER = "終局判定"
+PHASES = (
+    PHASE_LEGAL_MOVES, PHASE_STATE_KEY, PHASE_Q_LOOKUP, PHASE_REWARD,
+    PHASE_MAKE_MOVE, PHASE_MOBILITY, PHASE_Q_UPDATE, PHASE_GAME_OVER,
+)
+
+BUCKETS_PER_OCTAVE = 4
+
+# 環境変数で有効にしたか（デバッグモードを切っても有効のままにする）
+ENV_ENABLED = os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false", "off")
+enabled = ENV_ENABLED
+
+class PhaseHistogram:
+    """1つのフェーズの回数・合計時間・対数ヒストグラム（ナノ秒）"""
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = {}
+
+    def add(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        index = int(math.log2(elapsed_ns) * BUCKETS_PER_OCTAVE) if elapsed_ns > 1 else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, p):
+        """p (0〜100) パーセンタイルの近似値（ナノ秒）"""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(2 ** ((index + 1) / BUCKETS_PER_OCTAVE), self.max_ns)
+        return float(self.max_ns)
+
+_histograms = {}
+
+def set_enabled(flag):
+    global enabled
+    enabled = bool(flag)
+
+def record(phase, elapsed_ns):
+    histogram = _histograms.get(phase)
+    if histogram is None:
+        histogram = _histograms[phase] = PhaseHistogram()
+    histogram.add(elapsed_ns)
+
+def lap(phase, start_ns):
+    """start_ns からの時間を phase に記録し、次のフェーズの開始時刻として今の時刻を返す"""
+    now = perf_counter_ns()
+    record(phase, now - start_ns)
+    return now
+
+def reset():
+    _histograms.clear()
+
+def get_summary():
+    """{フェーズ: {count, total_ms, mean_us, p50_us, p95_us, p99_us, max_us}}（記録のあるフェーズだけ）"""
+    summary = {}
+    names = [phase for phase in PHASES if phase in _histograms]
+    names += sorted(phase for phase in _histograms if phase not in PHASES)
+    for phase in names:
+        histogram = _histograms[phase]
+        summary[phase] = {
+            "count": histogram.count,
+            "total_ms": histogram.total_ns / 1e6,
+            "mean_us": histogram.total_ns / histogram.count / 1e3,
+            "p50_us": histogram.percentile(50) / 1e3,
+            "p95_us": histogram.percentile(95) / 1e3,
+            "p99_us": histogram.percentile(99) / 1e3,
+            "max_us": histogram.max_ns / 1e3,
+        }
+    return summary
+
+def format_summary():
+    """get_summary() を表示用の行のリストにする"""
+    lines = []
+    for phase, stats in get_summary().items():
+        lines.append(f"{phase}: {stats['count']}回 計{stats['total_ms']:.1f}ms "
+                     f"p50={stats['p50_us']:.1f}µs p95={stats['p95_us']:.1f}µs p99={stats['p99_us']:.1f}µs")
+    return lines
@@ -0,0 +1,725 @@
+"""学習データの保存・上書き・読み込み・新規作成・削除の画面
+
+pygame を使う画面はここにまとめ、ファイルの読み書き（ai_learning）は pygame なしで使えるようにしておく。
+"""
+
+import os
+import traceback
+
+import pygame
+
+from constants import *
+from ai_learning import (
+    get_saved_data_list, get_saved_qtable_filename, save_qtable_to_file, load_qtable_from_file
+)
+
+# 学習データ管理機能
+def save_learning_data(qtable, learning_history, screen, font):
+    """
+    学習データを保存（エラーハンドリング・デバッグ強化）
+    """
+    save_name = show_save_name_input(screen, font)
+    if not save_name:
+        print("[保存] キャンセルされました")
+        return
+    try:
+        qtable_filename = f"qtable_{save_name}.qts"
+        history_filename = f"learning_history_{save_name}.json"
+        print(f"[保存] Qテーブル保存先: {qtable_filename}")
+        print(f"[保存] 履歴保存先: {history_filename}")
+        save_qtable_to_file(qtable, qtable_filename)
+        learning_history.save_history_to_file(history_filename)
+        show_save_complete_message(screen, font, save_name)
+        print(f"[保存] 学習データ '{save_name}' を保存しました")
+    except Exception as e:
+        print(f"[保存エラー] {e}")
+        traceback.print_exc()
+        show_save_error_message(screen, font, str(e))
+
+def overwrite_learning_data(qtable, learning_history, screen, font):
+    """
+    学習データを上書き保存（既存データの選択・上書き）
+    """
+    # 保存済みデータの一覧を取得
+    saved_data = get_saved_data_list()
+    if not saved_data:
+        print("[上書き保存] 保存済みデータがありません。新規保存を使用してください。")
+        show_no_saved_data_message(screen, font)
+        return
+    
+    # 上書き対象選択画面を表示
+    selected_data = show_data_selection_screen(screen, font, saved_data, "上書きするデータを選択")
+    if not selected_data:
+        print("[上書き保存] キャンセルされました")
+        return
+    
+    # 上書き確認メッセージを表示
+    if show_confirm_overwrite_message(screen, font, selected_data):
+        try:
+            qtable_filename = f"qtable_{selected_data}.qts"
+            history_filename = f"learning_history_{selected_data}.json"
+            print(f"[上書き保存] Qテーブル保存先: {qtable_filename}")
+            print(f"[上書き保存] 履歴保存先: {history_filename}")
+            save_qtable_to_file(qtable, qtable_filename)
+            # 以前の pickle は残すと読み込みで古い方を選びかねないので消す
+            if os.path.exists(f"qtable_{selected_data}.pkl"):
+                os.remove(f"qtable_{selected_data}.pkl")
+            learning_history.save_history_to_file(history_filename)
+            show_overwrite_complete_message(screen, font, selected_data)
+            print(f"[上書き保存] 学習データ '{selected_data}' を上書き保存しました")
+        except Exception as e:
+            print(f"[上書き保存エラー] {e}")
+            traceback.print_exc()
+            show_save_error_message(screen, font, str(e))
+
+def create_new_learning_data(qtable, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward, screen, font):
+    """新しい学習データを作成"""
+    # 新規作成名入力画面を表示
+    new_name = show_new_data_name_input(screen, font)
+    if not new_name:
+        return  # キャンセルされた場合
+    
+    # 確認メッセージを表示
+    if show_confirm_new_data_message(screen, font, new_name):
+        try:
+            # データをリセット
+            qtable.clear()
+            learning_history.clear()
+            game_count = 0
+            ai_learn_count = 0
+            ai_win_count = 0
+            ai_lose_count = 0
+            ai_draw_count = 0
+            ai_total_reward = 0
+            ai_avg_reward = 0
+            
+            # 新しいQテーブルを保存
+            qtable_filename = f"qtable_{new_name}.qts"
+            save_qtable_to_file(qtable, qtable_filename)
+            
+            # 学習履歴を保存
+            history_filename = f"learning_history_{new_name}.json"
+            learning_history.save_history_to_file(history_filename)
+            
+            print(f"新しい学習データ '{new_name}' を作成しました")
+        except Exception as e:
+            print(f"新規作成エラー: {e}")
+
+def load_learning_data(qtable, learning_history, screen, font):
+    """
+    学習データを読み込み（エラーハンドリング・デバッグ強化・値返却）
+    """
+    saved_data = get_saved_data_list()
+    if not saved_data:
+        print("[読み込み] 保存済みデータがありません")
+        show_no_saved_data_message(screen, font)
+        return None
+    selected_data = show_data_selection_screen(screen, font, saved_data)
+    if not selected_data:
+        print("[読み込み] キャンセルされました")
+        return None
+    try:
+        qtable_filename = get_saved_qtable_filename(selected_data)
+        history_filename = f"learning_history_{selected_data}.json"
+        print(f"[読み込み] Qテーブル読み込み元: {qtable_filename}")
+        print(f"[読み込み] 履歴読み込み元: {history_filename}")
+        qtable.clear()
+        load_qtable_from_file(qtable_filename, qtable)
+        learning_history.load_history_from_file(history_filename)
+        latest = learning_history.get_latest_stats()
+        show_load_complete_message(screen, font, selected_data)
+        print(f"[読み込み] 学習データ '{selected_data}' を読み込みました")
+        if latest:
+            return (
+                latest['game_count'],
+                latest['ai_learn_count'],
+                latest['ai_win_count'],
+                latest['ai_lose_count'],
+                latest['ai_draw_count'],
+                latest['ai_total_reward'],
+                latest['ai_avg_reward']
+            )
+        else:
+            return None
+    except Exception as e:
+        print(f"[読み込みエラー] {e}")
+        traceback.print_exc()
+        show_load_error_message(screen, font, str(e))
+        return None
+
+def confirm_delete_learning_data(screen, font):
+    """学習データ削除の確認"""
+    # 保存済みデータの一覧を取得
+    saved_data = get_saved_data_list()
+    if not saved_data:
+        show_no_saved_data_message(screen, font)
+        return
+    
+    # 削除対象選択画面を表示
+    selected_data = show_data_selection_screen(screen, font, saved_data, "削除するデータを選択")
+    if not selected_data:
+        return  # キャンセルされた場合
+    
+    # 確認メッセージを表示
+    if show_confirm_delete_message(screen, font, selected_data):
+        try:
+            # ファイルを削除
+            history_filename = f"learning_history_{selected_data}.json"
+            
+            for qtable_filename in (f"qtable_{selected_data}.qts", f"qtable_{selected_data}.pkl"):
+                if os.path.exists(qtable_filename):
+                    os.remove(qtable_filename)
+            if os.path.exists(history_filename):
+                os.remove(history_filename)
+            
+            print(f"学習データ '{selected_data}' を削除しました")
+        except Exception as e:
+            print(f"削除エラー: {e}")
+
+def show_save_name_input(screen, font):
+    """保存名入力画面を表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("学習データ保存", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 150))
+    
+    message = font.render("保存名を入力してください:", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 200))
+    
+    # 入力ボックス
+    input_box = pygame.Rect(WINDOW_WIDTH//2 - 150, 250, 300, 40)
+    pygame.draw.rect(screen, (255, 255, 255), input_box)
+    pygame.draw.rect(screen, (100, 100, 100), input_box, 2)
+    
+    # ボタン
+    save_button = pygame.Rect(WINDOW_WIDTH//2 - 150, 320, 120, 40)
+    pygame.draw.rect(screen, (100, 200, 100), save_button)
+    pygame.draw.rect(screen, (50, 150, 50), save_button, 2)
+    save_text = font.render("保存", True, (0, 0, 0))
+    save_text_rect = save_text.get_rect(center=save_button.center)
+    screen.blit(save_text, save_text_rect)
+    
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 + 30, 320, 120, 40)
+    pygame.draw.rect(screen, (200, 200, 200), cancel_button)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button, 2)
+    cancel_text = font.render("キャンセル", True, (0, 0, 0))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    help_text = font.render("ESCキーでキャンセル", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 380))
+    
+    pygame.display.flip()
+    
+    # 入力処理
+    input_text = ""
+    input_active = True
+    
+    while input_active:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return None
+                elif event.key == pygame.K_RETURN:
+                    return input_text if input_text.strip() else None
+                elif event.key == pygame.K_BACKSPACE:
+                    input_text = input_text[:-1]
+                else:
+                    # 英数字とアンダースコアのみ許可
+                    if event.unicode.isalnum() or event.unicode == '_':
+                        input_text += event.unicode
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                if save_button.collidepoint(mouse_pos):
+                    return input_text if input_text.strip() else None
+                elif cancel_button.collidepoint(mouse_pos):
+                    return None
+        
+        # 入力テキストを再描画
+        pygame.draw.rect(screen, (255, 255, 255), input_box)
+        pygame.draw.rect(screen, (100, 100, 100), input_box, 2)
+        text_surface = font.render(input_text, True, (0, 0, 0))
+        screen.blit(text_surface, (input_box.x + 5, input_box.y + 10))
+        
+        pygame.display.flip()
+    
+    return None
+
+def show_new_data_name_input(screen, font):
+    """新規データ名入力画面を表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("新規学習データ作成", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 150))
+    
+    message = font.render("新規データ名を入力してください:", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 200))
+    
+    # 入力ボックス
+    input_box = pygame.Rect(WINDOW_WIDTH//2 - 150, 250, 300, 40)
+    pygame.draw.rect(screen, (255, 255, 255), input_box)
+    pygame.draw.rect(screen, (100, 100, 100), input_box, 2)
+    
+    # ボタン
+    create_button = pygame.Rect(WINDOW_WIDTH//2 - 150, 320, 120, 40)
+    pygame.draw.rect(screen, (100, 200, 100), create_button)
+    pygame.draw.rect(screen, (50, 150, 50), create_button, 2)
+    create_text = font.render("作成", True, (0, 0, 0))
+    create_text_rect = create_text.get_rect(center=create_button.center)
+    screen.blit(create_text, create_text_rect)
+    
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 + 30, 320, 120, 40)
+    pygame.draw.rect(screen, (200, 200, 200), cancel_button)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button, 2)
+    cancel_text = font.render("キャンセル", True, (0, 0, 0))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    help_text = font.render("ESCキーでキャンセル", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 380))
+    
+    pygame.display.flip()
+    
+    # 入力処理
+    input_text = ""
+    input_active = True
+    
+    while input_active:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return None
+                elif event.key == pygame.K_RETURN:
+                    return input_text if input_text.strip() else None
+                elif event.key == pygame.K_BACKSPACE:
+                    input_text = input_text[:-1]
+                else:
+                    # 英数字とアンダースコアのみ許可
+                    if event.unicode.isalnum() or event.unicode == '_':
+                        input_text += event.unicode
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                if create_button.collidepoint(mouse_pos):
+                    return input_text if input_text.strip() else None
+                elif cancel_button.collidepoint(mouse_pos):
+                    return None
+        
+        # 入力テキストを再描画
+        pygame.draw.rect(screen, (255, 255, 255), input_box)
+        pygame.draw.rect(screen, (100, 100, 100), input_box, 2)
+        text_surface = font.render(input_text, True, (0, 0, 0))
+        screen.blit(text_surface, (input_box.x + 5, input_box.y + 10))
+        
+        pygame.display.flip()
+    
+    return None
+
+def show_data_selection_screen(screen, font, data_list, title_text="データを選択"):
+    """データ選択画面を表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render(title_text, True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 100))
+    
+    # データリストを表示
+    list_font = get_japanese_font(14)
+    y_offset = 150
+    button_rects = []
+    
+    for i, data_name in enumerate(data_list):
+        button_rect = pygame.Rect(WINDOW_WIDTH//2 - 200, y_offset, 400, 40)
+        button_rects.append(button_rect)
+        
+        # ボタン背景
+        pygame.draw.rect(screen, (240, 240, 240), button_rect)
+        pygame.draw.rect(screen, (100, 100, 100), button_rect, 2)
+        
+        # データ名
+        text_surface = list_font.render(data_name, True, (0, 0, 0))
+        text_rect = text_surface.get_rect(center=button_rect.center)
+        screen.blit(text_surface, text_rect)
+        
+        y_offset += 50
+    
+    # キャンセルボタン
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 - 100, y_offset + 20, 200, 40)
+    pygame.draw.rect(screen, (200, 200, 200), cancel_button)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button, 2)
+    cancel_text = font.render("キャンセル", True, (0, 0, 0))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    help_text = font.render("ESCキーでキャンセル", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, y_offset + 80))
+    
+    pygame.display.flip()
+    
+    # 選択処理
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                if cancel_button.collidepoint(mouse_pos):
+                    return None
+                
+                # データボタンのクリック判定
+                for i, button_rect in enumerate(button_rects):
+                    if button_rect.collidepoint(mouse_pos):
+                        return data_list[i]
+    
+    return None
+
+def show_save_complete_message(screen, font, save_name):
+    """保存完了メッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("保存完了", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 200))
+    
+    message = font.render(f"学習データ '{save_name}' を保存しました", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 250))
+    
+    help_text = font.render("任意のキーで続行", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 320))
+    
+    pygame.display.flip()
+    
+    # キー入力待ち
+    waiting = True
+    while waiting:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.KEYDOWN:
+                return
+
+def show_confirm_new_data_message(screen, font, new_name):
+    """新規データ作成確認メッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("新規データ作成確認", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 150))
+    
+    message1 = font.render(f"新しい学習データ '{new_name}' を作成しますか？", True, (0, 0, 0))
+    screen.blit(message1, (WINDOW_WIDTH//2 - message1.get_width()//2, 200))
+    
+    message2 = font.render("現在のデータはすべてリセットされます", True, (255, 0, 0))
+    screen.blit(message2, (WINDOW_WIDTH//2 - message2.get_width()//2, 230))
+    
+    # ボタン
+    confirm_button = pygame.Rect(WINDOW_WIDTH//2 - 150, 280, 120, 40)
+    pygame.draw.rect(screen, (255, 100, 100), confirm_button)
+    pygame.draw.rect(screen, (200, 50, 50), confirm_button, 2)
+    confirm_text = font.render("作成", True, (0, 0, 0))
+    confirm_text_rect = confirm_text.get_rect(center=confirm_button.center)
+    screen.blit(confirm_text, confirm_text_rect)
+    
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 + 30, 280, 120, 40)
+    pygame.draw.rect(screen, (200, 200, 200), cancel_button)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button, 2)
+    cancel_text = font.render("キャンセル", True, (0, 0, 0))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    pygame.display.flip()
+    
+    # 選択処理
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                if confirm_button.collidepoint(mouse_pos):
+                    return True
+                elif cancel_button.collidepoint(mouse_pos):
+                    return False
+    
+    return False
+
+def show_confirm_delete_message(screen, font, data_name):
+    """削除確認メッセージを表示"""
+    screen.fill((30, 60, 80))
+    
+    # タイトル
+    title_text = font.render("削除確認", True, (255, 255, 255))
+    screen.blit(title_text, (WINDOW_WIDTH//2 - title_text.get_width()//2, 200))
+    
+    # メッセージ
+    message_font = get_japanese_font(24)
+    message_text = message_font.render(f"学習データ '{data_name}' を削除しますか？", True, (255, 255, 255))
+    screen.blit(message_text, (WINDOW_WIDTH//2 - message_text.get_width()//2, 250))
+    
+    warning_text = message_font.render("この操作は取り消せません", True, (255, 200, 200))
+    screen.blit(warning_text, (WINDOW_WIDTH//2 - warning_text.get_width()//2, 290))
+    
+    # ボタン
+    button_font = get_japanese_font(20)
+    
+    # 削除ボタン
+    delete_button = pygame.Rect(WINDOW_WIDTH//2 - 200, 350, 150, 50)
+    pygame.draw.rect(screen, (200, 50, 50), delete_button)
+    pygame.draw.rect(screen, (255, 255, 255), delete_button, 2)
+    delete_text = button_font.render("削除", True, (255, 255, 255))
+    delete_text_rect = delete_text.get_rect(center=delete_button.center)
+    screen.blit(delete_text, delete_text_rect)
+    
+    # キャンセルボタン
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 + 50, 350, 150, 50)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button)
+    pygame.draw.rect(screen, (255, 255, 255), cancel_button, 2)
+    cancel_text = button_font.render("キャンセル", True, (255, 255, 255))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    pygame.display.flip()
+    
+    # ユーザー入力を待つ
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_pos = pygame.mouse.get_pos()
+                if delete_button.collidepoint(mouse_pos):
+                    return True
+                elif cancel_button.collidepoint(mouse_pos):
+                    return False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return False
+                elif event.key == pygame.K_RETURN:
+                    return True
+
+def show_confirm_overwrite_message(screen, font, data_name):
+    """上書き確認メッセージを表示"""
+    screen.fill((30, 60, 80))
+    
+    # タイトル
+    title_text = font.render("上書き確認", True, (255, 255, 255))
+    screen.blit(title_text, (WINDOW_WIDTH//2 - title_text.get_width()//2, 200))
+    
+    # メッセージ
+    message_font = get_japanese_font(24)
+    message_text = message_font.render(f"学習データ '{data_name}' を上書きしますか？", True, (255, 255, 255))
+    screen.blit(message_text, (WINDOW_WIDTH//2 - message_text.get_width()//2, 250))
+    
+    warning_text = message_font.render("既存のデータは失われます", True, (255, 200, 200))
+    screen.blit(warning_text, (WINDOW_WIDTH//2 - warning_text.get_width()//2, 290))
+    
+    # ボタン
+    button_font = get_japanese_font(20)
+    
+    # 上書きボタン
+    overwrite_button = pygame.Rect(WINDOW_WIDTH//2 - 200, 350, 150, 50)
+    pygame.draw.rect(screen, (200, 150, 50), overwrite_button)
+    pygame.draw.rect(screen, (255, 255, 255), overwrite_button, 2)
+    overwrite_text = button_font.render("上書き", True, (255, 255, 255))
+    overwrite_text_rect = overwrite_text.get_rect(center=overwrite_button.center)
+    screen.blit(overwrite_text, overwrite_text_rect)
+    
+    # キャンセルボタン
+    cancel_button = pygame.Rect(WINDOW_WIDTH//2 + 50, 350, 150, 50)
+    pygame.draw.rect(screen, (100, 100, 100), cancel_button)
+    pygame.draw.rect(screen, (255, 255, 255), cancel_button, 2)
+    cancel_text = button_font.render("キャンセル", True, (255, 255, 255))
+    cancel_text_rect = cancel_text.get_rect(center=cancel_button.center)
+    screen.blit(cancel_text, cancel_text_rect)
+    
+    pygame.display.flip()
+    
+    # ユーザー入力を待つ
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_pos = pygame.mouse.get_pos()
+                if overwrite_button.collidepoint(mouse_pos):
+                    return True
+                elif cancel_button.collidepoint(mouse_pos):
+                    return False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return False
+                elif event.key == pygame.K_RETURN:
+                    return True
+
+def show_overwrite_complete_message(screen, font, data_name):
+    """上書き完了メッセージを表示"""
+    screen.fill((30, 60, 80))
+    
+    # タイトル
+    title_text = font.render("上書き完了", True, (255, 255, 255))
+    screen.blit(title_text, (WINDOW_WIDTH//2 - title_text.get_width()//2, 200))
+    
+    # メッセージ
+    message_font = get_japanese_font(24)
+    message_text = message_font.render(f"学習データ '{data_name}' を上書き保存しました", True, (255, 255, 255))
+    screen.blit(message_text, (WINDOW_WIDTH//2 - message_text.get_width()//2, 250))
+    
+    # ボタン
+    button_font = get_japanese_font(20)
+    ok_button = pygame.Rect(WINDOW_WIDTH//2 - 100, 350, 200, 50)
+    pygame.draw.rect(screen, (50, 200, 50), ok_button)
+    pygame.draw.rect(screen, (255, 255, 255), ok_button, 2)
+    ok_text = button_font.render("OK", True, (255, 255, 255))
+    ok_text_rect = ok_text.get_rect(center=ok_button.center)
+    screen.blit(ok_text, ok_text_rect)
+    
+    pygame.display.flip()
+    
+    # ユーザー入力を待つ
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_pos = pygame.mouse.get_pos()
+                if ok_button.collidepoint(mouse_pos):
+                    return
+            elif event.type == pygame.KEYDOWN:
+                if event.key in [pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_SPACE]:
+                    return
+
+def show_no_saved_data_message(screen, font):
+    """保存済みデータなしメッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("保存済みデータなし", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 200))
+    
+    message = font.render("保存済みの学習データが見つかりません", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 250))
+    
+    help_text = font.render("任意のキーで続行", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 320))
+    
+    pygame.display.flip()
+    
+    # キー入力待ち
+    waiting = True
+    while waiting:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.KEYDOWN:
+                return
+
+def show_load_complete_message(screen, font, data_name):
+    """読み込み完了メッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("読み込み完了", True, (0, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 200))
+    
+    message = font.render(f"学習データ '{data_name}' を読み込みました", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 250))
+    
+    help_text = font.render("任意のキーで続行", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 320))
+    
+    pygame.display.flip()
+    
+    # キー入力待ち
+    waiting = True
+    while waiting:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.KEYDOWN:
+                return
+
+def show_load_error_message(screen, font, error_message):
+    """読み込みエラーメッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("読み込みエラー", True, (255, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 200))
+    
+    message = font.render(f"学習データの読み込みに失敗しました: {error_message}", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 250))
+    
+    help_text = font.render("任意のキーで続行", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 320))
+    
+    pygame.display.flip()
+    
+    # キー入力待ち
+    waiting = True
+    while waiting:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.KEYDOWN:
+                return
+
+def show_save_error_message(screen, font, error_message):
+    """保存エラーメッセージを表示"""
+    WINDOW_WIDTH = 1200
+    WINDOW_HEIGHT = 800
+    WHITE = (255, 255, 255)
+    
+    screen.fill(WHITE)
+    title = font.render("保存エラー", True, (255, 0, 0))
+    screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, 200))
+    
+    message = font.render(f"学習データの保存に失敗しました: {error_message}", True, (0, 0, 0))
+    screen.blit(message, (WINDOW_WIDTH//2 - message.get_width()//2, 250))
+    
+    help_text = font.render("任意のキーで続行", True, (100, 100, 100))
+    screen.blit(help_text, (WINDOW_WIDTH//2 - help_text.get_width()//2, 320))
+    
+    pygame.display.flip()
+    
+    # キー入力待ち
+    waiting = True
+    while waiting:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            elif event.type == pygame.KEYDOWN:
+                return
+
+def get_japanese_font(size):
+    """日本語フォントを取得"""
+    try:
+        return pygame.font.Font("C:/Windows/Fonts/meiryo.ttc", size)
+    except:
+        try:
+            return pygame.font.Font("C:/Windows/Fonts/msgothic.ttc", size)
+        except:
+            return pygame.font.SysFont(None, size) 
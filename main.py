@@ -9,15 +9,20 @@ from typing import Optional
 from datetime import datetime
 from collections import deque
 import math
+from time import perf_counter_ns
 
 # 定数とフォントをインポート
 from constants import *
 
 # 他のモジュールをインポート
 from game_logic import OthelloGame
+from ai_worker import AIWorker, AI_MOVE_EVENT
 from ai_learning import (
     LearningHistory, LearningLogger, save_qtable, load_qtable,
-    save_learning_data, create_new_learning_data, load_learning_data, 
+    QTableLoader, get_qtable_stamp
+)
+from learning_dialogs import (
+    save_learning_data, create_new_learning_data, load_learning_data,
     confirm_delete_learning_data, overwrite_learning_data
 )
 from ui_components import (
@@ -28,9 +33,18 @@ from ui_components import (
     draw_learning_graphs, draw_reset_button, draw_back_button,
     draw_enhanced_button, draw_gradient_background, draw_decorative_elements,
     draw_quick_stats, draw_learning_data_screen, draw_battle_history_list,
-    draw_ai_stats
+    draw_ai_stats, draw_ai_thinking_indicator, draw_qtable_loading_progress,
+    draw_instrumentation_overlay
 )
 from settings import settings_screen
+import instrumentation
+from instrumentation import PHASE_GAME_OVER
+from profiling import GameWindowProfiler
+from metrics import exporter_from_env
+from game_records import GameRecordStore
+
+# ウィンドウを作成（constants のインポート時には作成されない）
+screen = init_display()
 
 # グローバル変数
 ai_learn_count = 0
@@ -56,6 +70,7 @@ show_learning_progress = True  # 左側の学習進捗表示制御
 
 # AI設定変数
 ai_speed = 60
+ai_think_time = 200  # AIの1手あたりの思考時間（ミリ秒、0なら探索せずQ値だけで打つ）
 pretrain_total = 10
 fast_mode = True
 draw_mode = True
@@ -64,6 +79,8 @@ DEBUG_MODE = False
 # 訓練関連変数
 pretrain_in_progress = False
 pretrain_now = 0
+# 事前学習中に P キーを押すと、次の局からこの局数だけプロファイルを取る
+pretrain_profiler = GameWindowProfiler(games=10)
 
 # 画面サイズ変数（グローバル宣言）
 WINDOW_WIDTH = 1200
@@ -73,12 +90,23 @@ WINDOW_HEIGHT = 800
 learning_history = LearningHistory(max_history=50)
 learning_logger = LearningLogger()
 
-# Qテーブル
-qtable = load_qtable()
+# Qテーブル（起動を待たせないようにバックグラウンドで読み込み、読み込み完了まではAIはランダムに打つ）
+qtable = {}
+qtable_loader = QTableLoader().start()
+# メモリ上のQテーブルが qtable.pkl と同期しているか、同期した時点のファイルの (更新時刻, サイズ)
+qtable_synced = False
+qtable_stamp = None
 
 # ゲームオブジェクト
 game = OthelloGame()
 
+# 対局記録（最初の対局が終わった時に開く）と、最後に記録した対局
+game_records = None
+recorded_game = None
+
+# AIの手を別スレッドで計算するワーカー
+ai_worker = AIWorker()
+
 # フォント
 font = get_japanese_font(36)
 small_font = get_japanese_font(24)
@@ -88,10 +116,10 @@ def main_loop():
     global current_mode, game, qtable, ai_learn_count, game_count, move_count, last_move_count
     global win_black, win_white, ai_total_reward, ai_avg_reward, ai_win_count, ai_lose_count, ai_draw_count
     global pretrain_in_progress, pretrain_now, learning_history, learning_logger
-    global ai_speed, pretrain_total, fast_mode, draw_mode, DEBUG_MODE
+    global ai_speed, ai_think_time, pretrain_total, fast_mode, draw_mode, DEBUG_MODE
     global show_new_game_message, new_game_message_start_time
     global data_view_mode, battle_history_mode, show_left_graphs, show_learning_progress
-    global WINDOW_WIDTH, WINDOW_HEIGHT
+    global WINDOW_WIDTH, WINDOW_HEIGHT, qtable_synced
 
     while True:
         # モード選択画面を表示し、current_modeがセットされるまでループ
@@ -129,6 +157,9 @@ def main_loop():
             if event.type == pygame.QUIT:
                 running = False
 
+            if event.type == AI_MOVE_EVENT:
+                apply_ai_move_result(event)
+
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_l:
                     show_learning_progress = not show_learning_progress
@@ -155,6 +186,9 @@ def main_loop():
                         continue
                     # ボタンのクリック判定
                     if mouse_down:
+                        # 学習データの保存・読み込みは読み込み済みのQテーブルに対して行う
+                        if any(button.collidepoint(mouse_pos) for button in (save_button, overwrite_button, load_button, new_button)):
+                            wait_for_qtable(screen)
                         if save_button.collidepoint(mouse_pos):
                             save_learning_data(qtable, learning_history, screen, font)
                         elif overwrite_button.collidepoint(mouse_pos):
@@ -162,9 +196,11 @@ def main_loop():
                         elif load_button.collidepoint(mouse_pos):
                             result = load_learning_data(qtable, learning_history, screen, font)
                             if result:
+                                qtable_synced = False
                                 game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward = result
                         elif new_button.collidepoint(mouse_pos):
                             create_new_learning_data(qtable, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward, screen, font)
+                            qtable_synced = False
                         elif delete_button.collidepoint(mouse_pos):
                             confirm_delete_learning_data(screen, font)
                         elif back_button.collidepoint(mouse_pos):
@@ -224,9 +260,11 @@ def main_loop():
                     pretrain_now = 0
                     pretrain_total = 10
                     ai_speed = 60
+                    ai_think_time = 200
                     fast_mode = True
                     draw_mode = True
                     DEBUG_MODE = False
+                    instrumentation.set_enabled(instrumentation.ENV_ENABLED)
                     win_black = 0
                     win_white = 0
                     game = OthelloGame()
@@ -261,26 +299,15 @@ def main_loop():
                     progress_btn_rect = draw_learning_graphs(screen, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_avg_reward, qtable, show_learning_progress)
                 pygame.display.flip()
         
-        # AIの手番は自動で進める
+        # AIの手番は自動で進める（思考はワーカースレッドで行い、結果はAI_MOVE_EVENTで受け取る）
         if game.current_player == PLAYER_WHITE and not show_new_game_message and not game.game_over:
             # AIに有効な手があるかチェック
             if game.get_valid_moves(PLAYER_WHITE):
-                result = game.ai_qlearning_move(qtable, learn=True, player=PLAYER_WHITE, ai_learn_count=ai_learn_count)
-                if result:  # 手を打った場合
-                    reward = game.ai_last_reward
-                    ai_learn_count += 1
-                    ai_total_reward += reward
-                    ai_avg_reward = ai_total_reward / ai_learn_count if ai_learn_count > 0 else 0
-                    # デバッグ出力
-                    if DEBUG_MODE:
-                        print(f"白の手: 報酬={reward}, 累積報酬={ai_total_reward}, 平均報酬={ai_avg_reward:.2f}, 学習回数={ai_learn_count}")
-                    game.switch_player()
-                    game.check_game_over()
-                else:
-                    # AIに有効な手がない場合はパス
-                    game.message = "AI（白）はパスしました。"
-                    game.switch_player()
-                    game.check_game_over()
+                if not ai_worker.has_pending(game):
+                    # Qテーブルの読み込みが終わっていなければ学習せずにランダムに打つ
+                    ai_qtable = qtable if poll_qtable_loader() else None
+                    ai_worker.request_move(game, ai_qtable, player=PLAYER_WHITE, ai_learn_count=ai_learn_count,
+                                           think_time_ms=ai_think_time)
             else:
                 # AIに有効な手がない場合はパス
                 game.message = "AI（白）はパスしました。"
@@ -294,6 +321,12 @@ def main_loop():
                 game.message = "黒は置ける場所がないためパスしました。"
                 game.switch_player()
                 game.check_game_over()
+            elif poll_qtable_loader():
+                # 人間が考えている間にAIの応手を先読みしておく（同じ局面では1回だけ）
+                ai_worker.ponder(game, qtable, ai_player=PLAYER_WHITE, think_time_ms=ai_think_time)
+
+        if game.game_over:
+            record_game(game, "human_vs_ai")
 
         update_learning_stats()
         
@@ -315,6 +348,12 @@ def main_loop():
             draw_back_button(screen, font, (0, 0), False)
             if show_left_graphs:
                 progress_btn_rect = draw_learning_graphs(screen, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_avg_reward, qtable, show_learning_progress)
+            if ai_worker.has_pending(game):
+                draw_ai_thinking_indicator(screen, ai_worker.get_elapsed_ms(), animation_time)
+            if not poll_qtable_loader():
+                draw_qtable_loading_progress(screen, qtable_loader.get_progress(), BOARD_OFFSET_X + BOARD_PIXEL_SIZE + 20, BOARD_OFFSET_Y + 50, 180)
+            if DEBUG_MODE and instrumentation.enabled:
+                draw_instrumentation_overlay(screen, instrumentation.format_summary())
         
         # 統計情報を描画（学習データ・対戦記録表示モード以外の場合のみ）
         if not data_view_mode and not battle_history_mode:
@@ -323,14 +362,17 @@ def main_loop():
         pygame.display.flip()
         clock.tick(60)
     
+    ai_worker.shutdown()
+    if game_records is not None:
+        game_records.close()
     pygame.quit()
     sys.exit()
 
 def mode_select_screen(screen, font):
     """モード選択画面"""
-    global current_mode, pretrain_total, DEBUG_MODE, ai_speed, draw_mode, data_view_mode, battle_history_mode
+    global current_mode, pretrain_total, DEBUG_MODE, ai_speed, ai_think_time, draw_mode, data_view_mode, battle_history_mode
     global ai_learn_count, game_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward
-    global WINDOW_WIDTH, WINDOW_HEIGHT
+    global WINDOW_WIDTH, WINDOW_HEIGHT, qtable_synced
     selecting = True
     input_mode = False
     speed_input_mode = False
@@ -406,6 +448,9 @@ def mode_select_screen(screen, font):
                 screen, font, learning_history, qtable, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_avg_reward, False)
             # ボタンのクリック判定
             if mouse_down:
+                # 学習データの保存・読み込みは読み込み済みのQテーブルに対して行う
+                if any(button.collidepoint(mouse_pos) for button in (save_button, overwrite_button, load_button, new_button)):
+                    wait_for_qtable(screen)
                 if save_button.collidepoint(mouse_pos):
                     save_learning_data(qtable, learning_history, screen, font)
                 elif overwrite_button.collidepoint(mouse_pos):
@@ -413,9 +458,11 @@ def mode_select_screen(screen, font):
                 elif load_button.collidepoint(mouse_pos):
                     result = load_learning_data(qtable, learning_history, screen, font)
                     if result:
+                        qtable_synced = False
                         game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward = result
                 elif new_button.collidepoint(mouse_pos):
                     create_new_learning_data(qtable, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_total_reward, ai_avg_reward, screen, font)
+                    qtable_synced = False
                 elif delete_button.collidepoint(mouse_pos):
                     confirm_delete_learning_data(screen, font)
                 elif back_button.collidepoint(mouse_pos):
@@ -472,15 +519,24 @@ def mode_select_screen(screen, font):
         # 統計情報を描画（右側に表示）
         draw_quick_stats(screen, animation_time, ai_learn_count, game_count)
         
+        # Qテーブルのバックグラウンド読み込みの進捗
+        if not poll_qtable_loader():
+            draw_qtable_loading_progress(screen, qtable_loader.get_progress(), button_x, WINDOW_HEIGHT - 60, button_width,
+                                         qtable_loader.loaded_bytes, qtable_loader.total_bytes)
+        
         # 設定ボタンを追加
         settings_button_y = button_y_start + button_spacing * 4
         if draw_enhanced_button(screen, button_x, settings_button_y, button_width, button_height, 
                               "設定", "⚙️", "AIや学習の各種設定を変更できます", 
                               (180, 180, 180, 150), (220, 220, 220, 150), mouse_pos, mouse_down, font, animation_time):  # 半透明に
-            result = settings_screen(screen, font, DEBUG_MODE, ai_speed, draw_mode, pretrain_total)
+            result = settings_screen(screen, font, DEBUG_MODE, ai_speed, draw_mode, pretrain_total, ai_think_time)
             if isinstance(result, tuple) and len(result) >= 9:
                 # 設定画面から戻った場合、値をグローバル変数に反映
                 DEBUG_MODE, ai_speed, draw_mode, new_pretrain_total, fast_mode, draw_mode, DEBUG_MODE, new_width, new_height = result[:9]
+                if len(result) >= 10:
+                    ai_think_time = result[9]
+                # デバッグモードの間はフェーズ別の時間も計測する
+                instrumentation.set_enabled(DEBUG_MODE or instrumentation.ENV_ENABLED)
                 
                 print(f"main.py: 設定画面から受け取った値 - new_pretrain_total: {new_pretrain_total}")
                 print(f"main.py: 現在のグローバル変数 - pretrain_total: {pretrain_total}")
@@ -582,15 +638,7 @@ def handle_mouse_click(pos):
                     
                     pygame.display.flip()
                 
-                # AIの手番
-                if game.current_player == PLAYER_WHITE:
-                    result = game.ai_qlearning_move(qtable, learn=True, player=PLAYER_WHITE, ai_learn_count=ai_learn_count)
-                    if result:  # 手を打った場合
-                        reward = game.ai_last_reward
-                        ai_learn_count += 1
-                        ai_total_reward += reward
-                        ai_avg_reward = ai_total_reward / ai_learn_count if ai_learn_count > 0 else 0
-                    game.switch_player()
+                # AIの手番はメインループからワーカーに依頼される
             else:
                 # 無効な手を打った場合のエラーメッセージ
                 game.message = "そこには置けません。"
@@ -598,8 +646,81 @@ def handle_mouse_click(pos):
                 game.error_message = "無効な手です"
                 game.error_start_time = pygame.time.get_ticks()
 
+def poll_qtable_loader():
+    """バックグラウンド読み込みが終わっていればQテーブルを差し替える（読み込み済みなら True）"""
+    global qtable, qtable_loader, qtable_synced, qtable_stamp
+    if qtable_loader is None:
+        return True
+    if not qtable_loader.done:
+        return False
+    qtable = qtable_loader.qtable
+    qtable_stamp = qtable_loader.stamp
+    qtable_synced = True
+    qtable_loader = None
+    if DEBUG_MODE:
+        print(f"Qテーブルの読み込み完了: {len(qtable)}件")
+    return True
+
+def wait_for_qtable(screen):
+    """Qテーブルの読み込みが終わるまで進捗を表示して待つ"""
+    clock = pygame.time.Clock()
+    while not poll_qtable_loader():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == AI_MOVE_EVENT:
+                apply_ai_move_result(event)
+        screen.fill((30, 60, 80))
+        bar_width = 400
+        draw_qtable_loading_progress(screen, qtable_loader.get_progress(), (WINDOW_WIDTH - bar_width) // 2, WINDOW_HEIGHT // 2 - 20, bar_width,
+                                     qtable_loader.loaded_bytes, qtable_loader.total_bytes)
+        pygame.display.flip()
+        clock.tick(30)
+
+def apply_ai_move_result(event):
+    """AIワーカーが決めた手を現在のゲームに反映"""
+    global ai_learn_count, ai_total_reward, ai_avg_reward
+    think_ms = ai_worker.get_elapsed_ms()
+    if ai_worker.accept_result(event, game) is None:
+        return  # リセット等で古くなった結果は捨てる
+    if event.moved:  # 手を打った場合
+        r, c = event.move
+        game.make_move(r, c, event.player)
+        game.ai_last_reward = event.reward
+        game.last_ai_move = event.move
+        game.message = event.message
+        if event.learned:  # Qテーブル読み込み中のランダムな手は学習回数に数えない
+            reward = event.reward
+            ai_learn_count += 1
+            ai_total_reward += reward
+            ai_avg_reward = ai_total_reward / ai_learn_count if ai_learn_count > 0 else 0
+            # デバッグ出力
+            if DEBUG_MODE:
+                print(f"白の手: 報酬={reward}, 累積報酬={ai_total_reward}, 平均報酬={ai_avg_reward:.2f}, 学習回数={ai_learn_count}, 思考時間={think_ms}ms, 探索深さ={event.depth}, 先読み{'的中' if event.pondered else 'なし'}"
+                      f" (的中{ai_worker.ponder_hits}/外れ{ai_worker.ponder_misses})")
+    else:
+        # AIに有効な手がない場合はパス
+        game.message = "AI（白）はパスしました。"
+    game.switch_player()
+    game.check_game_over()
+
+def record_game(game_obj, game_type):
+    """対局を対局記録に追記する（同じ対局は1回だけ）"""
+    global game_records, recorded_game
+    if recorded_game is game_obj or not game_obj.move_history:
+        return
+    recorded_game = game_obj
+    try:
+        if game_records is None:
+            game_records = GameRecordStore()
+        game_records.append_game(game_obj, game_type)
+    except (OSError, ValueError) as e:
+        print(f"対局記録の保存エラー: {e}")
+
 def reset_game():
     global game, move_count, last_move_count, show_new_game_message
+    ai_worker.cancel()
     game = OthelloGame()
     move_count = 0
     last_move_count = 0
@@ -623,6 +744,7 @@ def run_pretrain_mode(screen, font):
     global win_black, win_white, ai_win_count, ai_lose_count, ai_draw_count
     global ai_learn_count, ai_total_reward, ai_avg_reward, game_count, move_count, last_move_count
     global qtable, game, learning_history, draw_mode, WINDOW_WIDTH, WINDOW_HEIGHT
+    global qtable_synced, qtable_stamp
 
     print(f"run_pretrain_mode: 開始 - 訓練回数: {pretrain_total}")
     
@@ -639,8 +761,15 @@ def run_pretrain_mode(screen, font):
     game_count = 1
     move_count = 0
     last_move_count = 0
-    qtable = load_qtable()
+    # メモリ上のQテーブルが qtable.pkl と同期していて、ファイルも変わっていなければ読み直さない
+    wait_for_qtable(screen)
+    if not qtable_synced or get_qtable_stamp() != qtable_stamp:
+        qtable = load_qtable()
+        qtable_stamp = get_qtable_stamp()
+        qtable_synced = True
     game = OthelloGame()
+    # 環境変数 OTHELLO_METRICS_FILE / OTHELLO_METRICS_PORT があれば進み具合をメトリクスとして出す
+    metrics_exporter = exporter_from_env("pretrain")
 
     clock = pygame.time.Clock()
     running = True
@@ -664,6 +793,8 @@ def run_pretrain_mode(screen, font):
                 if event.key == pygame.K_ESCAPE:
                     running = False
                     break
+                elif event.key == pygame.K_p:
+                    pretrain_profiler.request()
         
         if not running:
             break
@@ -765,11 +896,21 @@ def run_pretrain_mode(screen, font):
                 qtable_text = stats_font.render(f"Qテーブルサイズ: {len(qtable)}", True, (255, 255, 255))
                 screen.blit(avg_reward_text, (bar_x + 20, stats_y + 120))
                 screen.blit(qtable_text, (bar_x + 20, stats_y + 150))
+            
+            # プロファイルの状態（P キーで予約）
+            if pretrain_profiler.active:
+                profile_text = stats_font.render(f"プロファイル中: {pretrain_profiler.profiled_games}/{pretrain_profiler.games}局", True, (255, 220, 120))
+            elif pretrain_profiler.requested:
+                profile_text = stats_font.render("プロファイル: 次の局から開始", True, (255, 220, 120))
+            else:
+                profile_text = stats_font.render("P キー: プロファイルを取る", True, (200, 200, 200))
+            screen.blit(profile_text, (bar_x + 20, stats_y + 180))
         
         pygame.display.flip()
         clock.tick(30)  # フレームレートを30FPSに下げて描画を安定化
 
         # 1ゲーム分AI同士で自動対戦
+        pretrain_profiler.on_game_start()
         game = OthelloGame()
         move_count = 0
         game_move_count = 0  # ゲーム内の手数カウンター
@@ -785,6 +926,8 @@ def run_pretrain_mode(screen, font):
                     if event.key == pygame.K_ESCAPE:
                         running = False
                         break
+                    elif event.key == pygame.K_p:
+                        pretrain_profiler.request()
             
             if not running:
                 break
@@ -836,7 +979,12 @@ def run_pretrain_mode(screen, font):
                                 print(f"黒の手: 報酬={reward}, 累積報酬={ai_total_reward}, 平均報酬={ai_avg_reward:.2f}, 学習回数={ai_learn_count}")
                         game.switch_player()
                     
-                    game.check_game_over()
+                    if instrumentation.enabled:
+                        t = perf_counter_ns()
+                        game.check_game_over()
+                        instrumentation.lap(PHASE_GAME_OVER, t)
+                    else:
+                        game.check_game_over()
                     game_move_count += 1
                     
                     # 描画モードONの場合は毎手描画更新
@@ -876,6 +1024,8 @@ def run_pretrain_mode(screen, font):
                         draw_back_button(screen, font, (0, 0), False)
                         if show_left_graphs:
                             progress_btn_rect = draw_learning_graphs(screen, learning_history, game_count, ai_learn_count, ai_win_count, ai_lose_count, ai_draw_count, ai_avg_reward, qtable, show_learning_progress)
+                        if DEBUG_MODE and instrumentation.enabled:
+                            draw_instrumentation_overlay(screen, instrumentation.format_summary())
                         pygame.display.flip()
                         clock.tick(30)
                     # 描画モードOFFの場合は10手ごとに進捗更新
@@ -932,6 +1082,7 @@ def run_pretrain_mode(screen, font):
         else:
             win_black += 1
             ai_draw_count += 1
+        record_game(game, "ai_vs_ai")
         
         # 学習統計更新（改善版）
         update_learning_stats()
@@ -964,13 +1115,28 @@ def run_pretrain_mode(screen, font):
             print(f"勝率: {(win_white / (win_black + win_white)) * 100:.1f}%")
             print(f"Qテーブルサイズ: {len(qtable)}")
             print(f"平均報酬: {ai_avg_reward:.2f}")
+            if instrumentation.enabled:
+                print("フェーズ別の時間:")
+                for line in instrumentation.format_summary():
+                    print(f"  {line}")
             print("=" * 40)
         
         pretrain_now += 1
         game_count += 1
+        pretrain_profiler.on_game_end()
+        if metrics_exporter is not None:
+            metrics_exporter.metrics.update(pretrain_now, ai_learn_count, len(qtable), ai_avg_reward,
+                                            ai_lose_count, ai_win_count, ai_draw_count)
+            metrics_exporter.tick()
     
     # 訓練終了
+    pretrain_profiler.finish()
+    checkpoint_start = time.perf_counter()
     save_qtable(qtable)
+    if metrics_exporter is not None:
+        metrics_exporter.metrics.observe_checkpoint(time.perf_counter() - checkpoint_start)
+        metrics_exporter.close()
+    qtable_stamp = get_qtable_stamp()
     pretrain_in_progress = False
     
     # 終了メッセージ
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""モンテカルロ木探索（MCTS）のAI
+
+UCTで手を選び、学習済みのQ値を progressive bias（訪問回数が少ないうちだけ効く事前知識）として加える。
+プレイアウトはビットボードで行い、葉ごとに batch_size 回まとめて打つ。
+workers > 1 ならプロセスプールで独立した木を並列に育て、根の訪問回数を合算する（ルート並列化）。
+シミュレーション回数か持ち時間で強さと思考時間を調整できる。
+
+使い方（Q値だけで打つAIとの対戦）:
+    python mcts.py --simulations 2000 --games 10
+    python mcts.py --time-ms 500 --workers 4 --use-qtable
+"""
+
+import argparse
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants import *
+from bitboard import board_to_bitboards, get_moves, get_flips, popcount, iter_squares, square_to_move
+
+DEFAULT_SIMULATIONS = 1000
+DEFAULT_EXPLORATION = 1.4
+DEFAULT_PRIOR_WEIGHT = 1.0
+DEFAULT_BATCH_SIZE = 4
+# Q値を -1〜1 の事前知識に変換する時の尺度（勝敗の報酬と同じくらいで飽和する）
+PRIOR_SCALE = REWARD_WIN / 2
+# パスを表すマス番号
+PASS_SQUARE = -1
+
+# ヒューリスティックなプレイアウトで優先する角と、避ける角の斜め隣（Xマス）
+_CORNER_BITS = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+_X_SQUARE_BITS = (1 << 9) | (1 << 14) | (1 << 49) | (1 << 54)
+
+def _opponent(player):
+    return PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+
+def bitboards_to_state_key(p, o, player):
+    """ビットボードから OthelloGame.get_board_state_key() と同じ文字列を作る（Q値を引くため）"""
+    mine, theirs = str(player), str(_opponent(player))
+    return ''.join(mine if p >> sq & 1 else (theirs if o >> sq & 1 else '0') for sq in range(64))
+
+class MCTSNode:
+    """木のノード（p は手番側の石、o は相手の石、wins は直前に打った側から見た勝ち数）"""
+    __slots__ = ("p", "o", "player", "move", "parent", "children", "untried", "visits", "wins", "prior")
+
+    def __init__(self, p, o, player, move=None, parent=None, prior=0.0):
+        self.p = p
+        self.o = o
+        self.player = player
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None  # 初めて訪れた時に作る
+        self.visits = 0
+        self.wins = 0.0
+        self.prior = prior
+
+class MCTSTree:
+    """1本の探索木（プロセスごとに1本ずつ持つ）"""
+    def __init__(self, qtable=None, exploration=DEFAULT_EXPLORATION, prior_weight=DEFAULT_PRIOR_WEIGHT,
+                 rollout_policy="heuristic", batch_size=DEFAULT_BATCH_SIZE, seed=None):
+        self.qtable = qtable
+        self.exploration = exploration
+        self.prior_weight = prior_weight
+        self.rollout = self._rollout_heuristic if rollout_policy == "heuristic" else self._rollout_random
+        self.batch_size = max(1, batch_size)
+        self.rng = random.Random(seed)
+        self.simulations = 0
+
+    def run(self, p, o, player, simulations=None, deadline=None):
+        """根の局面から探索し、根の子の {マス番号: (訪問回数, 勝ち数)} を返す"""
+        root = MCTSNode(p, o, player)
+        self.simulations = 0
+        while True:
+            if simulations is not None and self.simulations >= simulations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._iterate(root)
+        return {child.move: (child.visits, child.wins) for child in root.children}
+
+    def _iterate(self, root):
+        # 選択: 全ての手を試したノードは UCT + progressive bias の値が最大の子へ進む
+        node = root
+        while node.untried is not None and not node.untried and node.children:
+            node = self._select_child(node)
+        # 展開: 未展開の手を1つ子ノードにする
+        if node.untried is None:
+            node.untried = self._make_untried(node)
+        if node.untried:
+            node = self._expand(node)
+        # プレイアウトをまとめて打ち、結果を根まで戻す
+        wins_by_color = {PLAYER_BLACK: 0.0, PLAYER_WHITE: 0.0}
+        for _ in range(self.batch_size):
+            winner = self.rollout(node.p, node.o, node.player)
+            if winner:
+                wins_by_color[winner] += 1.0
+            else:
+                wins_by_color[PLAYER_BLACK] += 0.5
+                wins_by_color[PLAYER_WHITE] += 0.5
+        self.simulations += self.batch_size
+        while node is not None:
+            node.visits += self.batch_size
+            # ノードの勝ち数はこのノードへ打った側（親の手番）から見た値
+            if node.parent is not None:
+                node.wins += wins_by_color[node.parent.player]
+            node = node.parent
+
+    def _select_child(self, node):
+        log_n = math.log(node.visits)
+        c = self.exploration
+        w = self.prior_weight
+        best = None
+        best_value = -float('inf')
+        for child in node.children:
+            n = child.visits
+            value = child.wins / n + c * math.sqrt(log_n / n) + w * child.prior / (n + 1)
+            if value > best_value:
+                best_value = value
+                best = child
+        return best
+
+    def _make_untried(self, node):
+        """打てる手の一覧（事前知識の小さい順に並べ、末尾から展開する）。パスなら PASS_SQUARE だけ"""
+        moves = get_moves(node.p, node.o)
+        if not moves:
+            if not get_moves(node.o, node.p):
+                return []  # 終局
+            return [(0.0, PASS_SQUARE)]
+        squares = list(iter_squares(moves))
+        if self.qtable:
+            state_key = bitboards_to_state_key(node.p, node.o, node.player)
+            get_q = self.qtable.get
+            entries = []
+            for sq in squares:
+                r, c = square_to_move(sq)
+                entries.append((math.tanh(get_q(f"{state_key}_{r}_{c}", 0.0) / PRIOR_SCALE), sq))
+            entries.sort()
+            return entries
+        self.rng.shuffle(squares)
+        return [(0.0, sq) for sq in squares]
+
+    def _expand(self, node):
+        prior, sq = node.untried.pop()
+        if sq == PASS_SQUARE:
+            child = MCTSNode(node.o, node.p, _opponent(node.player), sq, node, prior)
+        else:
+            flips = get_flips(node.p, node.o, sq)
+            child = MCTSNode(node.o ^ flips, node.p | (1 << sq) | flips, _opponent(node.player), sq, node, prior)
+        node.children.append(child)
+        return child
+
+    def _rollout_random(self, p, o, player):
+        """完全にランダムなプレイアウト。勝った色（引き分けは 0）を返す"""
+        rng = self.rng
+        passed = False
+        while True:
+            moves = get_moves(p, o)
+            if not moves:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                sq = rng.choice(list(iter_squares(moves)))
+                flips = get_flips(p, o, sq)
+                p |= (1 << sq) | flips
+                o ^= flips
+            p, o, player = o, p, _opponent(player)
+        return _winner(p, o, player)
+
+    def _rollout_heuristic(self, p, o, player):
+        """角があれば角を取り、Xマスはなるべく避けるプレイアウト"""
+        rng = self.rng
+        passed = False
+        while True:
+            moves = get_moves(p, o)
+            if not moves:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                preferred = moves & _CORNER_BITS
+                if not preferred:
+                    preferred = moves & ~_X_SQUARE_BITS or moves
+                sq = rng.choice(list(iter_squares(preferred)))
+                flips = get_flips(p, o, sq)
+                p |= (1 << sq) | flips
+                o ^= flips
+            p, o, player = o, p, _opponent(player)
+        return _winner(p, o, player)
+
+def _winner(p, o, player):
+    """終局した局面の勝者の色（引き分けは 0）"""
+    diff = popcount(p) - popcount(o)
+    if diff > 0:
+        return player
+    if diff < 0:
+        return _opponent(player)
+    return 0
+
+# プロセスプールの各ワーカーが持つQテーブル（プール作成時に1回だけ渡す）
+_worker_qtable = None
+
+def _init_worker(qtable):
+    global _worker_qtable
+    _worker_qtable = qtable
+
+def _run_tree_in_worker(p, o, player, simulations, deadline_s, options, seed):
+    """ワーカープロセスで1本の木を育てる（持ち時間は残り秒数で受け取る）"""
+    tree = MCTSTree(_worker_qtable, seed=seed, **options)
+    deadline = time.perf_counter() + deadline_s if deadline_s is not None else None
+    return tree.run(p, o, player, simulations, deadline), tree.simulations
+
+class MCTSPlayer:
+    """MCTSで手を決めるAI
+
+    simulations（プレイアウト回数）か time_limit_ms（1手の持ち時間）のどちらか、または両方で探索量を決める。
+    workers > 1 の場合、Qテーブルはプロセスプールを作る時に1回だけ渡すので、
+    Qテーブルを入れ替えたら reset_pool() を呼ぶこと。
+    """
+    def __init__(self, qtable=None, simulations=DEFAULT_SIMULATIONS, time_limit_ms=None,
+                 exploration=DEFAULT_EXPLORATION, prior_weight=DEFAULT_PRIOR_WEIGHT,
+                 rollout_policy="heuristic", batch_size=DEFAULT_BATCH_SIZE, workers=1, seed=None):
+        self.qtable = qtable
+        self.simulations = simulations
+        self.time_limit_ms = time_limit_ms
+        self.options = {
+            "exploration": exploration,
+            "prior_weight": prior_weight,
+            "rollout_policy": rollout_policy,
+            "batch_size": batch_size,
+        }
+        self.workers = max(1, workers)
+        self.rng = random.Random(seed)
+        self.pool = None
+        # 直前の探索の統計（last_visits は根の手ごとの訪問回数、ルート並列化では全ワーカーの合計）
+        self.last_simulations = 0
+        self.last_visits = {}
+        self.elapsed = 0.0
+
+    def choose_move(self, game, player=None):
+        """(行, 列) を返す（打てる手が無ければ None）"""
+        if player is None:
+            player = game.current_player
+        moves = game.get_valid_moves(player)
+        if not moves:
+            return None
+        if len(moves) == 1:
+            return moves[0]
+        p, o = board_to_bitboards(game.board, player)
+        start_time = time.perf_counter()
+        deadline_s = self.time_limit_ms / 1000 if self.time_limit_ms else None
+        simulations = self.simulations or None
+        if simulations is None and deadline_s is None:
+            simulations = DEFAULT_SIMULATIONS
+        if self.workers == 1:
+            tree = MCTSTree(self.qtable, seed=self.rng.getrandbits(32), **self.options)
+            deadline = start_time + deadline_s if deadline_s is not None else None
+            results = [(tree.run(p, o, player, simulations, deadline), tree.simulations)]
+        else:
+            # ルート並列化: シミュレーション回数はワーカーで分け合う
+            per_worker = -(-simulations // self.workers) if simulations is not None else None
+            pool = self._get_pool()
+            futures = [pool.submit(_run_tree_in_worker, p, o, player, per_worker, deadline_s, self.options,
+                                   self.rng.getrandbits(32)) for _ in range(self.workers)]
+            results = [f.result() for f in futures]
+
+        visits = {}
+        for stats, _ in results:
+            for sq, (n, _) in stats.items():
+                visits[sq] = visits.get(sq, 0) + n
+        self.last_simulations = sum(count for _, count in results)
+        self.last_visits = {square_to_move(sq): n for sq, n in visits.items()}
+        self.elapsed = time.perf_counter() - start_time
+        if not visits:
+            return moves[0]
+        return square_to_move(max(visits, key=visits.get))
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.qtable,))
+        return self.pool
+
+    def reset_pool(self):
+        """プロセスプールを作り直す（Qテーブルを入れ替えた後に呼ぶ）"""
+        self.shutdown()
+
+    def shutdown(self):
+        """プロセスプールを終了する"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+def _greedy_q_move(game, qtable, player):
+    """Q値が最大の手（Q値だけで打つ従来のAIから探索率を除いたもの）"""
+    moves = game.get_valid_moves(player)
+    if not moves:
+        return None
+    state_key = game.get_board_state_key()
+    return max(moves, key=lambda m: qtable.get(f"{state_key}_{m[0]}_{m[1]}", 0.0))
+
+def play_match(mcts_player, qtable, games=10, seed=1):
+    """MCTS と Q値だけで打つAIを先手・後手交互に対戦させ、MCTS側の (勝ち, 負け, 引き分け) を返す"""
+    from game_logic import OthelloGame
+    rng = random.Random(seed)
+    wins = losses = draws = 0
+    think_times = []
+    for i in range(games):
+        game = OthelloGame()
+        mcts_color = PLAYER_BLACK if i % 2 == 0 else PLAYER_WHITE
+        player = PLAYER_BLACK
+        passed = False
+        while True:
+            if not game.get_valid_moves(player):
+                if passed:
+                    break
+                passed = True
+                player = _opponent(player)
+                continue
+            passed = False
+            if player == mcts_color:
+                move = mcts_player.choose_move(game, player)
+                think_times.append(mcts_player.elapsed)
+            elif qtable:
+                move = _greedy_q_move(game, qtable, player)
+            else:
+                move = rng.choice(game.get_valid_moves(player))
+            game.apply_move(move[0], move[1], player)
+            player = _opponent(player)
+        black_score, white_score = game.get_score()
+        diff = black_score - white_score if mcts_color == PLAYER_BLACK else white_score - black_score
+        if diff > 0:
+            wins += 1
+        elif diff < 0:
+            losses += 1
+        else:
+            draws += 1
+        print(f"対局{i + 1:3d}: MCTS={'黒' if mcts_color == PLAYER_BLACK else '白'} 石差={diff:+3d}")
+    avg_ms = sum(think_times) / len(think_times) * 1000 if think_times else 0.0
+    print(f"MCTS: {wins}勝 {losses}敗 {draws}分 平均思考時間={avg_ms:.0f}ms "
+          f"(直前の手のシミュレーション数={mcts_player.last_simulations})")
+    return wins, losses, draws
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MCTSのAIとQ値だけで打つAIの対戦")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS, help="1手あたりのプレイアウト回数（0なら持ち時間だけで決める）")
+    parser.add_argument("--time-ms", type=int, default=None, help="1手あたりの持ち時間（ミリ秒）")
+    parser.add_argument("--workers", type=int, default=1, help="並列に木を育てるプロセス数")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="葉ごとにまとめて打つプレイアウト数")
+    parser.add_argument("--rollout", choices=["random", "heuristic"], default="heuristic", help="プレイアウトの打ち方")
+    parser.add_argument("--games", type=int, default=10, help="対局数")
+    parser.add_argument("--seed", type=int, default=1, help="乱数のシード")
+    parser.add_argument("--use-qtable", action="store_true", help="qtable.pkl のQ値を事前知識と対戦相手に使う（無ければ相手はランダム）")
+    args = parser.parse_args()
+
+    qtable = None
+    if args.use_qtable:
+        from ai_learning import load_qtable
+        qtable = load_qtable()
+    player = MCTSPlayer(qtable, simulations=args.simulations, time_limit_ms=args.time_ms,
+                        rollout_policy=args.rollout, batch_size=args.batch_size, workers=args.workers, seed=args.seed)
+    try:
+        play_match(player, qtable, args.games, args.seed)
+    finally:
+        player.shutdown()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""自己対戦学習の進み具合を Prometheus のテキスト形式で出す
+
+対局数・局/秒・Qテーブルの件数・メモリ・平均報酬・色ごとの勝率・Qテーブル保存にかかった時間を
+カウンターとゲージにまとめ、テキストファイルへの定期的な書き出し（一時ファイルから os.replace）か、
+小さなHTTPサーバー（/metrics）で見られるようにする。画面の無い夜間の学習を外から監視するためのもの。
+
+headless_trainer.py では --metrics-file / --metrics-port、事前学習画面では環境変数
+OTHELLO_METRICS_FILE / OTHELLO_METRICS_PORT で有効になる。
+"""
+
+import os
+import sys
+import threading
+import time
+
+ENV_METRICS_FILE = "OTHELLO_METRICS_FILE"
+ENV_METRICS_PORT = "OTHELLO_METRICS_PORT"
+DEFAULT_WRITE_INTERVAL = 10.0  # 秒
+
+def get_rss_bytes():
+    """現在の常駐メモリ（バイト、取れない環境では None）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def get_peak_rss_bytes():
+    """最大常駐メモリ（バイト、取れない環境では None）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux はKB、macOS はバイト
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class TrainingMetrics:
+    """学習ループから update() で値を受け取り、Prometheus 形式で出す"""
+    def __init__(self, mode="selfplay"):
+        self.mode = mode
+        self.start_time = time.time()
+        self.games = 0
+        self.q_updates = 0
+        self.qtable_size = 0
+        self.avg_reward = 0.0
+        self.win_black = 0
+        self.win_white = 0
+        self.draws = 0
+        self.games_per_sec = 0.0
+        self.checkpoints = 0
+        self.checkpoint_seconds_total = 0.0
+        self.last_checkpoint_seconds = 0.0
+        self.evicted_by_reason = {}
+        self._rate_time = time.perf_counter()
+        self._rate_games = 0
+        self._last_write = 0.0
+
+    def update(self, games, q_updates, qtable_size, avg_reward, win_black, win_white, draws):
+        now = time.perf_counter()
+        if now - self._rate_time >= 1.0:
+            # 直近の区間の局/秒（学習が進むと1局の重さが変わるので累計の平均ではなく）
+            self.games_per_sec = (games - self._rate_games) / (now - self._rate_time)
+            self._rate_time = now
+            self._rate_games = games
+        self.games = games
+        self.q_updates = q_updates
+        self.qtable_size = qtable_size
+        self.avg_reward = avg_reward
+        self.win_black = win_black
+        self.win_white = win_white
+        self.draws = draws
+
+    def observe_checkpoint(self, seconds):
+        """Qテーブルの保存にかかった時間を記録する"""
+        self.checkpoints += 1
+        self.checkpoint_seconds_total += seconds
+        self.last_checkpoint_seconds = seconds
+
+    def observe_eviction(self, stats):
+        """Qテーブルの刈り込み（qtable_store.EvictionStats）で消した件数を理由ごとに足す"""
+        for reason, count in stats.by_reason.items():
+            self.evicted_by_reason[reason] = self.evicted_by_reason.get(reason, 0) + count
+
+    def render(self):
+        """Prometheus のテキスト形式の文字列を返す"""
+        label = f'mode="{self.mode}"'
+        finished = self.win_black + self.win_white + self.draws
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for extra, value in samples:
+                labels = label + ("," + extra if extra else "")
+                lines.append(f"{name}{{{labels}}} {value}")
+
+        metric("othello_games_total", "counter", "Self-play games played.", [("", self.games)])
+        metric("othello_q_updates_total", "counter", "Q-value updates.", [("", self.q_updates)])
+        metric("othello_games_per_second", "gauge", "Recent self-play throughput.", [("", f"{self.games_per_sec:.3f}")])
+        metric("othello_qtable_entries", "gauge", "Entries in the Q-table.", [("", self.qtable_size)])
+        metric("othello_avg_reward", "gauge", "Average reward per Q update.", [("", f"{self.avg_reward:.4f}")])
+        metric("othello_wins_total", "counter", "Games won per colour.",
+               [('color="black"', self.win_black), ('color="white"', self.win_white)])
+        metric("othello_draws_total", "counter", "Drawn games.", [("", self.draws)])
+        metric("othello_win_rate", "gauge", "Share of finished games won per colour.",
+               [('color="black"', f"{self.win_black / finished if finished else 0.0:.4f}"),
+                ('color="white"', f"{self.win_white / finished if finished else 0.0:.4f}")])
+        rss = get_rss_bytes()
+        if rss is not None:
+            metric("othello_memory_rss_bytes", "gauge", "Resident memory of the trainer.", [("", rss)])
+        peak = get_peak_rss_bytes()
+        if peak is not None:
+            metric("othello_memory_peak_rss_bytes", "gauge", "Peak resident memory of the trainer.", [("", peak)])
+        metric("othello_checkpoints_total", "counter", "Q-table saves.", [("", self.checkpoints)])
+        metric("othello_checkpoint_seconds_total", "counter", "Time spent saving the Q-table.",
+               [("", f"{self.checkpoint_seconds_total:.6f}")])
+        metric("othello_checkpoint_last_seconds", "gauge", "Duration of the latest Q-table save.",
+               [("", f"{self.last_checkpoint_seconds:.6f}")])
+        if self.evicted_by_reason:
+            metric("othello_qtable_evicted_total", "counter", "Q-table entries evicted per reason.",
+                   [(f'reason="{reason}"', count) for reason, count in self.evicted_by_reason.items()])
+        metric("othello_uptime_seconds", "gauge", "Seconds since training started.",
+               [("", f"{time.time() - self.start_time:.1f}")])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """一時ファイルに書いてから置き換える（読む側が書きかけを見ないように）"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        self._last_write = time.perf_counter()
+
+    def maybe_write(self, path, interval=DEFAULT_WRITE_INTERVAL):
+        """前回から interval 秒以上たっていれば書き出す"""
+        if time.perf_counter() - self._last_write >= interval:
+            self.write(path)
+
+class MetricsServer:
+    """TrainingMetrics を http://127.0.0.1:<port>/metrics で返すHTTPサーバー（デーモンスレッド）"""
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # アクセスのたびに標準エラーに出さない
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class MetricsExporter:
+    """ファイルとHTTPのどちらか（または両方）にまとめて出す"""
+    def __init__(self, metrics, path=None, port=None, interval=DEFAULT_WRITE_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.server = MetricsServer(metrics, port) if port is not None else None
+
+    def tick(self):
+        """学習ループから毎局呼ぶ（ファイルは interval 秒ごとにだけ書く）"""
+        if self.path:
+            self.metrics.maybe_write(self.path, self.interval)
+
+    def close(self):
+        if self.path:
+            self.metrics.write(self.path)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+def exporter_from_env(mode="pretrain"):
+    """環境変数で出力先が指定されていれば MetricsExporter を作る（無ければ None）"""
+    path = os.environ.get(ENV_METRICS_FILE) or None
+    port = os.environ.get(ENV_METRICS_PORT) or None
+    if path is None and port is None:
+        return None
+    try:
+        return MetricsExporter(TrainingMetrics(mode), path, int(port) if port is not None else None)
+    except (OSError, ValueError) as e:
+        print(f"メトリクスの出力を開始できません: {e}")
+        return None
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""対局記録（game_records.bin）を再生してQテーブルを学習する
+
+記録した対局を先頭から順に読み、各手の遷移（行動キー・報酬・次の局面の行動キー）を
+OthelloGame.ai_qlearning_move と同じ報酬で作り直して、Q値の更新をまとめて行う。
+手を選ぶ処理や、毎手の switch_player / check_game_over が無く、盤面の更新はビットボードで行うので、
+自己対戦をやり直すより速く qtable.pkl を作り直したり鍛えたりできる。
+
+- 何周でも回せる（--passes）
+- 遷移をバッファに溜めて混ぜてから更新できる（--shuffle-buffer、0 なら対局の順のまま）
+- 対局IDの範囲を分けて、遷移の作り直しを複数プロセスで行える（--workers）。Q値の更新は親プロセスで順に行う
+
+使い方:
+    python offline_learner.py --rebuild               # 空のQテーブルから作り直して qtable.pkl に保存
+    python offline_learner.py --passes 3 --shuffle-buffer 50000 --workers 4
+"""
+
+import argparse
+import random
+import time
+
+from constants import *
+from bitboard import board_to_bitboards, get_moves, get_flips, popcount, iter_squares
+from game_records import GameRecordStore, PASS_MOVE
+from search import CORNERS, EDGES, STABLE_POSITIONS, CENTER_POSITIONS
+
+DEFAULT_CHUNK_GAMES = 512
+
+def _build_position_bonuses():
+    """マスごとの戦略的報酬を ai_qlearning_move と同じ順に並べたタプル（足す順も同じにして値を一致させる）"""
+    bonuses = []
+    for sq in range(BOARD_SIZE * BOARD_SIZE):
+        move = (sq // BOARD_SIZE, sq % BOARD_SIZE)
+        terms = []
+        if move in CORNERS:
+            terms.append(REWARD_CORNER)
+        if move in EDGES:
+            terms.append(REWARD_EDGE)
+        if move in STABLE_POSITIONS:
+            terms.append(REWARD_STABLE_STONE)
+        if move in CENTER_POSITIONS:
+            terms.append(REWARD_TERRITORY)
+        bonuses.append(tuple(terms))
+    return tuple(bonuses)
+
+POSITION_BONUSES = _build_position_bonuses()
+# 行動キーの後半 "_<行>_<列>"
+KEY_SUFFIXES = tuple(f"_{sq // BOARD_SIZE}_{sq % BOARD_SIZE}" for sq in range(BOARD_SIZE * BOARD_SIZE))
+CELL_CHARS = {PLAYER_BLACK: ord('1'), PLAYER_WHITE: ord('2')}
+
+def _initial_position():
+    from game_logic import OthelloGame
+    board = OthelloGame().board
+    black, white = board_to_bitboards(board, PLAYER_BLACK)
+    cells = bytearray(str(cell).encode()[0] for row in board for cell in row)
+    return black, white, cells
+
+INITIAL_BLACK, INITIAL_WHITE, INITIAL_CELLS = _initial_position()
+
+def game_transitions(moves):
+    """1局の手の列（GameRecord.moves）から遷移のリストを作る
+
+    遷移は (行動キー, 報酬, 次の局面の相手の行動キーのタプル, 相手に手が無い時の値)。
+    ai_qlearning_move(learn=True) が打った手ごとに行う計算を、ビットボードでそのまま再現する。
+    """
+    transitions = []
+    black, white = INITIAL_BLACK, INITIAL_WHITE
+    cells = bytearray(INITIAL_CELLS)
+    player = PLAYER_BLACK
+    for sq in moves:
+        if sq == PASS_MOVE:
+            player = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+            continue
+        if player == PLAYER_BLACK:
+            own, opp = black, white
+        else:
+            own, opp = white, black
+        state_key = cells.decode()
+        flips = get_flips(own, opp, sq)
+        if not flips:
+            break  # 記録が壊れている
+        reward = popcount(flips) * REWARD_FLIP_PER_STONE
+        for bonus in POSITION_BONUSES[sq]:
+            reward += bonus
+        opponent_moves_before = popcount(get_moves(opp, own))
+
+        own |= flips | (1 << sq)
+        opp ^= flips
+        mark = CELL_CHARS[player]
+        cells[sq] = mark
+        for flipped in iter_squares(flips):
+            cells[flipped] = mark
+
+        next_moves = get_moves(opp, own)
+        reward += (opponent_moves_before - popcount(next_moves)) * REWARD_MOBILITY
+        if next_moves:
+            next_state_key = cells.decode()
+            next_keys = tuple(next_state_key + KEY_SUFFIXES[next_sq] for next_sq in iter_squares(next_moves))
+            terminal = 0.0
+        else:
+            # calculate_game_result_reward と同じく、その時点の石の数で勝敗を決める
+            own_count, opp_count = popcount(own), popcount(opp)
+            next_keys = ()
+            terminal = REWARD_WIN if own_count > opp_count else REWARD_LOSE if own_count < opp_count else REWARD_DRAW
+        transitions.append((state_key + KEY_SUFFIXES[sq], reward, next_keys, terminal))
+
+        if player == PLAYER_BLACK:
+            black, white = own, opp
+        else:
+            white, black = own, opp
+        player = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    return transitions
+
+def apply_transitions(qtable, transitions, alpha=ALPHA, gamma=GAMMA):
+    """遷移の順にQ値を更新する（ai_qlearning_move と同じ更新式）"""
+    get = qtable.get
+    for action_key, reward, next_keys, terminal in transitions:
+        if next_keys:
+            max_next_q = max(get(key, 0.0) for key in next_keys)
+        else:
+            max_next_q = terminal
+        current_q = get(action_key, 0.0)
+        qtable[action_key] = current_q + alpha * (reward + gamma * max_next_q - current_q)
+    return len(transitions)
+
+def load_transitions(path, start, stop, game_types=None):
+    """対局ID start〜stop-1 の遷移をまとめて返す（ワーカープロセスで呼ぶ）"""
+    transitions = []
+    with GameRecordStore(path, readonly=True) as store:
+        for record in store.iter_records(start, stop):
+            if game_types is None or record.game_type in game_types:
+                transitions.extend(game_transitions(record.moves))
+    return transitions
+
+class OfflineLearner:
+    """対局記録の遷移でQテーブルを更新する"""
+    def __init__(self, qtable, alpha=ALPHA, gamma=GAMMA, shuffle_buffer=0, seed=None, workers=1,
+                 chunk_games=DEFAULT_CHUNK_GAMES, game_types=None):
+        self.qtable = qtable
+        self.alpha = alpha
+        self.gamma = gamma
+        self.shuffle_buffer = shuffle_buffer
+        self.rng = random.Random(seed)
+        self.workers = workers
+        self.chunk_games = chunk_games
+        self.game_types = game_types
+        self.games = 0
+        self.updates = 0
+
+    def _chunks(self, start, stop):
+        return [(chunk_start, min(chunk_start + self.chunk_games, stop))
+                for chunk_start in range(start, stop, self.chunk_games)]
+
+    def _iter_transition_chunks(self, path, start, stop):
+        """対局IDの範囲を区切り、区切りごとの遷移を順に返す（workers > 1 ならプロセスで並列に作る）"""
+        chunks = self._chunks(start, stop)
+        if self.workers <= 1:
+            for chunk_start, chunk_stop in chunks:
+                yield chunk_stop - chunk_start, load_transitions(path, chunk_start, chunk_stop, self.game_types)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # 先読みはワーカー数の2倍まで（全部を一度に読むとメモリを使い切る）
+            pending = []
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < self.workers * 2:
+                    chunk_start, chunk_stop = chunks[next_chunk]
+                    pending.append((chunk_stop - chunk_start,
+                                    executor.submit(load_transitions, path, chunk_start, chunk_stop, self.game_types)))
+                    next_chunk += 1
+                games, future = pending.pop(0)
+                yield games, future.result()
+
+    def learn(self, path=GAME_RECORDS_PATH, passes=1, start=0, stop=None, on_chunk=None):
+        """対局記録を passes 周再生してQ値を更新し、更新回数を返す
+
+        on_chunk(learner) を区切りごとに呼ぶ（進捗表示用）。
+        """
+        with GameRecordStore(path, readonly=True) as store:
+            stop = len(store) if stop is None else min(stop, len(store))
+        for _ in range(passes):
+            buffer = []
+            for games, transitions in self._iter_transition_chunks(path, start, stop):
+                self.games += games
+                if self.shuffle_buffer > 0:
+                    buffer.extend(transitions)
+                    if len(buffer) >= self.shuffle_buffer:
+                        self._flush(buffer)
+                        buffer = []
+                else:
+                    self.updates += apply_transitions(self.qtable, transitions, self.alpha, self.gamma)
+                if on_chunk is not None:
+                    on_chunk(self)
+            if buffer:
+                self._flush(buffer)
+        return self.updates
+
+    def _flush(self, buffer):
+        self.rng.shuffle(buffer)
+        self.updates += apply_transitions(self.qtable, buffer, self.alpha, self.gamma)
+
+def main():
+    parser = argparse.ArgumentParser(description="対局記録を再生してQテーブルを学習する")
+    parser.add_argument("--records", default=GAME_RECORDS_PATH, help="対局記録のファイル")
+    parser.add_argument("--rebuild", action="store_true", help="qtable.pkl を読まずに空のQテーブルから作る")
+    parser.add_argument("--passes", type=int, default=1, help="対局記録を何周するか")
+    parser.add_argument("--shuffle-buffer", type=int, default=0, help="この数の遷移を溜めて混ぜてから更新する（0なら対局の順）")
+    parser.add_argument("--workers", type=int, default=1, help="遷移を作るプロセス数")
+    parser.add_argument("--start", type=int, default=0, help="この対局IDから")
+    parser.add_argument("--stop", type=int, default=None, help="この対局IDの手前まで")
+    parser.add_argument("--type", choices=["ai_vs_ai", "human_vs_ai", "unknown"], action="append",
+                        help="使う対戦タイプ（省略時は全て、複数指定可）")
+    parser.add_argument("--seed", type=int, default=None, help="混ぜる時の乱数のシード")
+    parser.add_argument("--output", default=QTABLE_PATH, help="保存するQテーブル")
+    args = parser.parse_args()
+
+    from ai_learning import load_qtable, save_qtable_to_file
+    qtable = {} if args.rebuild else load_qtable()
+    initial_size = len(qtable)
+    learner = OfflineLearner(qtable, shuffle_buffer=args.shuffle_buffer, seed=args.seed, workers=args.workers,
+                             game_types=set(args.type) if args.type else None)
+    start_time = time.perf_counter()
+    last_report = [start_time]
+
+    def on_chunk(learner):
+        now = time.perf_counter()
+        if now - last_report[0] >= 5.0:
+            last_report[0] = now
+            print(f"{learner.games}局 {learner.updates}更新 {learner.games / (now - start_time):.0f}局/秒 "
+                  f"Qテーブル={len(qtable)}")
+
+    learner.learn(args.records, args.passes, args.start, args.stop, on_chunk)
+    elapsed = time.perf_counter() - start_time
+    print(f"完了: {learner.games}局 {learner.updates}更新 {elapsed:.1f}秒 "
+          f"({learner.games / elapsed if elapsed > 0 else 0:.0f}局/秒) Qテーブル {initial_size} -> {len(qtable)}")
+
+    save_qtable_to_file(qtable, args.output)
+    print(f"{args.output} に保存しました")
+
+if __name__ == "__main__":
+    main()
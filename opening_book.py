@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Qテーブル（と対局記録）から作る定跡ファイル
+
+序盤の局面ごとの最善手を、盤面で並べた固定長レコードのバイナリファイルにまとめる。
+読む時は mmap して二分探索するので、Qテーブル全体を読み込まずに O(log n) で手を引ける。
+Qテーブルより十分小さいので、別のマシンにも定跡だけを配れる。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー  "OBK1" + レコード数(uint32) + 最大手数(uint32)
+    レコード  黒石のビットボード(uint64) + 白石のビットボード(uint64) + 手のマス番号(uint8) + Q値(float32)
+レコードは (黒石, 白石) の昇順に並ぶ。Qテーブルと同じく手番は持たないので、引いた手は合法か確認してから打つ。
+
+使い方:
+    python opening_book.py build --plies 14     # qtable.pkl から opening_book.obk を作る
+    python opening_book.py build --records game_records.bin   # 対局記録によく現れる局面だけにする
+    python opening_book.py stats                # 定跡の件数などを表示
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from constants import *
+from bitboard import board_to_bitboards, square_to_move, move_to_square
+
+BOOK_MAGIC = b"OBK1"
+HEADER = struct.Struct("<4sII")
+RECORD = struct.Struct("<QQBf")
+
+# 定跡に入れる局面の既定の条件
+DEFAULT_MAX_PLIES = 14   # 初期局面から何手目までの局面を入れるか
+DEFAULT_MIN_TRIED = 2    # Qテーブルで試された手の数がこれ以上の局面だけ（比べる相手がいる局面）
+DEFAULT_MIN_MARGIN = 1.0 # 最善手と次善手のQ値の差がこれ以上の局面だけ
+DEFAULT_MIN_VISITS = 2   # 対局記録を渡した場合、これ以上現れた局面だけ
+
+def state_key_to_bitboards(state_key):
+    """get_board_state_key() の文字列から (黒石, 白石) のビットボードを作る"""
+    black = white = 0
+    for sq, ch in enumerate(state_key):
+        if ch == '1':
+            black |= 1 << sq
+        elif ch == '2':
+            white |= 1 << sq
+    return black, white
+
+def count_position_visits(games, max_plies=DEFAULT_MAX_PLIES):
+    """対局記録（各対局は (手番, 行, 列) の並び）を再生し、序盤の局面ごとの出現回数を数える"""
+    from game_logic import OthelloGame
+    visits = {}
+    for moves in games:
+        game = OthelloGame()
+        for ply, (player, r, c) in enumerate(moves):
+            if ply >= max_plies:
+                break
+            state_key = game.get_board_state_key()
+            visits[state_key] = visits.get(state_key, 0) + 1
+            if not game.apply_move(r, c, player):
+                break  # 記録が壊れている
+    return visits
+
+def select_book_entries(qtable, max_plies=DEFAULT_MAX_PLIES, min_tried=DEFAULT_MIN_TRIED,
+                        min_margin=DEFAULT_MIN_MARGIN, visits=None, min_visits=DEFAULT_MIN_VISITS):
+    """Qテーブルから定跡に入れる {盤面キー: (行, 列, Q値)} を選ぶ
+
+    visits（count_position_visits の結果）を渡すと、対局記録にあまり現れない局面は除く。
+    """
+    max_stones = 4 + max_plies
+    by_state = {}
+    for key, q_value in qtable.items():
+        state_key, r, c = key.rsplit('_', 2)
+        if len(state_key) != BOARD_SIZE * BOARD_SIZE or 64 - state_key.count('0') > max_stones:
+            continue
+        by_state.setdefault(state_key, []).append((q_value, int(r), int(c)))
+
+    entries = {}
+    for state_key, moves in by_state.items():
+        if len(moves) < min_tried:
+            continue
+        if visits is not None and visits.get(state_key, 0) < min_visits:
+            continue
+        moves.sort(reverse=True)
+        best_q, r, c = moves[0]
+        if len(moves) > 1 and best_q - moves[1][0] < min_margin:
+            continue  # どの手が良いかはっきりしない
+        entries[state_key] = (r, c, best_q)
+    return entries
+
+def write_book(entries, path=OPENING_BOOK_PATH, max_plies=DEFAULT_MAX_PLIES):
+    """select_book_entries の結果を盤面順に並べて定跡ファイルに書き、レコード数を返す"""
+    records = []
+    for state_key, (r, c, q_value) in entries.items():
+        black, white = state_key_to_bitboards(state_key)
+        records.append((black, white, move_to_square(r, c), q_value))
+    records.sort()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(BOOK_MAGIC, len(records), max_plies))
+        for record in records:
+            f.write(RECORD.pack(*record))
+    os.replace(tmp_path, path)
+    return len(records)
+
+def build_book(qtable, path=OPENING_BOOK_PATH, max_plies=DEFAULT_MAX_PLIES, min_tried=DEFAULT_MIN_TRIED,
+               min_margin=DEFAULT_MIN_MARGIN, games=None, min_visits=DEFAULT_MIN_VISITS):
+    """Qテーブル（と対局記録 games）から定跡ファイルを作り、レコード数を返す"""
+    visits = count_position_visits(games, max_plies) if games is not None else None
+    entries = select_book_entries(qtable, max_plies, min_tried, min_margin, visits, min_visits)
+    return write_book(entries, path, max_plies)
+
+class OpeningBook:
+    """定跡ファイルを mmap して二分探索で引く"""
+    def __init__(self, path=OPENING_BOOK_PATH):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = None
+        try:
+            header = self.file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"定跡ファイルが短すぎます: {path}")
+            magic, self.count, self.max_plies = HEADER.unpack(header)
+            if magic != BOOK_MAGIC:
+                raise ValueError(f"定跡ファイルではありません: {path}")
+            if os.fstat(self.file.fileno()).st_size < HEADER.size + self.count * RECORD.size:
+                raise ValueError(f"定跡ファイルが壊れています: {path}")
+            if self.count:
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def _record(self, index):
+        return RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+
+    def probe(self, board):
+        """盤面の定跡を (行, 列, Q値) で返す（無ければ None）"""
+        self.probes += 1
+        if not self.count:
+            return None
+        black, white = board_to_bitboards(board, PLAYER_BLACK)
+        target = (black, white)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            if (record[0], record[1]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            record = self._record(lo)
+            if (record[0], record[1]) == target:
+                self.hits += 1
+                r, c = square_to_move(record[2])
+                return r, c, record[3]
+        return None
+
+    def probe_move(self, game, player):
+        """game で player が打つ定跡手を返す（定跡に無いか、その手番では打てない手なら None）"""
+        entry = self.probe(game.board)
+        if entry is None:
+            return None
+        r, c, _ = entry
+        return (r, c) if game.is_valid_move(r, c, player) else None
+
+def load_opening_book(path=OPENING_BOOK_PATH):
+    """定跡ファイルがあれば開いて返す（無いか壊れていれば None）"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError) as e:
+        print(f"定跡ファイルの読み込みエラー: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qテーブルから定跡ファイルを作る")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="qtable.pkl から定跡ファイルを作る")
+    build_parser.add_argument("--plies", type=int, default=DEFAULT_MAX_PLIES, help="初期局面から何手目までを入れるか")
+    build_parser.add_argument("--min-tried", type=int, default=DEFAULT_MIN_TRIED, help="Qテーブルで試された手の数の下限")
+    build_parser.add_argument("--min-margin", type=float, default=DEFAULT_MIN_MARGIN, help="最善手と次善手のQ値の差の下限")
+    build_parser.add_argument("--output", default=OPENING_BOOK_PATH, help="出力する定跡ファイル")
+    build_parser.add_argument("--records", default=None, help="対局記録（game_records.bin）に現れる局面だけを入れる")
+    build_parser.add_argument("--min-visits", type=int, default=DEFAULT_MIN_VISITS, help="対局記録での出現回数の下限")
+    stats_parser = subparsers.add_parser("stats", help="定跡ファイルの内容を表示")
+    stats_parser.add_argument("--book", default=OPENING_BOOK_PATH, help="定跡ファイル")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from ai_learning import load_qtable
+        games = None
+        if args.records:
+            from game_records import GameRecordStore
+            with GameRecordStore(args.records) as store:
+                games = [record.to_move_list() for record in store]
+        count = build_book(load_qtable(), args.output, args.plies, args.min_tried, args.min_margin, games, args.min_visits)
+        print(f"{args.output} に {count} 局面を書き込みました（{os.path.getsize(args.output)} バイト）")
+    else:
+        with OpeningBook(args.book) as book:
+            print(f"{args.book}: {len(book)} 局面, 最大 {book.max_plies} 手目まで, "
+                  f"{os.path.getsize(args.book)} バイト")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""根の手を複数プロセスに分けて読む並列αβ探索（長考・解析用）
+
+根の最初の手（並べ替えで最善と思われる手）だけを先に読んでαを決め、残りの手をプロセスプールで並列に読む。
+各ワーカーは自分用の置換表を持ち、それまでに分かった最善の評価値（α）を共有メモリの Value で共有して
+探索の窓を狭める。
+
+使い方（決まった局面集でのシングルスレッドとの速度比較）:
+    python parallel_search.py --depth 5 --positions 8 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from constants import *
+from game_logic import OthelloGame
+from search import AlphaBetaSearch, make_random_position
+from transposition import TranspositionTable, zobrist_hash, zobrist_update
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# ワーカーごとの置換表のサイズ（MB）
+DEFAULT_WORKER_TT_MB = 16
+
+# ワーカープロセス側の状態（プール作成時に _init_worker で設定する）
+_worker_searcher = None
+_worker_alpha = None
+
+def _init_worker(qtable, shared_alpha, tt_size_mb):
+    global _worker_searcher, _worker_alpha
+    tt = TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None
+    _worker_searcher = AlphaBetaSearch(qtable=qtable, tt=tt)
+    _worker_alpha = shared_alpha
+
+def _search_root_move(board, player, move, depth):
+    """ワーカーで根の手 move を1つ読み、(手, 評価値, ノード数, 正確な値か) を返す
+
+    読み始める時点の共有αを窓の下限にし、αより良い値が出たら共有αを更新する。
+    αを超えない手の評価値は上限値（本当の値はもっと低いかもしれない）なので、正確な値か=False にする。
+    """
+    game = OthelloGame()
+    game.board = [row[:] for row in board]
+    searcher = _worker_searcher
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    r, c = move
+    key = 0
+    if searcher.tt is not None:
+        key = zobrist_hash(game.board, player)
+    flipped = game.apply_move(r, c, player)
+    if searcher.tt is not None:
+        key = zobrist_update(key, r, c, player, flipped)
+    alpha = _worker_alpha.value
+    searcher.nodes = 0
+    score = -searcher._negamax(game, opponent, depth - 1, -float('inf'), -alpha, key)
+    exact = score > alpha
+    if exact:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha.value:
+                _worker_alpha.value = score
+    return move, score, searcher.nodes, exact
+
+class ParallelRootSearch:
+    """根の手をプロセスプールで分担するαβ探索
+
+    プールと共有αは最初の探索時に作り、以後の探索で使い回す。Qテーブルはプール作成時に1回だけ渡すので、
+    入れ替えたら shutdown() してから探索し直すこと。
+    """
+    def __init__(self, depth=4, workers=DEFAULT_WORKERS, qtable=None, tt_size_mb=DEFAULT_WORKER_TT_MB):
+        self.depth = depth
+        self.workers = max(1, workers)
+        self.qtable = qtable
+        self.tt_size_mb = tt_size_mb
+        self.pool = None
+        self.shared_alpha = None
+        # 根の手の並べ替えと最初の手の探索に使う（メインプロセス側）
+        self.searcher = AlphaBetaSearch(qtable=qtable, tt=TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None)
+        # 直前の探索の統計
+        self.nodes = 0
+        self.elapsed = 0.0
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', -float('inf'))
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.qtable, self.shared_alpha, self.tt_size_mb))
+        return self.pool
+
+    def search(self, game, player=None, depth=None):
+        """最善手とその評価値を返す（打てる手が無ければ手は None）"""
+        if player is None:
+            player = game.current_player
+        if depth is None:
+            depth = self.depth
+        start_time = time.perf_counter()
+        moves = game.get_valid_moves(player)
+        if len(moves) <= 1 or depth <= 1:
+            # 分担するほどの手が無いのでそのまま読む
+            result = self.searcher.search(game, player, depth)
+            self.nodes = self.searcher.nodes
+            self.elapsed = time.perf_counter() - start_time
+            return result
+
+        ordered = self.searcher.order_moves(game, moves)
+        pool = self._get_pool()
+        board = [row[:] for row in game.board]
+        with self.shared_alpha.get_lock():
+            self.shared_alpha.value = -float('inf')
+
+        # 最初の手を先に読んで共有αを決める（残りの手はこの値を窓の下限にして読む）
+        best_move, best_score, nodes, _ = pool.submit(_search_root_move, board, player, ordered[0], depth).result()
+        futures = [pool.submit(_search_root_move, board, player, move, depth) for move in ordered[1:]]
+        for future in futures:
+            move, score, move_nodes, exact = future.result()
+            nodes += move_nodes
+            # 上限値は他のワーカーが上げたαより低いだけで、今の最善より良いとは限らない
+            if exact and score > best_score:
+                best_move, best_score = move, score
+        self.nodes = nodes
+        self.elapsed = time.perf_counter() - start_time
+        return best_move, best_score
+
+    def shutdown(self):
+        """プロセスプールを終了する"""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.shared_alpha = None
+
+def make_benchmark_positions(positions=8, seed=1, min_plies=10, max_plies=30):
+    """速度比較に使う決まった局面集（シードが同じなら毎回同じ局面）"""
+    rng = random.Random(seed)
+    result = []
+    while len(result) < positions:
+        game, player = make_random_position(rng, rng.randint(min_plies, max_plies))
+        if len(game.get_valid_moves(player)) >= 2:
+            result.append((game, player))
+    return result
+
+def root_move_value(game, player, move, depth):
+    """根の手 move を窓を狭めずに読んだ評価値（並列探索の選んだ手の検証用）"""
+    game = game.snapshot()
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    game.apply_move(move[0], move[1], player)
+    return -AlphaBetaSearch()._negamax(game, opponent, depth - 1, -float('inf'), float('inf'))
+
+def benchmark_positions(depth=5, positions=8, seed=1, workers=DEFAULT_WORKERS, tt_size_mb=DEFAULT_WORKER_TT_MB):
+    """局面集をシングルスレッドと並列で読み、時間と速度向上率を表示して (シングルの秒数, 並列の秒数) を返す
+
+    評価値に加えて選んだ手も比べる。手が違う時は並列の手を窓を狭めずに読み直し、同じ評価値なら同点の別の手とする。
+    """
+    position_set = make_benchmark_positions(positions, seed)
+
+    single_time = 0.0
+    single_results = []
+    searcher = AlphaBetaSearch(depth=depth, tt=TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None)
+    for game, player in position_set:
+        start_time = time.perf_counter()
+        single_results.append(searcher.search(game, player))
+        single_time += time.perf_counter() - start_time
+
+    parallel = ParallelRootSearch(depth=depth, workers=workers, tt_size_mb=tt_size_mb)
+    try:
+        parallel._get_pool().submit(int).result()  # プロセスの起動時間は計測に含めない
+        parallel_time = 0.0
+        for i, (game, player) in enumerate(position_set):
+            start_time = time.perf_counter()
+            move, score = parallel.search(game, player)
+            parallel_time += time.perf_counter() - start_time
+            single_move, single_score = single_results[i]
+            if score != single_score:
+                same = "評価値が不一致"
+            elif move == single_move:
+                same = "一致"
+            elif root_move_value(game, player, move, depth) == single_score:
+                same = "同点の別の手"
+            else:
+                same = "手が不一致"
+            print(f"局面{i + 1:3d}: 評価値 シングル={single_score:9.1f} 並列={score:9.1f} "
+                  f"手 シングル={single_move} 並列={move} ({same}) 時間={parallel.elapsed:6.2f}秒")
+    finally:
+        parallel.shutdown()
+
+    speedup = single_time / parallel_time if parallel_time > 0 else 0.0
+    print(f"深さ{depth} {positions}局面: シングル={single_time:.2f}秒 並列({workers}プロセス)={parallel_time:.2f}秒 "
+          f"速度向上={speedup:.2f}倍")
+    return single_time, parallel_time
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="並列αβ探索とシングルスレッドの速度比較")
+    parser.add_argument("--depth", type=int, default=5, help="探索の深さ")
+    parser.add_argument("--positions", type=int, default=8, help="計測する局面数")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="ワーカープロセス数")
+    parser.add_argument("--seed", type=int, default=1, help="局面を作る乱数のシード")
+    parser.add_argument("--tt-mb", type=float, default=DEFAULT_WORKER_TT_MB, help="ワーカーごとの置換表のサイズ（MB、0なら使わない）")
+    args = parser.parse_args()
+    benchmark_positions(args.depth, args.positions, args.seed, args.workers, args.tt_mb)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""perft（指定の深さまでの末端局面数を数える）による手生成の速度計測と正しさの確認
+
+パスも1手として数え、両者とも打てない終局した局面はそこで末端として1と数える。
+初期局面の既知の値（PERFT_REFERENCE）と照合し、1秒あたりの局面数を表示する。
+二次元リストの OthelloGame と、ビットボードの実装のどちらでも動かせるので、
+手生成を速くする変更をした時に結果が変わっていないことと、どれだけ速くなったかを確かめられる。
+
+使い方:
+    python perft.py --depth 7                   # 両方の実装で初期局面から深さ7まで
+    python perft.py --depth 6 --backend list    # OthelloGame だけ
+    python perft.py --depth 5 --positions       # テスト局面集で実装同士を比べる
+"""
+
+import argparse
+import random
+import time
+
+from constants import *
+from game_logic import OthelloGame
+from bitboard import board_to_bitboards, get_moves, get_flips, popcount, iter_squares
+
+# 初期局面（黒番）からの深さごとの末端局面数
+PERFT_REFERENCE = {
+    1: 4,
+    2: 12,
+    3: 56,
+    4: 244,
+    5: 1396,
+    6: 8200,
+    7: 55092,
+    8: 390216,
+    9: 3005288,
+    10: 24571284,
+}
+
+# パスを含む手順のテスト局面（get_board_state_key() の形式、白番）と深さごとの末端局面数
+PASS_TEST_POSITION = "0100000010110002112110121111111222121120222122112222211122222222"
+PASS_TEST_REFERENCE = {1: 10, 2: 40, 3: 316, 4: 1455, 5: 9234, 6: 41083}
+
+def perft_list(game, player, depth, passed=False):
+    """OthelloGame（get_valid_moves / apply_move / undo_move）で末端局面数を数える"""
+    if depth == 0:
+        return 1
+    moves = game.get_valid_moves(player)
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    if not moves:
+        if passed:
+            return 1  # 両者とも打てないので終局
+        return perft_list(game, opponent, depth - 1, True)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for r, c in moves:
+        flipped = game.apply_move(r, c, player)
+        nodes += perft_list(game, opponent, depth - 1)
+        game.undo_move(r, c, player, flipped)
+    return nodes
+
+def perft_bitboard(p, o, depth, passed=False):
+    """ビットボード（p は手番側の石、o は相手の石）で末端局面数を数える"""
+    if depth == 0:
+        return 1
+    moves = get_moves(p, o)
+    if not moves:
+        if passed:
+            return 1
+        return perft_bitboard(o, p, depth - 1, True)
+    if depth == 1:
+        return popcount(moves)
+    nodes = 0
+    for sq in iter_squares(moves):
+        flips = get_flips(p, o, sq)
+        nodes += perft_bitboard(o ^ flips, p | (1 << sq) | flips, depth - 1)
+    return nodes
+
+def _run_list(game, player, depth):
+    # 呼び出し元の盤面は書き換えない
+    return perft_list(game.snapshot(), player, depth)
+
+def _run_bitboard(game, player, depth):
+    p, o = board_to_bitboards(game.board, player)
+    return perft_bitboard(p, o, depth)
+
+# 実装名 -> perft を実行する関数 (game, player, depth) -> 末端局面数
+BACKENDS = {
+    "list": _run_list,
+    "bitboard": _run_bitboard,
+}
+
+def run_perft(backend, game, player, depth):
+    """(末端局面数, 秒数) を返す"""
+    start_time = time.perf_counter()
+    nodes = BACKENDS[backend](game, player, depth)
+    return nodes, time.perf_counter() - start_time
+
+def make_test_positions(count=6, seed=7):
+    """実装同士を比べるためのテスト局面集 [(名前, 局面, 手番, 既知の値 or None)]（パスが起きる局面を含む）"""
+    positions = []
+    # 終盤でパスが何度も起きる局面（白番、深さ4で4回パスする）
+    game = OthelloGame()
+    game.board = [[int(PASS_TEST_POSITION[r * BOARD_SIZE + c]) for c in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+    positions.append(("パスあり", game, PLAYER_WHITE, PASS_TEST_REFERENCE))
+    rng = random.Random(seed)
+    while len(positions) < count:
+        game = OthelloGame()
+        player = PLAYER_BLACK
+        for _ in range(rng.randint(6, 40)):
+            moves = game.get_valid_moves(player)
+            opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+            if not moves:
+                if not game.get_valid_moves(opponent):
+                    break
+                player = opponent
+                continue
+            r, c = rng.choice(moves)
+            game.apply_move(r, c, player)
+            player = opponent
+        positions.append((f"ランダム{len(positions)}", game, player, None))
+    return positions
+
+def check_initial(depth, backends):
+    """初期局面から深さ1〜depth を数え、既知の値と違えば False"""
+    ok = True
+    for backend in backends:
+        for d in range(1, depth + 1):
+            nodes, elapsed = run_perft(backend, OthelloGame(), PLAYER_BLACK, d)
+            expected = PERFT_REFERENCE.get(d)
+            status = "OK" if expected is None or nodes == expected else f"NG (正解 {expected})"
+            if expected is not None and nodes != expected:
+                ok = False
+            nps = nodes / elapsed if elapsed > 0 else 0.0
+            print(f"{backend:<9} 深さ{d:2d}: {nodes:10d}局面 {elapsed:7.2f}秒 {nps:11.0f}局面/秒  {status}")
+    return ok
+
+def check_positions(depth, backends):
+    """テスト局面集で実装同士の結果が一致するか（既知の値があればそれとも）確かめ、違えば False"""
+    ok = True
+    for name, game, player, reference in make_test_positions():
+        results = {backend: run_perft(backend, game, player, depth) for backend in backends}
+        counts = {nodes for nodes, _ in results.values()}
+        if reference is not None and depth in reference:
+            counts.add(reference[depth])
+        if len(counts) != 1:
+            ok = False
+        detail = " ".join(f"{backend}={nodes}({elapsed:.2f}秒)" for backend, (nodes, elapsed) in results.items())
+        print(f"{name:<8} 深さ{depth}: {detail}  {'OK' if len(counts) == 1 else 'NG'}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="perftによる手生成の速度計測と正しさの確認")
+    parser.add_argument("--depth", type=int, default=6, help="数える深さ")
+    parser.add_argument("--backend", choices=list(BACKENDS), action="append", help="実装（省略時は全て、複数指定可）")
+    parser.add_argument("--positions", action="store_true", help="初期局面ではなくテスト局面集で実装同士を比べる")
+    args = parser.parse_args()
+
+    backends = args.backend or list(BACKENDS)
+    if args.positions:
+        passed = check_positions(args.depth, backends)
+    else:
+        passed = check_initial(args.depth, backends)
+    if not passed:
+        raise SystemExit(1)
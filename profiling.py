@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""自己対戦学習の途中から指定した局数だけプロファイルを取る
+
+request() で予約すると、次の局の開始から games 局の間 cProfile とスタックのサンプリングを行い、
+    <prefix>_<日時>.pstats     cProfile の結果（python -m pstats や snakeviz で見る）
+    <prefix>_<日時>.collapsed  「関数;関数;関数 サンプル数」形式（flamegraph.pl や speedscope でフレームグラフにする）
+を書き出す。事前学習画面では P キー、headless_trainer.py では SIGUSR1 で予約できるので、
+長い学習を止めずに途中の様子を調べられる。
+
+cProfile は呼び出し元と呼び出し先の組しか持たないので、フレームグラフ用のスタックは
+別スレッドで学習スレッドのスタックを一定間隔で読み取って数える（sys._current_frames）。
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+
+DEFAULT_PROFILE_GAMES = 10
+DEFAULT_SAMPLE_INTERVAL = 0.005  # 秒
+DEFAULT_PREFIX = "profile"
+
+class StackSampler:
+    """別スレッドから対象スレッドのスタックを一定間隔で読み取り、スタックごとの回数を数える"""
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack = ";".join(reversed(names))
+            self.counts[stack] = self.counts.get(stack, 0) + 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+class GameWindowProfiler:
+    """予約されたら次の局から games 局の間だけプロファイルを取る
+
+    学習ループは局の始めに on_game_start()、終わりに on_game_end()、ループを抜けたら finish() を呼ぶ。
+    request() はシグナルハンドラやイベント処理から呼んでよい（フラグを立てるだけ）。
+    """
+    def __init__(self, games=DEFAULT_PROFILE_GAMES, prefix=DEFAULT_PREFIX, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.games = games
+        self.prefix = prefix
+        self.interval = interval
+        self.requested = False
+        self.profile = None
+        self.sampler = None
+        self.profiled_games = 0
+        self.last_outputs = None
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def request(self):
+        """次の局からプロファイルを取るよう予約する（取っている最中なら何もしない）"""
+        if not self.active:
+            self.requested = True
+
+    def on_game_start(self):
+        if not self.requested or self.active:
+            return
+        self.requested = False
+        self.profiled_games = 0
+        print(f"プロファイル開始: {self.games}局")
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def on_game_end(self):
+        if not self.active:
+            return
+        self.profiled_games += 1
+        if self.profiled_games >= self.games:
+            self._dump()
+
+    def finish(self):
+        """学習が途中で終わった場合も、それまでの分を書き出す"""
+        self.requested = False
+        if self.active:
+            self._dump()
+
+    def _dump(self):
+        self.profile.disable()
+        self.sampler.stop()
+        base = f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S')}"
+        pstats_path = base + ".pstats"
+        collapsed_path = base + ".collapsed"
+        self.profile.dump_stats(pstats_path)
+        self.sampler.write_collapsed(collapsed_path)
+        print(f"プロファイル終了: {self.profiled_games}局, サンプル{self.sampler.samples}個 -> {pstats_path}, {collapsed_path}")
+        self.last_outputs = (pstats_path, collapsed_path)
+        self.profile = None
+        self.sampler = None
+        return self.last_outputs
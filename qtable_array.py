@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Q値を型付きの array に詰めて持つQテーブル
+
+dict のQテーブルは1件ごとにキーの文字列（約120バイト）・float（24バイト）・dict の枠を持つ。
+ArrayQTable はキーを (黒の64bit, 白の64bit, マス番号) に分解して array('Q') と array('B') に、
+Q値を float32 / float16 / int16（scale 倍して整数にする）の array に入れる。
+探すのは置換表（transposition.py）と同じく事前確保した配列の開番地法（線形探査）で、
+1件あたり 8+8+1 バイトのキーと 4 か 2 バイトの値に、空きの分（MAX_LOAD）を足したメモリで済む。
+
+get / [] / in / len / items / keys / clear / update を持つので、ai_qlearning_move などからは
+dict と同じように使える（キーの形式は "<盤面64文字>_<行>_<列>" に限る）。
+同じ盤面の手のキーは続けて引かれるので、最後に分解した盤面を覚えておいて使い回す。
+
+使い方:
+    python qtable_array.py report                     # 各形式のメモリ・誤差・手の選択の一致率を表示
+    python qtable_array.py convert --value-type float16 --output qtable_f16.pkl
+"""
+
+import argparse
+import struct
+
+from array import array
+
+from constants import *
+
+VALUE_TYPES = ("float32", "float16", "int16")
+VALUE_TYPECODES = {"float32": 'f', "float16": 'H', "int16": 'h'}
+# int16 の既定の倍率（1/64 刻みで ±512 まで。Q値は勝敗の報酬 ±200 の近くまでしか行かない）
+DEFAULT_INT16_SCALE = 64
+INT16_MAX = 32767
+FLOAT16_MAX = 65504.0
+DEFAULT_CAPACITY = 1024
+# 使用率がこれを超えたら倍の大きさに作り直す
+MAX_LOAD = 0.7
+EMPTY_SQUARE = 255
+KEY_LENGTH = BOARD_SIZE * BOARD_SIZE + 4
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+# 盤面の文字列を黒・白それぞれの2進数の文字列にする変換表
+_BLACK_DIGITS = str.maketrans(str(PLAYER_BLACK) + str(PLAYER_WHITE), "10")
+_WHITE_DIGITS = str.maketrans(str(PLAYER_BLACK) + str(PLAYER_WHITE), "01")
+
+_FLOAT16 = struct.Struct('<e')
+_UINT16 = struct.Struct('<H')
+_float16_table = None
+
+def _get_float16_table():
+    """float16 のビット列 → float の表（65536件、float16 を初めて使う時に作る）"""
+    global _float16_table
+    if _float16_table is None:
+        _float16_table = [_FLOAT16.unpack(_UINT16.pack(bits))[0] for bits in range(1 << 16)]
+    return _float16_table
+
+def _encode_float16(value):
+    value = max(-FLOAT16_MAX, min(FLOAT16_MAX, value))
+    return _UINT16.unpack(_FLOAT16.pack(value))[0]
+
+def parse_key(key):
+    """Qテーブルのキーを (黒のビット列, 白のビット列, マス番号) にする"""
+    if len(key) != KEY_LENGTH:
+        raise ValueError(f"Qテーブルのキーの形式が違います: {key!r}")
+    board = key[:BOARD_SIZE * BOARD_SIZE]
+    black = int(board.translate(_BLACK_DIGITS), 2)
+    white = int(board.translate(_WHITE_DIGITS), 2)
+    return black, white, (ord(key[-3]) - 48) * BOARD_SIZE + ord(key[-1]) - 48
+
+def format_key(black, white, sq):
+    """parse_key の逆（0/1 の並びを10進数として足すと、黒が1・白が2の盤面の文字列になる）"""
+    board = str(int(format(black, '064b')) + 2 * int(format(white, '064b'))).zfill(BOARD_SIZE * BOARD_SIZE)
+    return f"{board}_{sq // BOARD_SIZE}_{sq % BOARD_SIZE}"
+
+class ArrayQTable:
+    """キーと値を array に持つQテーブル（value_type は float32 / float16 / int16）"""
+    def __init__(self, value_type="float32", capacity=DEFAULT_CAPACITY, scale=None):
+        if value_type not in VALUE_TYPES:
+            raise ValueError(f"value_type は {VALUE_TYPES} のどれか: {value_type!r}")
+        self.value_type = value_type
+        self.scale = (scale or DEFAULT_INT16_SCALE) if value_type == "int16" else None
+        self.count = 0
+        self._allocate(_round_capacity(capacity))
+        self._init_codec()
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self._shift = 64 - (capacity.bit_length() - 1)
+        self.blacks = array('Q', bytes(8 * capacity))
+        self.whites = array('Q', bytes(8 * capacity))
+        self.squares = array('B', [EMPTY_SQUARE]) * capacity
+        typecode = VALUE_TYPECODES[self.value_type]
+        self.q_values = array(typecode, bytes(array(typecode).itemsize * capacity))
+
+    def _init_codec(self):
+        """値の変換（float32 は array がそのまま float を返すので変換しない）"""
+        self._last_board = None
+        self._last_bits = None
+        if self.value_type == "float16":
+            table = _get_float16_table()
+            self._decode = table.__getitem__
+            self._encode = _encode_float16
+        elif self.value_type == "int16":
+            scale = self.scale
+            self._decode = lambda stored: stored / scale
+            self._encode = lambda value: max(-INT16_MAX, min(INT16_MAX, round(value * scale)))
+        else:
+            self._decode = None
+            self._encode = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for name in ("_decode", "_encode", "_last_board", "_last_bits"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_codec()
+
+    def _parse(self, key):
+        """parse_key と同じ（同じ盤面が続く時は盤面の変換を省く）"""
+        if len(key) != KEY_LENGTH:
+            raise ValueError(f"Qテーブルのキーの形式が違います: {key!r}")
+        board = key[:BOARD_SIZE * BOARD_SIZE]
+        if board != self._last_board:
+            self._last_board = board
+            self._last_bits = (int(board.translate(_BLACK_DIGITS), 2), int(board.translate(_WHITE_DIGITS), 2))
+        black, white = self._last_bits
+        return black, white, (ord(key[-3]) - 48) * BOARD_SIZE + ord(key[-1]) - 48
+
+    def _home(self, black, white, sq):
+        return (((black ^ (white * _HASH_MULTIPLIER) ^ sq) * _HASH_MULTIPLIER) & _MASK64) >> self._shift
+
+    def _find(self, black, white, sq):
+        """(スロット番号, 見つかったか) を返す（見つからなければ入れる空きスロット）"""
+        squares = self.squares
+        mask = self.capacity - 1
+        i = self._home(black, white, sq)
+        while True:
+            stored = squares[i]
+            if stored == EMPTY_SQUARE:
+                return i, False
+            if stored == sq and self.blacks[i] == black and self.whites[i] == white:
+                return i, True
+            i = (i + 1) & mask
+
+    def _resize(self, capacity):
+        old = (self.blacks, self.whites, self.squares, self.q_values)
+        self._allocate(capacity)
+        blacks, whites, squares, values = old
+        for i in range(len(squares)):
+            sq = squares[i]
+            if sq != EMPTY_SQUARE:
+                j, _ = self._find(blacks[i], whites[i], sq)
+                self.blacks[j] = blacks[i]
+                self.whites[j] = whites[i]
+                self.squares[j] = sq
+                self.q_values[j] = values[i]
+
+    def get(self, key, default=None):
+        i, found = self._find(*self._parse(key))
+        if not found:
+            return default
+        if self._decode is None:
+            return self.q_values[i]
+        return self._decode(self.q_values[i])
+
+    def __getitem__(self, key):
+        i, found = self._find(*self._parse(key))
+        if not found:
+            raise KeyError(key)
+        if self._decode is None:
+            return self.q_values[i]
+        return self._decode(self.q_values[i])
+
+    def __setitem__(self, key, value):
+        black, white, sq = self._parse(key)
+        i, found = self._find(black, white, sq)
+        if not found:
+            if self.count + 1 > self.capacity * MAX_LOAD:
+                self._resize(self.capacity * 2)
+                i, _ = self._find(black, white, sq)
+            self.blacks[i] = black
+            self.whites[i] = white
+            self.squares[i] = sq
+            self.count += 1
+        self.q_values[i] = value if self._encode is None else self._encode(value)
+
+    def __delitem__(self, key):
+        i, found = self._find(*self._parse(key))
+        if not found:
+            raise KeyError(key)
+        # 後ろの同じ探査列の項目を前に詰める（墓標を残さない）
+        blacks, whites, squares, values = self.blacks, self.whites, self.squares, self.q_values
+        mask = self.capacity - 1
+        j = i
+        while True:
+            j = (j + 1) & mask
+            if squares[j] == EMPTY_SQUARE:
+                break
+            home = self._home(blacks[j], whites[j], squares[j])
+            # home が (i, j] の外（巡回して数える）なら、i に移しても探せる
+            if (i < j and (home <= i or home > j)) or (i > j and home <= i and home > j):
+                blacks[i], whites[i], squares[i], values[i] = blacks[j], whites[j], squares[j], values[j]
+                i = j
+        squares[i] = EMPTY_SQUARE
+        self.count -= 1
+
+    def __contains__(self, key):
+        return self._find(*self._parse(key))[1]
+
+    def __len__(self):
+        return self.count
+
+    def _iter_slots(self):
+        squares = self.squares
+        for i in range(self.capacity):
+            if squares[i] != EMPTY_SQUARE:
+                yield i
+
+    def __iter__(self):
+        for i in self._iter_slots():
+            yield format_key(self.blacks[i], self.whites[i], self.squares[i])
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        decode = self._decode
+        for i in self._iter_slots():
+            yield self.q_values[i] if decode is None else decode(self.q_values[i])
+
+    def items(self):
+        decode = self._decode
+        for i in self._iter_slots():
+            value = self.q_values[i] if decode is None else decode(self.q_values[i])
+            yield format_key(self.blacks[i], self.whites[i], self.squares[i]), value
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def clear(self):
+        self.count = 0
+        self._allocate(DEFAULT_CAPACITY)
+        self._last_board = None
+
+    def nbytes(self):
+        """配列が使っているバイト数"""
+        return sum(a.itemsize * len(a) for a in (self.blacks, self.whites, self.squares, self.q_values))
+
+def _round_capacity(capacity):
+    """2のべき乗に切り上げる"""
+    return 1 << max(3, (max(1, capacity) - 1).bit_length())
+
+def from_mapping(qtable, value_type="float32", scale=None):
+    """dict などのQテーブルから ArrayQTable を作る（途中で作り直さない大きさを最初に確保する）"""
+    result = ArrayQTable(value_type, int(len(qtable) / MAX_LOAD) + 1, scale)
+    for key, value in qtable.items():
+        result[key] = value
+    return result
+
+def _benchmark_positions(qtable, count, seed):
+    """qtable の貪欲な手に時々ランダムな手を混ぜた自己対戦で、手番の合法手がある局面を count 個集める"""
+    import random
+    from game_logic import OthelloGame
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = OthelloGame()
+        while not game.game_over and len(positions) < count:
+            player = game.current_player
+            moves = game.get_valid_moves(player)
+            if moves:
+                positions.append((game.get_board_state_key(), moves))
+                if rng.random() < 0.2:
+                    r, c = rng.choice(moves)
+                else:
+                    r, c = greedy_move(qtable, positions[-1][0], moves)
+                game.make_move(r, c, player)
+            game.switch_player()
+            game.check_game_over()
+    return positions
+
+def greedy_move(qtable, state_key, moves):
+    """ai_qlearning_move と同じ選び方（Q値が最大の最初の手）"""
+    best_move = None
+    best_q_value = float('-inf')
+    for move in moves:
+        q_value = qtable.get(f"{state_key}_{move[0]}_{move[1]}", 0.0)
+        if q_value > best_q_value:
+            best_q_value = q_value
+            best_move = move
+    return best_move
+
+def report(qtable_path, positions_count=5000, seed=1, scale=None):
+    """各形式のメモリ・Q値の誤差・ベンチマーク局面での手の一致率を表にした行のリストを返す"""
+    import pickle
+    import time
+    import tracemalloc
+
+    tracemalloc.start()
+    with open(qtable_path, "rb") as f:
+        qtable = dict(pickle.load(f))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    positions = _benchmark_positions(qtable, positions_count, seed)
+    reference = [greedy_move(qtable, state_key, moves) for state_key, moves in positions]
+    # Q値が1つも無い局面はどの形式でも最初の手になるので、Q値のある局面の一致も別に数える
+    known = [any(f"{state_key}_{r}_{c}" in qtable for r, c in moves) for state_key, moves in positions]
+
+    def time_lookups(table):
+        start = time.perf_counter()
+        lookups = 0
+        for state_key, moves in positions:
+            greedy_move(table, state_key, moves)
+            lookups += len(moves)
+        return (time.perf_counter() - start) / lookups * 1e6
+
+    lines = [f"{qtable_path}: {len(qtable)}件 ベンチマーク局面 {len(positions)}（Q値のある局面 {sum(known)}）",
+             f"{'形式':<8} {'MB':>8} {'B/件':>7} {'最大誤差':>10} {'平均誤差':>10} {'手の一致':>12} {'Q値のある局面':>14} {'μs/参照':>8}"]
+    lines.append(f"{'dict':<8} {dict_bytes / 1024 / 1024:>8.1f} {dict_bytes / max(1, len(qtable)):>7.1f} "
+                 f"{0.0:>10.5f} {0.0:>10.5f} {len(positions):>5}/{len(positions):<6} {sum(known):>6}/{sum(known):<7} {time_lookups(qtable):>8.2f}")
+    for value_type in VALUE_TYPES:
+        if value_type == "float16":
+            _get_float16_table()  # 変換表はどの表でも共通なので、メモリに数えない
+        tracemalloc.start()
+        table = from_mapping(qtable, value_type, scale)
+        table_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        max_error = 0.0
+        total_error = 0.0
+        for key, value in qtable.items():
+            error = abs(table[key] - value)
+            total_error += error
+            if error > max_error:
+                max_error = error
+        matches = [greedy_move(table, state_key, moves) == move for (state_key, moves), move in zip(positions, reference)]
+        same = sum(matches)
+        same_known = sum(1 for match, has_q in zip(matches, known) if match and has_q)
+        lines.append(f"{value_type:<8} {table_bytes / 1024 / 1024:>8.1f} {table_bytes / max(1, len(qtable)):>7.1f} "
+                     f"{max_error:>10.5f} {total_error / max(1, len(qtable)):>10.5f} {same:>5}/{len(positions):<6} "
+                     f"{same_known:>6}/{sum(known):<7} {time_lookups(table):>8.2f}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Q値を型付きの array に詰めたQテーブル")
+    parser.add_argument("--qtable", default=QTABLE_PATH, help="Qテーブルのファイル")
+    parser.add_argument("--scale", type=float, default=None, help=f"int16 の倍率（既定 {DEFAULT_INT16_SCALE}）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="各形式のメモリ・誤差・手の選択の一致率を比べる")
+    report_parser.add_argument("--positions", type=int, default=5000, help="ベンチマーク局面の数")
+    report_parser.add_argument("--seed", type=int, default=1, help="ベンチマーク局面を作る乱数のシード")
+    convert_parser = subparsers.add_parser("convert", help="Qテーブルを ArrayQTable にして保存する")
+    convert_parser.add_argument("--value-type", choices=VALUE_TYPES, default="float32", help="Q値の型")
+    convert_parser.add_argument("--output", required=True, help="保存先")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        for line in report(args.qtable, args.positions, args.seed, args.scale):
+            print(line)
+    else:
+        from ai_learning import load_qtable_from_file, save_qtable_to_file
+        qtable = load_qtable_from_file(args.qtable)
+        # pickle から戻るのは qtable_array.ArrayQTable なので、モジュールの方で作る
+        import qtable_array
+        table = qtable_array.from_mapping(qtable, args.value_type, args.scale)
+        save_qtable_to_file(table, args.output)
+        print(f"{len(table)}件を {args.value_type} で {args.output} に保存しました（配列 {table.nbytes() / 1024 / 1024:.1f}MB）")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""圧縮したQテーブルのスナップショット（.qts）
+
+pickle の qtable_<名前>.pkl はキーの文字列をそのまま持つので大きい。スナップショットは
+キーを (黒の64bit, 白の64bit, マス番号) に分解し（qtable_array.parse_key と同じ）、Q値は float64 のまま、
+CHUNK_ENTRIES 件ずつ列ごとに並べたチャンクを圧縮器に流して書く。全体の bytes を作らないので、
+保存中に増えるメモリはチャンク1つ分で済む。読む時も少しずつ展開しながら dict などに入れる。
+
+ファイルの形式（バージョン1、数値はリトルエンディアン）:
+    ヘッダ  マジック "QTSN"・バージョン・圧縮形式・件数・展開後のバイト数・展開後の CRC32・チャンクの件数
+    本体    圧縮したチャンクの並び。チャンクは 件数(4) + 黒(8×件数) + 白(8×件数) + マス(1×件数) + Q値(8×件数)
+件数とチェックサムは書き終わってからヘッダに書き戻す（一時ファイルに書いてから置き換える）。
+入るのはキーとQ値だけで、TrackedQTable の更新回数・エポックの記録（qtable_store）は保存しない。
+
+圧縮形式は zlib（gzip と同じ deflate）・lzma（標準ライブラリ）と、zstandard が入っていれば zstd。
+
+使い方:
+    python qtable_snapshot.py convert qtable.pkl qtable.qts
+    python qtable_snapshot.py info qtable.qts
+    python qtable_snapshot.py bench                    # pickle と各圧縮形式の大きさ・時間・メモリを比べる
+"""
+
+import argparse
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from constants import *
+from qtable_array import parse_key, format_key
+
+SNAPSHOT_EXT = ".qts"
+MAGIC = b"QTSN"
+VERSION = 1
+HEADER = struct.Struct("<4sBB2xQQII")
+CHUNK_COUNT = struct.Struct("<I")
+CHUNK_ENTRIES = 65536
+READ_SIZE = 1 << 20
+CODEC_IDS = {"zlib": 1, "lzma": 2, "zstd": 3}
+DEFAULT_CODEC = "lzma"
+ZLIB_LEVEL = 6
+# プリセット2以上は圧縮器だけで数十MBを確保するわりに小さくならない（bench で比べた）
+LZMA_PRESET = 1
+
+def _load_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def available_codecs():
+    """使える圧縮形式の名前のリスト"""
+    codecs = ["zlib"]
+    try:
+        import lzma  # noqa: F401（lzma なしでビルドされた Python もある）
+        codecs.append("lzma")
+    except ImportError:
+        pass
+    if _load_zstandard() is not None:
+        codecs.append("zstd")
+    return codecs
+
+def _compressor(codec):
+    if codec == "zlib":
+        return zlib.compressobj(ZLIB_LEVEL)
+    if codec == "lzma":
+        import lzma
+        return lzma.LZMACompressor(preset=LZMA_PRESET)
+    if codec == "zstd":
+        zstandard = _load_zstandard()
+        if zstandard is None:
+            raise ValueError("zstd を使うには zstandard をインストールしてください")
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f"不明な圧縮形式です: {codec}")
+
+def _decompressor(codec):
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "lzma":
+        import lzma
+        return lzma.LZMADecompressor()
+    if codec == "zstd":
+        zstandard = _load_zstandard()
+        if zstandard is None:
+            raise ValueError("zstd で圧縮されたスナップショットを読むには zstandard をインストールしてください")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"不明な圧縮形式です: {codec}")
+
+def _little_endian(column):
+    """array の中身をリトルエンディアンの bytes にする"""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def _encode_chunk(blacks, whites, squares, values):
+    return (CHUNK_COUNT.pack(len(squares)) + _little_endian(blacks) + _little_endian(whites)
+            + squares.tobytes() + _little_endian(values))
+
+def save_snapshot(qtable, path, codec=DEFAULT_CODEC, chunk_entries=CHUNK_ENTRIES):
+    """qtable（items() を持つもの）をスナップショットに書き、件数を返す
+
+    保存するのはキーとQ値だけで、TrackedQTable の更新回数・エポックの記録は残らない（読み込むと記録の無いキーになる）。
+    途中で失敗したら一時ファイルを消して例外をそのまま投げる（元の path は書き換えない）。
+    """
+    compressor = _compressor(codec)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            count = _write_snapshot(f, qtable, compressor, codec, chunk_entries)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+def _write_snapshot(f, qtable, compressor, codec, chunk_entries):
+    count = 0
+    payload_bytes = 0
+    crc = 0
+    f.write(HEADER.pack(MAGIC, VERSION, CODEC_IDS[codec], 0, 0, 0, chunk_entries))
+
+    def write_chunk(blacks, whites, squares, values):
+        nonlocal payload_bytes, crc
+        chunk = _encode_chunk(blacks, whites, squares, values)
+        payload_bytes += len(chunk)
+        crc = zlib.crc32(chunk, crc)
+        f.write(compressor.compress(chunk))
+
+    blacks, whites, squares, values = array('Q'), array('Q'), array('B'), array('d')
+    for key, value in qtable.items():
+        black, white, sq = parse_key(key)
+        blacks.append(black)
+        whites.append(white)
+        squares.append(sq)
+        values.append(value)
+        if len(squares) >= chunk_entries:
+            write_chunk(blacks, whites, squares, values)
+            count += len(squares)
+            blacks, whites, squares, values = array('Q'), array('Q'), array('B'), array('d')
+    if squares:
+        write_chunk(blacks, whites, squares, values)
+        count += len(squares)
+    f.write(compressor.flush())
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, CODEC_IDS[codec], count, payload_bytes, crc, chunk_entries))
+    return count
+
+def read_header(f):
+    """ヘッダを読んで辞書で返す"""
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("スナップショットのヘッダが短すぎます")
+    magic, version, codec_id, count, payload_bytes, crc, chunk_entries = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Qテーブルのスナップショットではありません")
+    if version != VERSION:
+        raise ValueError(f"対応していないスナップショットのバージョンです: {version}")
+    codecs = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+    if codec_id not in codecs:
+        raise ValueError(f"不明な圧縮形式です: {codec_id}")
+    return {"codec": codecs[codec_id], "count": count, "payload_bytes": payload_bytes,
+            "crc32": crc, "chunk_entries": chunk_entries}
+
+class _PayloadReader:
+    """ファイルを READ_SIZE ずつ展開しながら、必要なバイト数ずつ返す"""
+    def __init__(self, f, codec):
+        self.f = f
+        self.decompressor = _decompressor(codec)
+        self.buffer = bytearray()
+        self.eof = False
+        self.payload_bytes = 0
+        self.crc = 0
+
+    def read_exact(self, size):
+        """size バイト返す（ちょうど終わりなら b""、途中で終わったら ValueError）"""
+        while len(self.buffer) < size and not self.eof:
+            data = self.f.read(READ_SIZE)
+            if not data:
+                self.eof = True
+                break
+            try:
+                self.buffer += self.decompressor.decompress(data)
+            except Exception as e:
+                # zlib.error / lzma.LZMAError / zstandard.ZstdError は共通の基底クラスを持たない
+                raise ValueError(f"スナップショットを展開できません: {e}") from e
+        if len(self.buffer) < size:
+            if self.buffer:
+                raise ValueError("スナップショットが途中で切れています")
+            return b""
+        result = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.payload_bytes += size
+        self.crc = zlib.crc32(result, self.crc)
+        return result
+
+def _column(typecode, data):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+def load_snapshot(path, into=None):
+    """スナップショットを読み、into（省略時は新しい dict）に入れて返す
+
+    件数・展開後のバイト数・CRC32 がヘッダと合わなければ ValueError。
+    """
+    qtable = {} if into is None else into
+    with open(path, "rb") as f:
+        header = read_header(f)
+        reader = _PayloadReader(f, header["codec"])
+        count = 0
+        while True:
+            data = reader.read_exact(CHUNK_COUNT.size)
+            if not data:
+                break
+            n = CHUNK_COUNT.unpack(data)[0]
+            blacks = _column('Q', reader.read_exact(8 * n))
+            whites = _column('Q', reader.read_exact(8 * n))
+            squares = reader.read_exact(n)
+            values = _column('d', reader.read_exact(8 * n))
+            if len(squares) != n or len(values) != n:
+                raise ValueError("スナップショットが途中で切れています")
+            for i in range(n):
+                qtable[format_key(blacks[i], whites[i], squares[i])] = values[i]
+            count += n
+    if (count, reader.payload_bytes, reader.crc) != (header["count"], header["payload_bytes"], header["crc32"]):
+        raise ValueError(f"スナップショットが壊れています（件数 {count}/{header['count']}、チェックサムが合いません）")
+    return qtable
+
+def _bench(qtable_path, codecs):
+    """pickle と各圧縮形式の保存・読み込みの時間、ファイルの大きさ、保存中に増えたメモリを表にした行を返す"""
+    import pickle
+    import tempfile
+    import time
+    import tracemalloc
+
+    with open(qtable_path, "rb") as f:
+        qtable = dict(pickle.load(f))
+    lines = [f"{qtable_path}: {len(qtable)}件",
+             f"{'形式':<8} {'MB':>8} {'倍率':>6} {'保存秒':>7} {'読込秒':>7} {'保存中の増加MB':>14}"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_size = None
+        for name in ["pickle"] + codecs:
+            path = os.path.join(tmp_dir, "qtable" + (".pkl" if name == "pickle" else SNAPSHOT_EXT))
+            tracemalloc.start()
+            start = time.perf_counter()
+            if name == "pickle":
+                with open(path, "wb") as f:
+                    pickle.dump(qtable, f)
+            else:
+                save_snapshot(qtable, path, name)
+            save_seconds = time.perf_counter() - start
+            save_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            start = time.perf_counter()
+            if name == "pickle":
+                with open(path, "rb") as f:
+                    loaded = pickle.load(f)
+            else:
+                loaded = load_snapshot(path)
+            load_seconds = time.perf_counter() - start
+            assert loaded == qtable
+            del loaded
+            size = os.path.getsize(path)
+            if pickle_size is None:
+                pickle_size = size
+            lines.append(f"{name:<8} {size / 1024 / 1024:>8.2f} {pickle_size / size:>6.1f} {save_seconds:>7.2f} "
+                         f"{load_seconds:>7.2f} {save_peak / 1024 / 1024:>14.1f}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="圧縮したQテーブルのスナップショット（.qts）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="pickle とスナップショットを相互に変換する（拡張子で判断）")
+    convert_parser.add_argument("source", help="変換元")
+    convert_parser.add_argument("destination", help="変換先")
+    convert_parser.add_argument("--codec", choices=list(CODEC_IDS), default=DEFAULT_CODEC, help="圧縮形式")
+    info_parser = subparsers.add_parser("info", help="ヘッダを表示して中身を検査する")
+    info_parser.add_argument("path", help="スナップショット")
+    bench_parser = subparsers.add_parser("bench", help="pickle と各圧縮形式を比べる")
+    bench_parser.add_argument("--qtable", default=QTABLE_PATH, help="使うQテーブル")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        from ai_learning import load_qtable_from_file, save_qtable_to_file
+        qtable = load_qtable_from_file(args.source)
+        if args.destination.endswith(SNAPSHOT_EXT):
+            save_snapshot(qtable, args.destination, args.codec)
+        else:
+            save_qtable_to_file(qtable, args.destination)
+        print(f"{args.source} ({os.path.getsize(args.source) / 1024 / 1024:.2f}MB) -> "
+              f"{args.destination} ({os.path.getsize(args.destination) / 1024 / 1024:.2f}MB) {len(qtable)}件")
+    elif args.command == "info":
+        with open(args.path, "rb") as f:
+            header = read_header(f)
+        print(f"{args.path}: バージョン{VERSION} {header['codec']} {header['count']}件 "
+              f"展開後{header['payload_bytes'] / 1024 / 1024:.2f}MB CRC32={header['crc32']:08x}")
+        load_snapshot(args.path)
+        print("件数とチェックサムは正しいです")
+    else:
+        for line in _bench(args.qtable, available_codecs()):
+            print(line)
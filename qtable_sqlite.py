@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SQLite に置くQテーブル（メモリに載らない大きさの研究用）
+
+表は qvalues(state INTEGER PRIMARY KEY, key BLOB, value REAL) の1つ。
+state はキーの文字列の64bitハッシュ（blake2b、置換表と同じく衝突は無視する）で、key には盤面を詰めた17バイト
+（黒の64bit・白の64bit・マス番号、qtable_array.parse_key と同じ分解）を入れて items() で元のキーに戻す。
+ジャーナルは WAL なので、書くプロセスが1つあっても別のプロセスから同時に読める。
+
+前に LRU のキャッシュを置く。書き込みはキャッシュに入れて「未保存」にし、batch_size 件たまったら
+1つのトランザクションでまとめて INSERT OR REPLACE する（書き戻し、batch_size=None なら flush() を呼ぶまで書かない）。無いキーも「無い」と覚えるので、
+自己対戦で多い「まだ無い局面」の参照も2回目からはDBを引かない。
+get / [] / in / len / items / keys / clear / update を持つので、ai_qlearning_move からは dict と同じように使える。
+pickle すると同じファイルを読み取り専用で開き直すものになる（探索のワーカープロセスに渡す時など）。
+
+使い方:
+    python qtable_sqlite.py import --db qtable.db        # qtable.pkl をDBに入れる
+    python qtable_sqlite.py export --db qtable.db --output qtable_from_db.pkl
+    python qtable_sqlite.py stats --db qtable.db
+    python headless_trainer.py --games 100000 --sqlite qtable.db
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+from constants import *
+from qtable_array import parse_key, format_key
+
+QTABLE_DB_PATH = "qtable.db"
+DEFAULT_CACHE_SIZE = 200000
+DEFAULT_BATCH_SIZE = 5000
+# SQLite 自体のページキャッシュ（負の値はKB単位）
+SQLITE_CACHE_KB = 65536
+# キャッシュに「DBに無い」と覚えておく印
+_MISSING = None
+
+def state_id(key):
+    """キーの文字列 → 符号付き64bitの整数（どのプロセスでも同じ値）"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True)
+
+def pack_key(key):
+    black, white, sq = parse_key(key)
+    return black.to_bytes(8, "little") + white.to_bytes(8, "little") + bytes((sq,))
+
+def unpack_key(blob):
+    return format_key(int.from_bytes(blob[:8], "little"), int.from_bytes(blob[8:16], "little"), blob[16])
+
+class SQLiteQTable:
+    """SQLite のQテーブル（readonly=True なら読むだけ、書いているプロセスがあっても開ける）"""
+    def __init__(self, path=QTABLE_DB_PATH, cache_size=DEFAULT_CACHE_SIZE, batch_size=DEFAULT_BATCH_SIZE, readonly=False):
+        self.path = path
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.readonly = readonly
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS qvalues (state INTEGER PRIMARY KEY, key BLOB NOT NULL, value REAL NOT NULL)")
+            self.conn.commit()
+        self.conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        self.cache = OrderedDict()
+        self.dirty = {}
+        self.count = self.conn.execute("SELECT COUNT(*) FROM qvalues").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+
+    def __reduce__(self):
+        # 別プロセスには書きかけを保存してから、読み取り専用で開き直すものとして渡す
+        if not self.readonly:
+            self.flush()
+        return (SQLiteQTable, (self.path, self.cache_size, self.batch_size, True))
+
+    def _lookup(self, key):
+        """キャッシュ → 未保存 → DB の順に引く（無ければ _MISSING）"""
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            self.hits += 1
+            return cache[key]
+        if key in self.dirty:
+            value = self.dirty[key]
+        else:
+            self.misses += 1
+            row = self.conn.execute("SELECT value FROM qvalues WHERE state = ?", (state_id(key),)).fetchone()
+            value = row[0] if row is not None else _MISSING
+        self._cache_put(key, value)
+        return value
+
+    def _cache_put(self, key, value):
+        cache = self.cache
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.cache_size:
+            # 追い出したキーが未保存でも dirty に残っているので、次の flush まで失われない
+            cache.popitem(last=False)
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _MISSING
+
+    def __setitem__(self, key, value):
+        if self.readonly:
+            raise TypeError("読み取り専用で開いたQテーブルには書けません")
+        if self._lookup(key) is _MISSING:
+            self.count += 1
+        self._cache_put(key, value)
+        self.dirty[key] = value
+        if self.batch_size is not None and len(self.dirty) >= self.batch_size:
+            self.flush()
+
+    def __len__(self):
+        """このプロセスから見た件数（開いた時の件数に、ここで追加した分を足したもの）"""
+        return self.count
+
+    def flush(self):
+        """未保存の書き込みを1つのトランザクションでDBに書く"""
+        if not self.dirty:
+            return
+        rows = [(state_id(key), pack_key(key), value) for key, value in self.dirty.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO qvalues (state, key, value) VALUES (?, ?, ?)", rows)
+        self.dirty.clear()
+        self.flushes += 1
+
+    def items(self):
+        self.flush()
+        for blob, value in self.conn.execute("SELECT key, value FROM qvalues"):
+            yield unpack_key(blob), value
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def keys(self):
+        return iter(self)
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+        self.flush()
+
+    def clear(self):
+        if self.readonly:
+            raise TypeError("読み取り専用で開いたQテーブルには書けません")
+        with self.conn:
+            self.conn.execute("DELETE FROM qvalues")
+        self.cache.clear()
+        self.dirty.clear()
+        self.count = 0
+
+    def clear_cache(self):
+        """キャッシュを捨てる（読み取り専用で、他のプロセスが書いた新しい値を読みたい時）"""
+        self.cache.clear()
+
+    def import_mapping(self, qtable):
+        """dict などのQテーブルをまとめて書き込む（キャッシュを通さない）"""
+        rows = []
+        batch_size = self.batch_size if self.batch_size is not None else DEFAULT_BATCH_SIZE
+        with self.conn:
+            for key, value in qtable.items():
+                rows.append((state_id(key), pack_key(key), value))
+                if len(rows) >= batch_size:
+                    self.conn.executemany("INSERT OR REPLACE INTO qvalues (state, key, value) VALUES (?, ?, ?)", rows)
+                    rows = []
+            if rows:
+                self.conn.executemany("INSERT OR REPLACE INTO qvalues (state, key, value) VALUES (?, ?, ?)", rows)
+        self.cache.clear()
+        self.count = self.conn.execute("SELECT COUNT(*) FROM qvalues").fetchone()[0]
+
+    def close(self, discard=False):
+        """閉じる（discard=True なら未保存の書き込みを捨てる）"""
+        if discard:
+            self.dirty.clear()
+        if not self.readonly:
+            self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite のQテーブル")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="pickle のQテーブルをDBに入れる")
+    import_parser.add_argument("--qtable", default=QTABLE_PATH, help="読み込むQテーブル")
+    export_parser = subparsers.add_parser("export", help="DBを pickle のQテーブル（dict）にする")
+    export_parser.add_argument("--output", required=True, help="保存先")
+    stats_parser = subparsers.add_parser("stats", help="件数とファイルの大きさを表示")
+    for subparser in (import_parser, export_parser, stats_parser):
+        subparser.add_argument("--db", default=QTABLE_DB_PATH, help="DBのファイル")
+    args = parser.parse_args()
+
+    import os
+    from ai_learning import load_qtable_from_file, save_qtable_to_file
+    if args.command == "import":
+        with SQLiteQTable(args.db) as table:
+            table.import_mapping(load_qtable_from_file(args.qtable))
+            print(f"{args.qtable} を {args.db} に入れました（{len(table)}件）")
+    elif args.command == "export":
+        with SQLiteQTable(args.db, readonly=True) as table:
+            qtable = dict(table.items())
+        save_qtable_to_file(qtable, args.output)
+        print(f"{len(qtable)}件を {args.output} に保存しました")
+    else:
+        with SQLiteQTable(args.db, readonly=True) as table:
+            print(f"{args.db}: {len(table)}件 {os.path.getsize(args.db) / 1024 / 1024:.1f}MB")
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""訪問回数と最終更新エポックを持つQテーブルと、その刈り込み（エビクション）
+
+TrackedQTable は dict のサブクラスで、Q値を書き込む（qtable[key] = 値）たびに、そのキーの
+更新回数と最後に更新したエポックを1つの整数（更新回数 << 32 | エポック）にまとめて記録する。
+読み出し（qtable.get）は dict のままなので、探索やQ値の参照は遅くならない。
+update() や |= でまとめて入れた分（ファイルからの読み込みなど）は更新に数えず、記録の無いキーとして扱う。
+エポックは EPOCH_UPDATES 回の更新ごとに1つ進む。
+
+刈り込みの条件（EvictionPolicy）:
+    near_zero    Q値の絶対値がこれ以下（未登録の 0.0 とほぼ同じなので消しても手の選び方は変わらない）
+    max_age      最後の更新からこのエポック数より古い（LRU）
+    min_visits   更新回数がこれ未満で、min_age エポック以上更新されていない（一度しか現れなかった局面）
+    max_entries  件数の上限（超えたら古い順・更新回数の少ない順に消す）。max_memory_mb からも決められる
+チェックポイントで evict() を呼ぶか、auto_policy を設定してエポックが進むたびに件数の上限を守らせる。
+刈り込むたびに on_evict(EvictionStats) を呼ぶ（表示やメトリクス用）。
+
+使い方:
+    python qtable_store.py stats                              # 更新回数・エポックの分布
+    python qtable_store.py prune --evict-near-zero 0.01 --evict-min-visits 2 --max-entries 500000
+"""
+
+import argparse
+import sys
+import time
+
+from constants import *
+
+EPOCH_BITS = 32
+EPOCH_MASK = (1 << EPOCH_BITS) - 1
+EPOCH_UPDATES = 10000
+# 件数の上限で自動的に刈り込む時は上限のこの割合まで減らす（上限付近で毎エポック刈り込まないように）
+AUTO_EVICT_HEADROOM = 0.9
+# 記録の無いキー（普通の dict から読み込んだ分）は1回だけ、エポック0で更新されたものとみなす
+UNTRACKED_VISITS = 1
+
+class TrackedQTable(dict):
+    """更新回数と最終更新エポックを記録するQテーブル"""
+    # pickle から戻す時は __init__ を通らずに項目が入り、その後で meta などが戻る。
+    # それまでは meta が None なので、__setitem__ は記録せずにそのまま入れる
+    meta = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.meta = {}
+        self.epoch = 0
+        self.updates = 0
+        self.auto_policy = None
+        self.on_evict = None
+        self.evicted_total = 0
+
+    def __setitem__(self, key, value):
+        meta = self.meta
+        if meta is None:
+            dict.__setitem__(self, key, value)
+            return
+        packed = meta.get(key)
+        if packed is not None:
+            visits = (packed >> EPOCH_BITS) + 1
+        else:
+            visits = UNTRACKED_VISITS + 1 if key in self else 1
+        dict.__setitem__(self, key, value)
+        meta[key] = (visits << EPOCH_BITS) | self.epoch
+        self.updates += 1
+        if self.updates % EPOCH_UPDATES == 0:
+            self._next_epoch()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        if self.meta is not None:
+            self.meta.pop(key, None)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        """まとめて入れる（更新には数えず、上書きしたキーは記録の無いキーに戻す）"""
+        if len(args) == 1 and not kwargs and isinstance(args[0], dict):
+            other = args[0]  # 大きなQテーブルを読み込む時に写しを作らない
+        else:
+            other = dict(*args, **kwargs)
+        dict.update(self, other)
+        meta = self.meta
+        if meta:
+            for key in other:
+                meta.pop(key, None)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, key, *default):
+        if self.meta is not None:
+            self.meta.pop(key, None)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        if self.meta is not None:
+            self.meta.pop(key, None)
+        return key, value
+
+    def clear(self):
+        """全部消す（記録とエポックも最初に戻す）"""
+        dict.clear(self)
+        if self.meta is not None:
+            self.meta.clear()
+            self.epoch = 0
+            self.updates = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # 設定とコールバックは保存しない
+        state["auto_policy"] = None
+        state["on_evict"] = None
+        return state
+
+    def _next_epoch(self):
+        self.epoch += 1
+        policy = self.auto_policy
+        if policy is None:
+            return
+        max_entries = policy.get_max_entries(self)
+        if max_entries is not None and len(self) > max_entries:
+            self.evict(policy, AUTO_EVICT_HEADROOM)
+
+    def get_visits(self, key):
+        packed = self.meta.get(key)
+        return packed >> EPOCH_BITS if packed is not None else UNTRACKED_VISITS
+
+    def get_last_epoch(self, key):
+        packed = self.meta.get(key)
+        return packed & EPOCH_MASK if packed is not None else 0
+
+    def estimate_entry_bytes(self, samples=1000):
+        """1件あたりのおおよそのメモリ（キーの文字列・Q値・記録の整数・2つの dict の枠）"""
+        if not self:
+            return 0
+        total = 0
+        count = 0
+        for key, value in self.items():
+            total += sys.getsizeof(key) + sys.getsizeof(value)
+            packed = self.meta.get(key)
+            if packed is not None:
+                total += sys.getsizeof(packed)
+            count += 1
+            if count >= samples:
+                break
+        dict_slots = (sys.getsizeof(self) + sys.getsizeof(self.meta)) / len(self)
+        return total / count + dict_slots
+
+    def evict(self, policy, headroom=1.0):
+        """policy に当たる項目を消し、EvictionStats を返す（件数の上限は headroom 倍まで減らす）"""
+        start_time = time.perf_counter()
+        stats = EvictionStats(len(self), self.epoch)
+        current = self.epoch
+        meta = self.meta
+        victims = []
+        survivors = []
+        for key, value in self.items():
+            packed = meta.get(key)
+            if packed is None:
+                visits, last_epoch = UNTRACKED_VISITS, 0
+            else:
+                visits, last_epoch = packed >> EPOCH_BITS, packed & EPOCH_MASK
+            age = current - last_epoch
+            if policy.near_zero is not None and abs(value) <= policy.near_zero:
+                reason = "near_zero"
+            elif policy.max_age is not None and age > policy.max_age:
+                reason = "age"
+            elif visits < policy.min_visits and age >= policy.min_age:
+                reason = "visits"
+            else:
+                reason = None
+            if reason is None:
+                survivors.append((last_epoch, visits, key))
+            else:
+                victims.append((key, value, visits, reason))
+
+        max_entries = policy.get_max_entries(self)
+        if max_entries is not None:
+            max_entries = int(max_entries * headroom)
+        if max_entries is not None and len(survivors) > max_entries:
+            # 件数の上限を超える分は、古い順・更新回数の少ない順に消す
+            survivors.sort()
+            for last_epoch, visits, key in survivors[:len(survivors) - max_entries]:
+                victims.append((key, self[key], visits, "budget"))
+
+        for key, value, visits, reason in victims:
+            dict.__delitem__(self, key)
+            meta.pop(key, None)
+            stats.add(reason, value, visits)
+        stats.finish(len(self), time.perf_counter() - start_time)
+        self.evicted_total += stats.evicted
+        if self.on_evict is not None:
+            self.on_evict(stats)
+        return stats
+
+def as_tracked(qtable):
+    """TrackedQTable でなければ包み直す（中身は移すので元の dict は空になる）"""
+    if isinstance(qtable, TrackedQTable):
+        return qtable
+    tracked = TrackedQTable()
+    while qtable:
+        # 一度に全部をコピーすると一時的にメモリが倍になるので、元の dict から抜きながら移す
+        key, value = qtable.popitem()
+        dict.__setitem__(tracked, key, value)
+    return tracked
+
+class EvictionPolicy:
+    """刈り込みの条件（None や 0 の条件は使わない）"""
+    def __init__(self, min_visits=0, min_age=1, max_age=None, near_zero=None, max_entries=None, max_memory_mb=None):
+        self.min_visits = min_visits
+        self.min_age = min_age
+        self.max_age = max_age
+        self.near_zero = near_zero
+        self.max_entries = max_entries
+        self.max_memory_mb = max_memory_mb
+
+    def is_enabled(self):
+        return (self.min_visits > 0 or self.max_age is not None or self.near_zero is not None
+                or self.max_entries is not None or self.max_memory_mb is not None)
+
+    def get_max_entries(self, qtable):
+        """件数の上限（max_memory_mb はおおよその1件あたりのメモリで件数に直す）"""
+        limits = []
+        if self.max_entries is not None:
+            limits.append(self.max_entries)
+        if self.max_memory_mb is not None:
+            entry_bytes = qtable.estimate_entry_bytes()
+            if entry_bytes > 0:
+                limits.append(int(self.max_memory_mb * 1024 * 1024 / entry_bytes))
+        return min(limits) if limits else None
+
+class EvictionStats:
+    """1回の刈り込みで消した項目の内訳"""
+    REASONS = ("near_zero", "age", "visits", "budget")
+
+    def __init__(self, before, epoch):
+        self.before = before
+        self.after = before
+        self.epoch = epoch
+        self.elapsed = 0.0
+        self.by_reason = {reason: 0 for reason in self.REASONS}
+        self.evicted = 0
+        self.visits_total = 0
+        self.abs_q_total = 0.0
+        self.abs_q_max = 0.0
+
+    def add(self, reason, value, visits):
+        self.by_reason[reason] += 1
+        self.evicted += 1
+        self.visits_total += visits
+        self.abs_q_total += abs(value)
+        if abs(value) > self.abs_q_max:
+            self.abs_q_max = abs(value)
+
+    def finish(self, after, elapsed):
+        self.after = after
+        self.elapsed = elapsed
+
+    def __str__(self):
+        detail = " ".join(f"{reason}={count}" for reason, count in self.by_reason.items() if count)
+        text = f"刈り込み: {self.before} -> {self.after}件（{self.evicted}件削除 {detail or 'なし'}）{self.elapsed:.2f}秒"
+        if self.evicted:
+            text += (f" 削除分の平均更新回数={self.visits_total / self.evicted:.2f} "
+                     f"平均|Q|={self.abs_q_total / self.evicted:.3f} 最大|Q|={self.abs_q_max:.3f}")
+        return text
+
+def add_policy_arguments(parser):
+    """刈り込みの条件のコマンドライン引数を追加する（headless_trainer.py と共通）"""
+    parser.add_argument("--evict-near-zero", type=float, default=None, help="Q値の絶対値がこれ以下の項目を消す")
+    parser.add_argument("--evict-max-age", type=int, default=None, help="最後の更新からこのエポック数より古い項目を消す")
+    parser.add_argument("--evict-min-visits", type=int, default=0, help="更新回数がこれ未満の項目を消す")
+    parser.add_argument("--evict-min-age", type=int, default=1, help="--evict-min-visits で消すのはこのエポック数以上更新されていない項目だけ")
+    parser.add_argument("--max-entries", type=int, default=None, help="Qテーブルの件数の上限")
+    parser.add_argument("--max-memory-mb", type=float, default=None, help="Qテーブルのおおよそのメモリの上限（MB）")
+
+def policy_from_args(args):
+    return EvictionPolicy(args.evict_min_visits, args.evict_min_age, args.evict_max_age,
+                          args.evict_near_zero, args.max_entries, args.max_memory_mb)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qテーブルの更新回数の確認と刈り込み")
+    parser.add_argument("--qtable", default=QTABLE_PATH, help="Qテーブルのファイル")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="更新回数とエポックの分布を表示")
+    prune_parser = subparsers.add_parser("prune", help="条件に当たる項目を消して保存する")
+    add_policy_arguments(prune_parser)
+    prune_parser.add_argument("--output", default=None, help="保存先（省略時は上書き）")
+    args = parser.parse_args()
+
+    from ai_learning import load_qtable_from_file, save_qtable_to_file
+    # pickle から戻るのは qtable_store.TrackedQTable なので、__main__ ではなくモジュールの方で判定する
+    import qtable_store
+    qtable = qtable_store.as_tracked(load_qtable_from_file(args.qtable))
+    if args.command == "stats":
+        buckets = {}
+        for key in qtable:
+            visits = qtable.get_visits(key)
+            bucket = 1 << (visits.bit_length() - 1)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+        print(f"{args.qtable}: {len(qtable)}件 エポック{qtable.epoch} 更新{qtable.updates}回 "
+              f"記録あり{len(qtable.meta)}件 約{qtable.estimate_entry_bytes() * len(qtable) / 1024 / 1024:.1f}MB")
+        for bucket in sorted(buckets):
+            print(f"  更新 {bucket}〜{bucket * 2 - 1}回: {buckets[bucket]}件")
+    else:
+        policy = policy_from_args(args)
+        if not policy.is_enabled():
+            parser.error("刈り込みの条件を1つ以上指定してください")
+        print(qtable.evict(policy))
+        output = args.output or args.qtable
+        save_qtable_to_file(qtable, output)
+        print(f"{output} に保存しました")
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OthelloGame の盤面に対するαβ探索（ネガマックス法）
+
+使い方（探索速度の計測）:
+    python search.py --depth 4 --positions 20
+"""
+
+import argparse
+import random
+import time
+
+from constants import *
+from game_logic import OthelloGame
+from endgame import EndgameTimeout, count_empties
+from transposition import (
+    TranspositionTable, zobrist_hash, zobrist_update, zobrist_pass,
+    TT_EXACT, TT_LOWER, TT_UPPER
+)
+
+# 盤面の位置の分類（ai_qlearning_move の戦略的報酬と同じ）
+CORNERS = [(0,0), (0,7), (7,0), (7,7)]
+EDGES = [(0,1), (0,6), (1,0), (1,7), (6,0), (6,7), (7,1), (7,6)]
+STABLE_POSITIONS = [(0,1), (1,0), (1,1), (0,6), (1,6), (1,7), (6,0), (6,1), (7,1), (6,6), (6,7), (7,6)]
+CENTER_POSITIONS = [(3,3), (3,4), (4,3), (4,4)]
+
+# 終局した局面の評価値（勝ち負けが確定しているので、どの盤面評価よりも大きくする）
+WIN_SCORE = 100000
+
+# 反復深化の1手あたりの既定の思考時間（ミリ秒）と、持ち時間を確認するノード間隔
+DEFAULT_THINK_TIME_MS = 200
+DEADLINE_CHECK_INTERVAL = 32
+
+class SearchTimeout(Exception):
+    """探索中に持ち時間を使い切った"""
+
+def build_positional_table():
+    """REWARD_* 定数から位置ごとの重みの表を作る"""
+    table = [[REWARD_POSITIONAL for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+    for r, c in CORNERS:
+        table[r][c] += REWARD_CORNER
+    for r, c in EDGES:
+        table[r][c] += REWARD_EDGE
+    for r, c in STABLE_POSITIONS:
+        table[r][c] += REWARD_STABLE_STONE
+    for r, c in CENTER_POSITIONS:
+        table[r][c] += REWARD_TERRITORY
+    return table
+
+POSITIONAL_TABLE = build_positional_table()
+
+def terminal_score(diff):
+    """終局時の石差を評価値に変換（勝ちはどの盤面評価よりも大きく、負けは小さくする）"""
+    if diff > 0:
+        return WIN_SCORE + diff
+    if diff < 0:
+        return -WIN_SCORE + diff
+    return 0
+
+class Evaluator:
+    """盤面の評価関数（位置の重み + モビリティ + Q値）
+
+    評価値は player から見た値で、大きいほど player に有利。
+    """
+    def __init__(self, qtable=None, positional_weight=1.0, mobility_weight=REWARD_MOBILITY, q_weight=0.5):
+        self.qtable = qtable
+        self.positional_weight = positional_weight
+        self.mobility_weight = mobility_weight
+        self.q_weight = q_weight
+        self.table = POSITIONAL_TABLE
+
+    def evaluate(self, game, player):
+        """探索の末端の局面を評価"""
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        score = 0.0
+        for row, weights in zip(game.board, self.table):
+            for cell, weight in zip(row, weights):
+                if cell == player:
+                    score += weight
+                elif cell == opponent:
+                    score -= weight
+        score *= self.positional_weight
+
+        use_q = self.q_weight and self.qtable
+        if self.mobility_weight or use_q:
+            my_moves = game.get_valid_moves(player)
+            if self.mobility_weight:
+                score += self.mobility_weight * (len(my_moves) - len(game.get_valid_moves(opponent)))
+            if use_q and my_moves:
+                # 学習済みのQ値があれば、この局面での最善手のQ値を加える
+                state_key = game.get_board_state_key()
+                q_values = [self.qtable[key] for key in (f"{state_key}_{r}_{c}" for r, c in my_moves) if key in self.qtable]
+                if q_values:
+                    score += self.q_weight * max(q_values)
+        return score
+
+    def evaluate_terminal(self, game, player):
+        """終局した局面を評価（勝敗 + 石差）"""
+        black_score, white_score = game.get_score()
+        diff = black_score - white_score if player == PLAYER_BLACK else white_score - black_score
+        return terminal_score(diff)
+
+class AlphaBetaSearch:
+    """ネガマックス法のαβ探索
+
+    手の並べ替えには学習済みのQ値を使い（Q値が無ければ位置の重み）、枝刈りが起きやすい順に読む。
+    tt に TranspositionTable を渡すと、同じ局面の結果を再利用し、記録された最善手を最初に読む。
+    iterative_deepening() は持ち時間の範囲で深さ1から順に読み、最後に読み終えた深さの最善手を返す。
+    endgame に EndgameSolver を渡すと、空きマスがその閾値以下の局面では最後まで読み切る。
+    """
+    def __init__(self, depth=3, evaluator=None, qtable=None, tt=None, endgame=None):
+        self.depth = depth
+        self.qtable = qtable
+        self.evaluator = evaluator if evaluator is not None else Evaluator(qtable)
+        self.tt = tt
+        self.endgame = endgame
+        # 探索を打ち切る時刻（time.perf_counter() の値、None なら無制限）
+        self.deadline = None
+        # stop() で立つ打ち切りの印（反復深化を何回呼んでも clear_stop() を呼ぶまで残る）
+        self.stopped = False
+        # 直前の探索の統計
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.completed_depth = 0
+        # 累計の統計（エンジンの変更前後で速度を比べるため）
+        self.total_nodes = 0
+        self.total_elapsed = 0.0
+
+    def order_moves(self, game, moves, first_move=None):
+        """Q値の大きい順（同じなら位置の重みの大きい順）に手を並べる（first_move は先頭に置く）"""
+        table = POSITIONAL_TABLE
+        if self.qtable:
+            state_key = game.get_board_state_key()
+            get_q = self.qtable.get
+            ordered = sorted(moves, key=lambda m: (get_q(f"{state_key}_{m[0]}_{m[1]}", 0.0), table[m[0]][m[1]]), reverse=True)
+        else:
+            ordered = sorted(moves, key=lambda m: table[m[0]][m[1]], reverse=True)
+        if first_move is not None and first_move in ordered:
+            ordered.remove(first_move)
+            ordered.insert(0, first_move)
+        return ordered
+
+    def search(self, game, player=None, depth=None):
+        """最善手とその評価値を返す（打てる手が無ければ手は None）"""
+        if player is None:
+            player = game.current_player
+        if depth is None:
+            depth = self.depth
+        # 呼び出し元の盤面は書き換えない
+        game = game.snapshot()
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+
+        self.nodes = 0
+        start_time = time.perf_counter()
+        try:
+            return self._search_root(game, player, opponent, depth)
+        finally:
+            self.elapsed = time.perf_counter() - start_time
+            self.total_nodes += self.nodes
+            self.total_elapsed += self.elapsed
+
+    def _search_root(self, game, player, opponent, depth):
+        best_move = None
+        key = zobrist_hash(game.board, player) if self.tt is not None else 0
+        moves = game.get_valid_moves(player)
+        if not moves:
+            best_score = self._negamax(game, player, depth, -float('inf'), float('inf'), key)
+        else:
+            tt_move = None
+            if self.tt is not None:
+                entry = self.tt.probe(key)
+                if entry is not None:
+                    tt_move = entry[3]
+            best_score = -float('inf')
+            alpha, beta = -float('inf'), float('inf')
+            for r, c in self.order_moves(game, moves, tt_move):
+                flipped = game.apply_move(r, c, player)
+                child_key = zobrist_update(key, r, c, player, flipped) if self.tt is not None else 0
+                score = -self._negamax(game, opponent, depth - 1, -beta, -alpha, child_key)
+                game.undo_move(r, c, player, flipped)
+                if score > best_score:
+                    best_score = score
+                    best_move = (r, c)
+                if score > alpha:
+                    alpha = score
+            if self.tt is not None:
+                self.tt.store(key, depth, TT_EXACT, best_score, best_move)
+        return best_move, best_score
+
+    def iterative_deepening(self, game, player=None, time_limit_ms=DEFAULT_THINK_TIME_MS, max_depth=None):
+        """持ち時間 time_limit_ms の範囲で深さ1から順に読み、(最善手, 評価値, 読み終えた深さ) を返す
+
+        持ち時間を使い切った深さの途中結果は捨て、最後に読み終えた深さの最善手を使う。
+        深さ1も読み終わらなかった場合は並べ替えで先頭に来る手を返す（評価値は None、深さは 0）。
+        終盤の読み切りが持ち時間内に終わった場合は、読み切った結果（深さは空きマス数）を返す。
+        """
+        if player is None:
+            player = game.current_player
+        moves = game.get_valid_moves(player)
+        self.completed_depth = 0
+        if not moves:
+            return None, None, 0
+        empties = count_empties(game.board)
+        if max_depth is None:
+            max_depth = empties
+        best_move, best_score = self.order_moves(game, moves)[0], None
+        if len(moves) == 1 or self.stopped:
+            return best_move, best_score, 0  # 選ぶ余地が無いか、打ち切られているので読まない
+
+        start_time = time.perf_counter()
+        self.deadline = start_time + time_limit_ms / 1000
+        if self.endgame is not None and empties <= self.endgame.empties_threshold:
+            try:
+                move, diff = self.endgame.solve(game.board, player, self.deadline)
+            except EndgameTimeout:
+                pass  # 読み切れなかったので残りの時間で通常の探索をする
+            else:
+                self.deadline = None
+                self.completed_depth = empties
+                self.nodes = self.endgame.nodes
+                self.elapsed = time.perf_counter() - start_time
+                return move, terminal_score(diff), empties
+        nodes = 0
+        try:
+            for depth in range(1, max_depth + 1):
+                try:
+                    move, score = self.search(game, player, depth)
+                except SearchTimeout:
+                    nodes += self.nodes
+                    break
+                nodes += self.nodes
+                best_move, best_score = move, score
+                self.completed_depth = depth
+                # 残りのマスを読み切ったか、勝敗が確定したらそれ以上深く読んでも変わらない
+                if depth >= empties or abs(score) >= WIN_SCORE:
+                    break
+        finally:
+            self.deadline = None
+        self.nodes = nodes
+        self.elapsed = time.perf_counter() - start_time
+        return best_move, best_score, self.completed_depth
+
+    def stop(self):
+        """別スレッドから探索を打ち切る（反復深化は読み終えた深さまでの結果を返す）
+
+        探索と探索の間に呼んでも効くように印を残し、clear_stop() までの反復深化はすぐに返る。
+        """
+        self.stopped = True
+        if self.endgame is not None:
+            self.endgame.stopped = True
+        if self.deadline is not None:
+            self.deadline = 0.0
+        if self.endgame is not None and self.endgame.deadline is not None:
+            self.endgame.deadline = 0.0
+
+    def clear_stop(self):
+        """stop() の印を消す（新しい探索を始める時に、探索を始める側のスレッドで呼ぶ）"""
+        self.stopped = False
+        if self.endgame is not None:
+            self.endgame.stopped = False
+
+    def _negamax(self, game, player, depth, alpha, beta, key=0):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % DEADLINE_CHECK_INTERVAL == 0 and (self.stopped or time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        if depth <= 0:
+            return self.evaluator.evaluate(game, player)
+
+        # 置換表に十分な深さの結果があればそれを使う
+        tt = self.tt
+        tt_move = None
+        alpha_orig = alpha
+        if tt is not None:
+            entry = tt.probe(key)
+            if entry is not None:
+                tt_depth, tt_flag, tt_score, tt_move = entry
+                if tt_depth >= depth:
+                    if tt_flag == TT_EXACT:
+                        return tt_score
+                    if tt_flag == TT_LOWER and tt_score > alpha:
+                        alpha = tt_score
+                    elif tt_flag == TT_UPPER and tt_score < beta:
+                        beta = tt_score
+                    if alpha >= beta:
+                        return tt_score
+
+        moves = game.get_valid_moves(player)
+        if not moves:
+            if not game.get_valid_moves(opponent):
+                return self.evaluator.evaluate_terminal(game, player)
+            # パス
+            return -self._negamax(game, opponent, depth - 1, -beta, -alpha, zobrist_pass(key) if tt is not None else 0)
+
+        best_score = -float('inf')
+        best_move = None
+        for r, c in self.order_moves(game, moves, tt_move):
+            flipped = game.apply_move(r, c, player)
+            child_key = zobrist_update(key, r, c, player, flipped) if tt is not None else 0
+            score = -self._negamax(game, opponent, depth - 1, -beta, -alpha, child_key)
+            game.undo_move(r, c, player, flipped)
+            if score > best_score:
+                best_score = score
+                best_move = (r, c)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break  # βカット
+
+        if tt is not None:
+            if best_score <= alpha_orig:
+                flag = TT_UPPER
+            elif best_score >= beta:
+                flag = TT_LOWER
+            else:
+                flag = TT_EXACT
+            tt.store(key, depth, flag, best_score, best_move)
+        return best_score
+
+    def get_nps(self, total=False):
+        """1秒あたりの探索ノード数（total=True なら累計）"""
+        nodes, elapsed = (self.total_nodes, self.total_elapsed) if total else (self.nodes, self.elapsed)
+        return nodes / elapsed if elapsed > 0 else 0.0
+
+    def get_stats(self):
+        """直前の探索の統計"""
+        return {"nodes": self.nodes, "elapsed": self.elapsed, "nps": self.get_nps(), "depth": self.completed_depth}
+
+def make_random_position(rng, plies):
+    """初期局面からランダムに plies 手進めた局面と手番を返す（終局したら手前で止める）"""
+    game = OthelloGame()
+    player = PLAYER_BLACK
+    for _ in range(plies):
+        moves = game.get_valid_moves(player)
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        if not moves:
+            if not game.get_valid_moves(opponent):
+                break
+            player = opponent
+            continue
+        r, c = rng.choice(moves)
+        game.apply_move(r, c, player)
+        player = opponent
+    game.current_player = player
+    return game, player
+
+def benchmark(depth=3, positions=10, seed=1, qtable=None, min_plies=8, max_plies=40, tt_size_mb=0):
+    """ランダムな局面を探索してノード数と nps を表示する（tt_size_mb > 0 なら置換表を使う）"""
+    rng = random.Random(seed)
+    tt = TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None
+    searcher = AlphaBetaSearch(depth=depth, qtable=qtable, tt=tt)
+    for i in range(positions):
+        game, player = make_random_position(rng, rng.randint(min_plies, max_plies))
+        move, score = searcher.search(game, player)
+        move_text = f"{chr(ord('A') + move[1])}{move[0] + 1}" if move else "パス"
+        print(f"局面{i + 1:3d}: 最善手={move_text:>4} 評価値={score:9.1f} "
+              f"ノード数={searcher.nodes:8d} 時間={searcher.elapsed:6.2f}秒 nps={searcher.get_nps():9.0f}")
+    print(f"合計: ノード数={searcher.total_nodes} 時間={searcher.total_elapsed:.2f}秒 nps={searcher.get_nps(total=True):.0f}")
+    if tt is not None:
+        stats = tt.get_stats()
+        print(f"置換表: {stats['size_mb']}MB ({stats['capacity']}エントリ, 使用率{tt.get_usage() * 100:.1f}%) "
+              f"ヒット率={stats['hit_rate'] * 100:.1f}% 衝突率={stats['collision_rate'] * 100:.1f}%")
+    return searcher
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="αβ探索の速度計測")
+    parser.add_argument("--depth", type=int, default=3, help="探索の深さ")
+    parser.add_argument("--positions", type=int, default=10, help="計測する局面数")
+    parser.add_argument("--seed", type=int, default=1, help="局面を作る乱数のシード")
+    parser.add_argument("--use-qtable", action="store_true", help="qtable.pkl のQ値を評価・並べ替えに使う")
+    parser.add_argument("--tt-mb", type=float, default=0, help="置換表のサイズ（MB、0なら使わない）")
+    args = parser.parse_args()
+
+    qtable = None
+    if args.use_qtable:
+        from ai_learning import load_qtable
+        qtable = load_qtable()
+    benchmark(args.depth, args.positions, args.seed, qtable, tt_size_mb=args.tt_mb)
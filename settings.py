@@ -4,7 +4,7 @@ import json
 import os
 import math
 from constants import *
-from ui_components import get_japanese_font
+from ui_components import get_japanese_font, get_cached_surface, get_vertical_gradient_surface
 
 # 画面サイズ設定ファイル
 WINDOW_SIZE_CONFIG_FILE = "window_size_config.json"
@@ -39,7 +39,7 @@ def save_window_size_config(width, height):
     except Exception as e:
         print(f"画面サイズ設定の保存エラー: {e}")
 
-def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_total):
+def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_total, ai_think_time=200):
     """設定画面 - 詳細で魅力的なUI版"""
     global WINDOW_WIDTH, WINDOW_HEIGHT
     
@@ -51,6 +51,7 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
     # 設定項目の入力モード
     input_modes = {
         'ai_speed': False,
+        'ai_think_time': False,
         'pretrain_total': False,
         'alpha': False,
         'gamma': False,
@@ -62,6 +63,7 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
     # 入力テキスト
     input_texts = {
         'ai_speed': str(ai_speed),
+        'ai_think_time': str(ai_think_time),
         'pretrain_total': str(pretrain_total),
         'alpha': str(0.1),  # デフォルト値
         'gamma': str(0.9),  # デフォルト値
@@ -73,6 +75,7 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
     # ローカル変数として設定値を管理
     local_debug_mode = debug_mode
     local_ai_speed = ai_speed
+    local_ai_think_time = ai_think_time
     local_draw_mode = draw_mode
     local_pretrain_total = pretrain_total
     local_fast_mode = True  # デフォルト値
@@ -131,14 +134,16 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
                     current_tab = tab_clicked
                 # カスタム入力フィールドのクリック判定
                 for key in input_modes:
-                    if key in ['ai_speed', 'pretrain_total', 'alpha', 'gamma', 'epsilon', 'window_width', 'window_height']:
+                    if key in ['ai_speed', 'ai_think_time', 'pretrain_total', 'alpha', 'gamma', 'epsilon', 'window_width', 'window_height']:
                         input_rect = None  # 初期化
                         # 各設定項目の入力フィールドの位置を計算
                         if current_tab == 0:  # ゲーム設定タブ
                             if key == 'ai_speed':
                                 input_rect = pygame.Rect(WINDOW_WIDTH - 170, 150, 150, 50)
-                            elif key == 'pretrain_total':
+                            elif key == 'ai_think_time':
                                 input_rect = pygame.Rect(WINDOW_WIDTH - 170, 250, 150, 50)
+                            elif key == 'pretrain_total':
+                                input_rect = pygame.Rect(WINDOW_WIDTH - 170, 350, 150, 50)
                         elif current_tab == 1:  # AI学習設定タブ
                             if key == 'alpha':
                                 input_rect = pygame.Rect(WINDOW_WIDTH - 170, 150, 150, 50)
@@ -168,7 +173,7 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
                     # ESCキーで戻る場合、現在の入力値を保存してから戻る
                     print(f"設定画面: ESCキーで戻る - 現在の値 - pretrain_total: {local_pretrain_total}")
                     # 設定値を返す
-                    return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height
+                    return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height, local_ai_think_time
                 elif event.key == pygame.K_RETURN:
                     # 現在の入力モードを終了
                     for key in input_modes:
@@ -177,6 +182,10 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
                                 if key == 'ai_speed':
                                     local_ai_speed = int(input_texts[key])
                                     print(f"設定画面: AI思考速度を変更しました: {local_ai_speed}")
+                                elif key == 'ai_think_time':
+                                    local_ai_think_time = max(0, int(input_texts[key]))
+                                    input_texts[key] = str(local_ai_think_time)
+                                    print(f"設定画面: AI思考時間を変更しました: {local_ai_think_time}ms")
                                 elif key == 'pretrain_total':
                                     local_pretrain_total = int(input_texts[key])
                                     print(f"設定画面: 事前訓練回数を変更しました: {local_pretrain_total}")
@@ -204,6 +213,8 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
                                 # 無効な値の場合は元の値に戻す
                                 if key == 'ai_speed':
                                     input_texts[key] = str(local_ai_speed)
+                                elif key == 'ai_think_time':
+                                    input_texts[key] = str(local_ai_think_time)
                                 elif key == 'pretrain_total':
                                     input_texts[key] = str(local_pretrain_total)
                                 elif key == 'alpha':
@@ -260,10 +271,11 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
             # 戻るボタンが押された場合、現在の値を保存してから戻る
             print(f"設定画面: 戻るボタンで戻る - 現在の値 - pretrain_total: {local_pretrain_total}")
             # 設定値を返す
-            return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height
+            return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height, local_ai_think_time
         elif button_result == "default":
             # デフォルトボタンが押された場合、デフォルト値にリセット
             local_ai_speed = 60
+            local_ai_think_time = 200
             local_draw_mode = True
             local_pretrain_total = 10
             local_fast_mode = True
@@ -275,6 +287,7 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
             local_window_height = 800
             # 入力テキストも更新
             input_texts['ai_speed'] = str(local_ai_speed)
+            input_texts['ai_think_time'] = str(local_ai_think_time)
             input_texts['pretrain_total'] = str(local_pretrain_total)
             input_texts['alpha'] = str(local_alpha)
             input_texts['gamma'] = str(local_gamma)
@@ -293,16 +306,11 @@ def settings_screen(screen, font, debug_mode, ai_speed, draw_mode, pretrain_tota
     
     # 設定値を返す
     print(f"設定画面: 返される値 - pretrain_total: {local_pretrain_total}")
-    return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height
+    return local_debug_mode, local_ai_speed, local_draw_mode, local_pretrain_total, local_fast_mode, local_draw_mode, local_debug_mode, local_window_width, local_window_height, local_ai_think_time
 
 def draw_gradient_background(screen):
     """グラデーション風の背景を描画"""
-    for y in range(WINDOW_HEIGHT):
-        ratio = y / WINDOW_HEIGHT
-        r = int(240 + (220 - 240) * ratio)
-        g = int(240 + (230 - 240) * ratio)
-        b = int(240 + (250 - 240) * ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+    screen.blit(get_vertical_gradient_surface(WINDOW_WIDTH, WINDOW_HEIGHT, (240, 240, 240), (220, 230, 250)), (0, 0))
 
 def draw_category_title(screen, title, y, x_offset=0):
     """カテゴリタイトルを描画"""
@@ -613,12 +621,7 @@ def draw_preset_size_buttons_improved(screen, preset_sizes, x, y, mouse_pos, mou
 
 def draw_improved_background(screen):
     """シンプルなグラデーション風の背景を描画"""
-    for y in range(WINDOW_HEIGHT):
-        ratio = y / WINDOW_HEIGHT
-        r = int(240 + (220 - 240) * ratio)
-        g = int(240 + (230 - 240) * ratio)
-        b = int(240 + (250 - 240) * ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+    screen.blit(get_vertical_gradient_surface(WINDOW_WIDTH, WINDOW_HEIGHT, (240, 240, 240), (220, 230, 250)), (0, 0))
 
 def draw_romantic_section_header(screen, title, y, animation_time):
     """魅力的なセクションヘッダーを描画"""
@@ -972,20 +975,34 @@ def handle_slider_drag(key, x, slider_values, input_texts):
         slider_values['epsilon'] = new_value
         input_texts['epsilon'] = f"{new_value:.2f}"
 
-def draw_romantic_background(screen, animation_time):
-    global WINDOW_WIDTH, WINDOW_HEIGHT
-    """黒を基調とした背景を描画"""
-    # 黒のグラデーション背景
-    for y in range(WINDOW_HEIGHT):
-        ratio = y / WINDOW_HEIGHT
+# 背景の波の位相を何段階に量子化してキャッシュするか
+ROMANTIC_BACKGROUND_PHASE_STEPS = 64
+
+def _build_romantic_background(width, height, phase):
+    """黒を基調としたグラデーション背景を1列描いて横に引き伸ばす"""
+    column = pygame.Surface((1, height))
+    for y in range(height):
+        ratio = y / height
         # 黒から濃いグレーへのグラデーション
-        wave = math.sin(animation_time * 0.02 + ratio * 3.14) * 0.05
+        wave = math.sin(phase + ratio * 3.14) * 0.05
         
         r = int(max(0, min(255, 10 + (30 - 10) * ratio + wave * 20)))
         g = int(max(0, min(255, 10 + (30 - 10) * ratio + wave * 20)))
         b = int(max(0, min(255, 15 + (40 - 15) * ratio + wave * 25)))
         
-        pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+        column.set_at((0, y), (r, g, b))
+    return pygame.transform.scale(column, (width, height))
+
+def draw_romantic_background(screen, animation_time):
+    global WINDOW_WIDTH, WINDOW_HEIGHT
+    """黒を基調とした背景を描画"""
+    # 波の位相を量子化し、位相かウィンドウサイズが変わった時だけ背景を作り直す
+    step = int((animation_time * 0.02) / (2 * math.pi) * ROMANTIC_BACKGROUND_PHASE_STEPS) % ROMANTIC_BACKGROUND_PHASE_STEPS
+    phase = step * 2 * math.pi / ROMANTIC_BACKGROUND_PHASE_STEPS
+    size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+    background = get_cached_surface("romantic_background", (size, step),
+                                    lambda: _build_romantic_background(WINDOW_WIDTH, WINDOW_HEIGHT, phase))
+    screen.blit(background, (0, 0))
     
     # 星のような装飾（より控えめに）
     for i in range(15):
@@ -1070,6 +1087,11 @@ def draw_game_settings_tab(screen, input_texts, input_modes, slider_values, mous
                                        'ai_speed', input_modes, 
                                        y_offset, mouse_pos, mouse_down, font, animation_time)
     
+    # AI思考時間設定（1手あたりのミリ秒、0で探索しない）
+    y_offset = draw_romantic_input_field(screen, "AI思考時間 (ms)", input_texts['ai_think_time'], 
+                                       'ai_think_time', input_modes, 
+                                       y_offset, mouse_pos, mouse_down, font, animation_time)
+    
     # 事前訓練回数設定（カスタム入力）
     y_offset = draw_romantic_input_field(screen, "事前訓練回数", input_texts['pretrain_total'], 
                                        'pretrain_total', input_modes, 
@@ -1077,7 +1099,7 @@ def draw_game_settings_tab(screen, input_texts, input_modes, slider_values, mous
     
     # 詳細説明パネル
     draw_info_panel(screen, "💡 ヒント", 
-                   "AI思考速度を上げると対戦が速くなりますが、\nAIの思考時間が短くなるため精度が下がる可能性があります。\n事前訓練回数を増やすとAIの強さが向上します。", 
+                   "AI思考速度を上げると対戦が速くなります。\nAI思考時間は1手の上限で、長いほど深く読みます（0で探索なし）。\n事前訓練回数を増やすとAIの強さが向上します。", 
                    y_offset, animation_time)
 
 def draw_ai_learning_tab(screen, input_texts, input_modes, slider_values, mouse_pos, mouse_down, font, animation_time):
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constants import *
+from game_logic import OthelloGame
+from endgame import EndgameSolver, count_empties
+from search import make_random_position
+
+def minimax_diff(game, player):
+    """OthelloGame で最後まで読んだ、player から見た最終的な石差（空きマスは数えない）"""
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    moves = game.get_valid_moves(player)
+    if not moves:
+        if not game.get_valid_moves(opponent):
+            black_score, white_score = game.get_score()
+            return black_score - white_score if player == PLAYER_BLACK else white_score - black_score
+        return -minimax_diff(game, opponent)
+    best = -65
+    for r, c in moves:
+        flipped = game.apply_move(r, c, player)
+        best = max(best, -minimax_diff(game, opponent))
+        game.undo_move(r, c, player, flipped)
+    return best
+
+def make_wipeout_position():
+    """黒が (7, 7) に打つと白が全滅する局面（白は (0, 6) に打てる、空きは5マス）"""
+    game = OthelloGame()
+    game.board = [[PLAYER_BLACK] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    game.board[7][6] = PLAYER_WHITE
+    for r, c in [(7, 7), (0, 0), (0, 1), (0, 2), (0, 6)]:
+        game.board[r][c] = 0
+    return game
+
+def make_endgame_positions(rng, count):
+    """空きマスが9以下の局面（手番側がパスする局面も混ぜる）"""
+    positions = []
+    passes = 0
+    while len(positions) < count or passes < 3:
+        empties = rng.randint(1, 9)
+        game, player = make_random_position(rng, 60 - empties)
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        if count_empties(game.board) != empties or not (game.get_valid_moves(player) or game.get_valid_moves(opponent)):
+            continue
+        if not game.get_valid_moves(player):
+            passes += 1
+        elif len(positions) >= count:
+            continue
+        positions.append((game, player))
+    wipeout = make_wipeout_position()
+    positions += [(wipeout, PLAYER_BLACK), (wipeout, PLAYER_WHITE)]
+    return positions
+
+def test_solver_matches_minimax():
+    """solve() と solve_moves() の石差と最善手が、OthelloGame の全探索と同じか"""
+    solver = EndgameSolver()
+    for game, player in make_endgame_positions(random.Random(5), 25):
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        expected = minimax_diff(game, player)
+        move, score = solver.solve(game.board, player)
+        assert score == expected
+        results = solver.solve_moves(game.board, player)
+        moves = game.get_valid_moves(player)
+        assert set(results) == set(moves)
+        if not moves:
+            assert move is None
+            continue
+        assert max(results.values()) == expected and results[move] == expected
+        for (r, c), diff in results.items():
+            flipped = game.apply_move(r, c, player)
+            assert diff == -minimax_diff(game, opponent)
+            game.undo_move(r, c, player, flipped)
+
+    # 全滅させる手は、残った空きマスを数えずに石差で評価する
+    assert solver.solve(make_wipeout_position().board, PLAYER_BLACK) == ((7, 7), 60)
+
+def test_update_qtable_writes_results():
+    """update_qtable() が合法手ごとに勝ち・負け・引き分けの報酬を書き込むか"""
+    solver = EndgameSolver()
+    rewards = set()
+    for game, player in make_endgame_positions(random.Random(9), 12):
+        qtable = {}
+        moves = game.get_valid_moves(player)
+        assert solver.update_qtable(qtable, game, player) == len(moves)
+        assert len(qtable) == len(moves)
+        state_key = game.get_board_state_key()
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        for r, c in moves:
+            flipped = game.apply_move(r, c, player)
+            diff = -minimax_diff(game, opponent)
+            game.undo_move(r, c, player, flipped)
+            expected = REWARD_WIN if diff > 0 else REWARD_LOSE if diff < 0 else REWARD_DRAW
+            assert qtable[f"{state_key}_{r}_{c}"] == expected
+            rewards.add(expected)
+    assert REWARD_WIN in rewards and REWARD_LOSE in rewards
+
+if __name__ == "__main__":
+    test_solver_matches_minimax()
+    test_update_qtable_writes_results()
+    print("終盤の読み切りのテストが全て通りました。")
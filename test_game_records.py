@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from game_logic import OthelloGame
+from game_records import GameRecordStore, PASS_MOVE
+
+def play_random_games(count, seed=3):
+    """パスを含むランダムな対局を count 局打つ"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = OthelloGame()
+        while not game.game_over:
+            moves = game.get_valid_moves(game.current_player)
+            if moves:
+                r, c = rng.choice(moves)
+                game.make_move(r, c, game.current_player)
+            game.switch_player()
+            game.check_game_over()
+        games.append(game)
+    return games
+
+def test_records_round_trip():
+    """追記した対局を順に読んでもIDで読んでも同じ手順・最終局面に戻るか"""
+    games = play_random_games(30)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "records.bin")
+        with GameRecordStore(path) as store:
+            for game in games:
+                store.append_game(game, "ai_vs_ai")
+        with GameRecordStore(path) as store:
+            assert len(store) == len(games)
+            for record, game in zip(store, games):
+                assert record.to_move_list() == game.move_history
+                assert record.replay().board == game.board
+                assert (record.black_score, record.white_score) == game.get_score()
+            assert store.get(17).replay().board == games[17].board
+            assert any(PASS_MOVE in record.moves for record in store), "パスのある対局がありません"
+
+def test_records_recover_after_crash():
+    """書きかけのレコードと索引の欠けを開く時に直せるか"""
+    games = play_random_games(10)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "records.bin")
+        index_path = os.path.join(tmp_dir, "records.idx")
+        with GameRecordStore(path) as store:
+            for game in games:
+                store.append_game(game)
+        # 最後のレコードが途中で切れ、その前の索引も書かれなかった状態にする
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 5)
+        with open(index_path, "r+b") as f:
+            f.truncate(os.path.getsize(index_path) - 16)
+        with GameRecordStore(path) as store:
+            assert len(store) == 9
+            assert store.get(8).replay().board == games[8].board
+            store.append_game(games[0])
+            assert store.get(9).replay().board == games[0].board
+
+if __name__ == "__main__":
+    test_records_round_trip()
+    test_records_recover_after_crash()
+    print("対局記録のテストが全て通りました。")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constants import *
+from bitboard import board_to_bitboards, move_to_square
+from mcts import MCTSNode, MCTSTree, MCTSPlayer, PASS_SQUARE, DEFAULT_BATCH_SIZE, play_match
+from search import make_random_position
+
+def find_position(rng, accept):
+    """accept(局面, 手番) を満たすランダムな局面"""
+    while True:
+        game, player = make_random_position(rng, rng.randint(10, 58))
+        if accept(game, player):
+            return game, player
+
+def forcing_pass_move(game, player):
+    """打つと相手がパスするしかなくなる手（無ければ None、他にも打てる手がある局面だけ）"""
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    moves = game.get_valid_moves(player)
+    if len(moves) < 2:
+        return None
+    for r, c in moves:
+        flipped = game.apply_move(r, c, player)
+        forced = not game.get_valid_moves(opponent) and game.get_valid_moves(player)
+        game.undo_move(r, c, player, flipped)
+        if forced:
+            return r, c
+    return None
+
+def test_choose_move_is_legal():
+    """打つ手は常に合法手で、パスするしかない局面では None を返すか"""
+    rng = random.Random(3)
+    player_ai = MCTSPlayer(simulations=64, seed=1)
+    for _ in range(6):
+        game, player = find_position(rng, lambda g, p: len(g.get_valid_moves(p)) >= 2)
+        assert player_ai.choose_move(game, player) in game.get_valid_moves(player)
+
+    game, player = find_position(rng, lambda g, p: forcing_pass_move(g, p) is not None)
+    assert player_ai.choose_move(game, player) in game.get_valid_moves(player)
+    # 相手がパスする手の下には、パスの子ノードができる
+    move = forcing_pass_move(game, player)
+    tree = MCTSTree(seed=2)
+    p, o = board_to_bitboards(game.board, player)
+    root = MCTSNode(p, o, player)
+    for _ in range(len(game.get_valid_moves(player)) * 4):
+        tree._iterate(root)
+    child = next(c for c in root.children if c.move == move_to_square(*move))
+    assert [c.move for c in child.children] == [PASS_SQUARE]
+
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    game.apply_move(move[0], move[1], player)
+    assert player_ai.choose_move(game, opponent) is None
+
+def test_simulation_budget():
+    """根の訪問回数がシミュレーション回数の予算どおりか"""
+    game, player = find_position(random.Random(4), lambda g, p: len(g.get_valid_moves(p)) >= 3)
+    p, o = board_to_bitboards(game.board, player)
+    for simulations in (40, 101):
+        tree = MCTSTree(seed=1)
+        stats = tree.run(p, o, player, simulations)
+        root_visits = sum(visits for visits, _ in stats.values())
+        assert root_visits == tree.simulations
+        assert simulations <= tree.simulations < simulations + DEFAULT_BATCH_SIZE
+
+def test_root_parallel_merges_visits():
+    """workers=2 でも合法手を返し、根の訪問回数が両方のワーカーの合計になるか"""
+    game, player = find_position(random.Random(5), lambda g, p: len(g.get_valid_moves(p)) >= 3)
+    player_ai = MCTSPlayer(simulations=80, workers=2, seed=1)
+    try:
+        move = player_ai.choose_move(game, player)
+    finally:
+        player_ai.shutdown()
+    assert move in game.get_valid_moves(player)
+    assert set(player_ai.last_visits) <= set(game.get_valid_moves(player))
+    assert sum(player_ai.last_visits.values()) == player_ai.last_simulations
+    # 1ワーカーあたり 40 回（バッチ単位で切り上げ）
+    assert player_ai.last_simulations == 2 * 40
+    assert player_ai.last_visits[move] == max(player_ai.last_visits.values())
+
+def test_beats_random_player():
+    """ランダムに打つ相手に勝ち越すか"""
+    wins, losses, draws = play_match(MCTSPlayer(simulations=64, seed=1), None, games=4, seed=1)
+    assert wins >= 3
+
+if __name__ == "__main__":
+    test_choose_move_is_legal()
+    test_simulation_budget()
+    test_root_parallel_merges_visits()
+    test_beats_random_player()
+    print("MCTSのテストが全て通りました。")
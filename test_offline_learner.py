@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from game_logic import OthelloGame
+from game_records import GameRecordStore
+from headless_trainer import SelfPlayTrainer
+from offline_learner import OfflineLearner
+
+def test_offline_learner_matches_qlearning_move():
+    """記録を再生した結果が、同じ手を ai_qlearning_move で打ち直した時のQテーブルと一致するか"""
+    random.seed(5)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "records.bin")
+        with GameRecordStore(path) as store:
+            SelfPlayTrainer({}, records=store).run(30)
+
+        expected = {}
+        with GameRecordStore(path, readonly=True) as store:
+            for record in store:
+                game = OthelloGame()
+                for player, r, c in record.to_move_list():
+                    game.ai_qlearning_move(expected, learn=True, player=player, action=(r, c))
+
+        qtable = {}
+        learner = OfflineLearner(qtable, chunk_games=7)
+        learner.learn(path)
+        assert learner.games == 30
+        assert qtable == expected
+
+        # 混ぜて更新しても同じ行動キーが学習される
+        shuffled = {}
+        OfflineLearner(shuffled, shuffle_buffer=500, seed=1).learn(path, passes=2)
+        assert shuffled.keys() == expected.keys()
+
+if __name__ == "__main__":
+    test_offline_learner_matches_qlearning_move()
+    print("オフライン学習のテストが全て通りました。")
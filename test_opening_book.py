@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constants import *
+from game_logic import OthelloGame
+from opening_book import (
+    OpeningBook, HEADER, RECORD, select_book_entries, write_book, load_opening_book
+)
+
+def make_opening_qtable(games=60, plies=8, seed=2):
+    """序盤をランダムに打ち、通った局面の全ての合法手に乱数のQ値を入れたQテーブルと、(局面, 手番) の一覧"""
+    rng = random.Random(seed)
+    qtable = {}
+    positions = {}
+    for _ in range(games):
+        game = OthelloGame()
+        player = PLAYER_BLACK
+        for _ in range(plies):
+            moves = game.get_valid_moves(player)
+            if not moves:
+                break
+            state_key = game.get_board_state_key()
+            positions[state_key] = (game.snapshot(), player)
+            for r, c in moves:
+                qtable.setdefault(f"{state_key}_{r}_{c}", rng.uniform(-10.0, 10.0))
+            r, c = rng.choice(moves)
+            game.apply_move(r, c, player)
+            player = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    return qtable, list(positions.values())
+
+def test_probe_move_returns_q_argmax():
+    """定跡に入れた全ての局面で Q値が最大の手を引き、定跡に無い局面では None になるか"""
+    qtable, positions = make_opening_qtable()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "book.obk")
+        entries = select_book_entries(qtable, max_plies=6, min_tried=1, min_margin=0.0)
+        assert write_book(entries, path, 6) == len(entries)
+        with OpeningBook(path) as book:
+            assert len(book) == len(entries)
+            hits = 0
+            for game, player in positions:
+                state_key = game.get_board_state_key()
+                move = book.probe_move(game, player)
+                if state_key not in entries:
+                    assert move is None  # 6手目より後の局面
+                    continue
+                best = max(game.get_valid_moves(player), key=lambda m: qtable[f"{state_key}_{m[0]}_{m[1]}"])
+                assert move == best
+                hits += 1
+            assert hits == len(entries) < len(positions)
+            # 盤面が定跡に無い局面
+            game = positions[0][0].snapshot()
+            game.board[0][0] = PLAYER_BLACK
+            assert book.probe(game.board) is None
+
+def test_rejects_broken_files():
+    """マジックの違うファイルや途中で切れたファイルを開かないか"""
+    qtable, _ = make_opening_qtable(games=10, plies=4)
+    entries = select_book_entries(qtable, min_tried=1, min_margin=0.0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "book.obk")
+        write_book(entries, path)
+        with open(path, "rb") as f:
+            data = f.read()
+        broken_files = [b"XXXX" + data[4:], data[:HEADER.size + RECORD.size * (len(entries) - 1)], data[:HEADER.size - 1]]
+        for broken in broken_files:
+            with open(path, "wb") as f:
+                f.write(broken)
+            try:
+                OpeningBook(path).close()
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("壊れた定跡ファイルを開けてしまいました")
+            assert load_opening_book(path) is None
+
+def test_select_book_entries_filters():
+    """試された手の数と、最善手と次善手のQ値の差の条件で局面を選ぶか"""
+    one_move = "0" * 27 + "12" + "0" * 6 + "21" + "0" * 27
+    close = "0" * 27 + "21" + "0" * 6 + "12" + "0" * 27
+    clear = "0" * 19 + "1" + "0" * 7 + "11" + "0" * 6 + "21" + "0" * 27
+    qtable = {
+        f"{one_move}_2_3": 5.0,
+        f"{close}_2_4": 3.0,
+        f"{close}_3_5": 2.5,
+        f"{clear}_2_2": 1.0,
+        f"{clear}_4_5": 4.0,
+    }
+    assert select_book_entries(qtable, min_tried=2, min_margin=1.0) == {clear: (4, 5, 4.0)}
+    assert select_book_entries(qtable, min_tried=2, min_margin=0.5) == {close: (2, 4, 3.0), clear: (4, 5, 4.0)}
+    assert set(select_book_entries(qtable, min_tried=1, min_margin=1.0)) == {one_move, clear}
+    assert select_book_entries(qtable, min_tried=3, min_margin=0.0) == {}
+
+if __name__ == "__main__":
+    test_probe_move_returns_q_argmax()
+    test_rejects_broken_files()
+    test_select_book_entries_filters()
+    print("定跡のテストが全て通りました。")
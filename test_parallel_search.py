@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import parallel_search
+from search import AlphaBetaSearch
+from parallel_search import ParallelRootSearch, make_benchmark_positions, root_move_value
+
+def test_parallel_matches_single_search():
+    """決まった局面集で、並列探索がシングルスレッドと同じ評価値と、その値になる手を返すか"""
+    depth = 4
+    positions = make_benchmark_positions(6, seed=1)
+    single = AlphaBetaSearch(depth=depth)
+    parallel = ParallelRootSearch(depth=depth, workers=2)
+    try:
+        for game, player in positions:
+            single_move, single_score = single.search(game, player)
+            move, score = parallel.search(game, player)
+            assert score == single_score
+            # 同点の手が複数あれば違う手を選ぶことがあるが、その手の本当の値は最善の評価値と同じ
+            assert move == single_move or root_move_value(game, player, move, depth) == single_score
+    finally:
+        parallel.shutdown()
+
+def test_root_move_reports_fail_low():
+    """共有αを超えなかった手は上限値として返し、超えた手だけ正確な値として返すか"""
+    depth = 3
+    game, player = make_benchmark_positions(1, seed=2)[0]
+    move = game.get_valid_moves(player)[0]
+    value = root_move_value(game, player, move, depth)
+    shared_alpha = multiprocessing.Value('d', -float('inf'))
+    parallel_search._init_worker(None, shared_alpha, 0)
+
+    _, score, _, exact = parallel_search._search_root_move(game.board, player, move, depth)
+    assert exact and score == value and shared_alpha.value == value
+
+    shared_alpha.value = value + 1000.0
+    _, score, _, exact = parallel_search._search_root_move(game.board, player, move, depth)
+    assert not exact and score <= value + 1000.0
+    assert shared_alpha.value == value + 1000.0
+
+if __name__ == "__main__":
+    test_parallel_matches_single_search()
+    test_root_move_reports_fail_low()
+    print("並列探索のテストが全て通りました。")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from game_logic import OthelloGame, PLAYER_BLACK, PLAYER_WHITE
+from perft import BACKENDS, PERFT_REFERENCE, PASS_TEST_REFERENCE, make_test_positions, run_perft
+
+def test_perft_initial_position():
+    """初期局面からの末端局面数が既知の値と一致するか（重い深さはビットボードだけ）"""
+    for backend, max_depth in (("list", 6), ("bitboard", 8)):
+        for depth in range(1, max_depth + 1):
+            nodes, elapsed = run_perft(backend, OthelloGame(), PLAYER_BLACK, depth)
+            assert nodes == PERFT_REFERENCE[depth], f"{backend} 深さ{depth}: {nodes} != {PERFT_REFERENCE[depth]}"
+        print(f"{backend}: 深さ{max_depth} {nodes}局面 {nodes / elapsed:.0f}局面/秒")
+
+def test_perft_with_passes():
+    """パスが起きる局面で、どの実装も既知の値と一致するか"""
+    name, game, player, reference = make_test_positions()[0]
+    for backend in BACKENDS:
+        for depth, expected in reference.items():
+            if backend == "list" and depth > 5:
+                continue
+            nodes, _ = run_perft(backend, game, player, depth)
+            assert nodes == expected, f"{name} {backend} 深さ{depth}: {nodes} != {expected}"
+
+def test_perft_backends_agree():
+    """テスト局面集で実装同士の結果が一致するか（盤面を書き換えないことも確認）"""
+    for name, game, player, _ in make_test_positions():
+        board_before = [row[:] for row in game.board]
+        counts = {backend: run_perft(backend, game, player, 3)[0] for backend in BACKENDS}
+        assert len(set(counts.values())) == 1, f"{name}: {counts}"
+        assert game.board == board_before, f"{name}: 盤面が書き換えられました"
+
+if __name__ == "__main__":
+    test_perft_initial_position()
+    test_perft_with_passes()
+    test_perft_backends_agree()
+    print("perftのテストが全て通りました。")
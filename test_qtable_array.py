@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import pickle
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from qtable_array import ArrayQTable, from_mapping, parse_key, format_key, VALUE_TYPES
+
+def random_qtable(count, seed=5):
+    """ランダムな盤面とマスのキーに ±250 のQ値を入れた dict"""
+    rng = random.Random(seed)
+    qtable = {}
+    while len(qtable) < count:
+        board = "".join(rng.choice("0012") for _ in range(64))
+        qtable[f"{board}_{rng.randrange(8)}_{rng.randrange(8)}"] = rng.uniform(-250.0, 250.0)
+    return qtable
+
+def test_array_qtable_matches_dict():
+    """作り直し・削除・pickle を通しても dict と同じキーと（誤差の範囲の）値を持つか"""
+    qtable = random_qtable(3000)
+    for key in list(qtable)[:20]:
+        assert format_key(*parse_key(key)) == key
+    for value_type, tolerance in (("float32", 1e-4), ("float16", 0.2), ("int16", 1 / 64)):
+        table = ArrayQTable(value_type, capacity=8)  # 何度も作り直させる
+        table.update(qtable)
+        removed = list(qtable)[::3]
+        for key in removed:
+            del table[key]
+        table = pickle.loads(pickle.dumps(table))
+        expected = {key: value for key, value in qtable.items() if key not in set(removed)}
+        assert len(table) == len(expected)
+        assert set(table) == set(expected)
+        for key, value in expected.items():
+            assert abs(table[key] - value) <= tolerance, (value_type, key)
+        for key in removed[:50]:
+            assert key not in table and table.get(key, 0.0) == 0.0
+
+def test_from_mapping_value_types():
+    """from_mapping で作った表が各形式でQ値を引けるか"""
+    qtable = random_qtable(200, seed=9)
+    for value_type in VALUE_TYPES:
+        table = from_mapping(qtable, value_type)
+        assert len(table) == len(qtable)
+        assert table.capacity * 0.7 >= len(qtable)
+        key = next(iter(qtable))
+        assert abs(table.get(key) - qtable[key]) < 0.2
+
+if __name__ == "__main__":
+    test_array_qtable_matches_dict()
+    test_from_mapping_value_types()
+    print("ArrayQTable のテストが全て通りました。")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import qtable_store
+from ai_learning import load_qtable_from_file
+from qtable_array import ArrayQTable
+from qtable_snapshot import save_snapshot, load_snapshot, available_codecs, HEADER
+
+def random_qtable(count, seed=7):
+    rng = random.Random(seed)
+    qtable = {}
+    while len(qtable) < count:
+        board = "".join(rng.choice("0012") for _ in range(64))
+        qtable[f"{board}_{rng.randrange(8)}_{rng.randrange(8)}"] = rng.uniform(-250.0, 250.0)
+    return qtable
+
+def test_snapshot_round_trip():
+    """どの圧縮形式でも、チャンクをまたいで同じQテーブル（値も完全に同じ）に戻るか"""
+    qtable = random_qtable(2500)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.qts")
+        for codec in available_codecs():
+            assert save_snapshot(qtable, path, codec, chunk_entries=1000) == len(qtable)
+            assert load_snapshot(path) == qtable
+        into = load_snapshot(path, ArrayQTable())
+        assert len(into) == len(qtable)
+
+def test_snapshot_detects_corruption():
+    """本体を書き換えたり切ったりしたファイルは ValueError になるか"""
+    qtable = random_qtable(500)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.qts")
+        save_snapshot(qtable, path, "zlib")
+        with open(path, "rb") as f:
+            data = bytearray(f.read())
+        flipped = bytearray(data)
+        flipped[HEADER.size + 20] ^= 0xFF
+        for broken in (data[:len(data) - 40], flipped):
+            with open(path, "wb") as f:
+                f.write(broken)
+            try:
+                load_snapshot(path)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("壊れたスナップショットを読めてしまいました")
+
+def test_failed_save_leaves_no_temporary_file():
+    """途中で失敗した保存は一時ファイルを残さず、前のスナップショットも壊さないか"""
+    qtable = random_qtable(300)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.qts")
+        save_snapshot(qtable, path, "zlib")
+        broken = dict(qtable)
+        broken["not a state key"] = 1.0
+        try:
+            save_snapshot(broken, path, "zlib", chunk_entries=100)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("不正なキーを保存できてしまいました")
+        assert os.listdir(tmp_dir) == ["qtable.qts"]
+        assert load_snapshot(path) == qtable
+
+def test_load_into_tracked_qtable_is_not_counted():
+    """TrackedQTable に読み込んでも更新に数えず、エポックも進まず刈り込みも起きないか"""
+    qtable = random_qtable(qtable_store.EPOCH_UPDATES + 100)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.qts")
+        save_snapshot(qtable, path, "zlib")
+        into = qtable_store.TrackedQTable()
+        into.auto_policy = qtable_store.EvictionPolicy(max_entries=10)
+        assert load_qtable_from_file(path, into) is into
+        assert dict(into) == qtable
+        assert into.updates == 0 and into.epoch == 0 and into.evicted_total == 0
+
+if __name__ == "__main__":
+    test_snapshot_round_trip()
+    test_snapshot_detects_corruption()
+    test_failed_save_leaves_no_temporary_file()
+    test_load_into_tracked_qtable_is_not_counted()
+    print("スナップショットのテストが全て通りました。")
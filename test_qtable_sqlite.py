@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import pickle
+import random
+import sqlite3
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from headless_trainer import SelfPlayTrainer
+from qtable_sqlite import SQLiteQTable
+
+def test_sqlite_qtable_matches_dict():
+    """小さいキャッシュとバッチで自己対戦しても、dict で学習したのと同じQテーブルになるか"""
+    random.seed(4)
+    expected = {}
+    SelfPlayTrainer(expected).run(20)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.db")
+        random.seed(4)
+        with SQLiteQTable(path, cache_size=300, batch_size=100) as table:
+            SelfPlayTrainer(table).run(20)
+            assert len(table) == len(expected)
+            assert table.flushes > 1
+        with SQLiteQTable(path) as table:
+            assert len(table) == len(expected)
+            assert dict(table.items()) == expected
+            # pickle すると読み取り専用で開き直す（別プロセスの読み手に渡す時と同じ）
+            reader = pickle.loads(pickle.dumps(table))
+            key = next(iter(expected))
+            assert reader.readonly and reader.get(key) == expected[key]
+            table[key] = 12.5
+            table.flush()
+            reader.clear_cache()
+            assert reader[key] == 12.5
+            reader.close()
+
+def test_no_save_leaves_database_empty():
+    """--no-save の学習では、バッチ何回分の更新をしてもDBに1件も書かないか"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "qtable.db")
+        env = dict(os.environ, PYTHONPATH=repo_dir, SDL_VIDEODRIVER="dummy")
+        subprocess.run([sys.executable, os.path.join(repo_dir, "headless_trainer.py"), "--games", "200",
+                        "--no-save", "--seed", "1", "--sqlite", path],
+                       cwd=tmp_dir, env=env, check=True, stdout=subprocess.DEVNULL)
+        conn = sqlite3.connect(path)
+        assert conn.execute("SELECT COUNT(*) FROM qvalues").fetchone()[0] == 0
+        conn.close()
+        assert not os.path.exists(os.path.join(tmp_dir, "qtable.pkl"))
+
+if __name__ == "__main__":
+    test_sqlite_qtable_matches_dict()
+    test_no_save_leaves_database_empty()
+    print("SQLiteQTable のテストが全て通りました。")
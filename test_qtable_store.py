@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import pickle
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import qtable_store
+from qtable_store import TrackedQTable, EvictionPolicy, as_tracked
+
+def test_tracked_qtable_pickle_round_trip():
+    """更新回数とエポックが pickle を通しても残り、読み込みでは数えられないか"""
+    qtable = as_tracked({"old": 0.5})
+    for i in range(qtable_store.EPOCH_UPDATES + 5):
+        qtable["hot"] = qtable.get("hot", 0.0) + 1.0
+    qtable["cold"] = 2.0
+    restored = pickle.loads(pickle.dumps(qtable))
+    assert isinstance(restored, TrackedQTable)
+    assert dict(restored) == dict(qtable)
+    assert restored.epoch == 1
+    assert restored.updates == qtable.updates
+    assert restored.get_visits("hot") == qtable.get_visits("hot")
+    assert restored.get_visits("old") == qtable_store.UNTRACKED_VISITS
+    assert restored.get_last_epoch("cold") == 1
+    restored["cold"] = 3.0
+    assert restored.get_visits("cold") == qtable.get_visits("cold") + 1
+
+def test_evict_by_policy():
+    """各条件で消える項目と、件数の上限で古い順に消えるか"""
+    qtable = TrackedQTable()
+    qtable["zero"] = 0.001
+    qtable["once"] = 5.0
+    for _ in range(3):
+        qtable["often"] = 5.0
+    qtable.epoch = 10
+    for _ in range(3):
+        qtable["recent"] = 5.0
+
+    stats = qtable.evict(EvictionPolicy(min_visits=3, near_zero=0.01))
+    assert set(qtable) == {"often", "recent"}
+    assert stats.by_reason["near_zero"] == 1 and stats.by_reason["visits"] == 1
+    assert stats.before == 4 and stats.after == 2
+
+    stats = qtable.evict(EvictionPolicy(max_entries=1))
+    assert set(qtable) == {"recent"}
+    assert stats.by_reason["budget"] == 1
+    assert "often" not in qtable.meta
+
+    qtable.epoch = 20
+    stats = qtable.evict(EvictionPolicy(max_age=5))
+    assert len(qtable) == 0 and stats.by_reason["age"] == 1
+    assert qtable.evicted_total == 4
+
+def test_dict_methods_keep_meta_consistent():
+    """clear / update / pop / popitem / setdefault でも記録が項目とずれないか"""
+    qtable = TrackedQTable()
+    for _ in range(qtable_store.EPOCH_UPDATES):
+        qtable["a"] = 1.0
+    qtable["b"] = 2.0
+    assert qtable.epoch == 1 and qtable.get_visits("a") == qtable_store.EPOCH_UPDATES
+
+    # まとめて入れた分は更新に数えず、上書きしたキーは記録の無いキーになる
+    updates = qtable.updates
+    qtable.update({"a": 3.0, "c": 4.0}, d=5.0)
+    qtable |= [("e", 6.0)]
+    assert qtable.updates == updates and qtable.epoch == 1
+    assert qtable["a"] == 3.0 and qtable.get_visits("a") == qtable_store.UNTRACKED_VISITS
+    assert set(qtable.meta) == {"b"}
+
+    assert qtable.setdefault("f", 7.0) == 7.0 and qtable.get_visits("f") == 1
+    assert qtable.setdefault("f", 8.0) == 7.0 and qtable.get_visits("f") == 1
+    assert qtable.pop("b") == 2.0 and "b" not in qtable.meta
+    assert qtable.pop("b", None) is None
+    key, _ = qtable.popitem()
+    assert key == "f" and "f" not in qtable.meta
+
+    qtable["g"] = 1.0
+    qtable.clear()
+    assert len(qtable) == 0 and not qtable.meta
+    assert qtable.epoch == 0 and qtable.updates == 0
+    qtable["a"] = 1.0
+    assert qtable.get_visits("a") == 1 and qtable.get_last_epoch("a") == 0
+
+if __name__ == "__main__":
+    test_tracked_qtable_pickle_round_trip()
+    test_evict_by_policy()
+    test_dict_methods_keep_meta_consistent()
+    print("Qテーブルの刈り込みのテストが全て通りました。")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constants import *
+from endgame import EndgameSolver
+from search import AlphaBetaSearch, make_random_position
+
+def naive_negamax(game, player, depth, evaluator):
+    """枝刈りしないネガマックス（αβ探索の答え合わせ用）"""
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    if depth <= 0:
+        return evaluator.evaluate(game, player)
+    moves = game.get_valid_moves(player)
+    if not moves:
+        if not game.get_valid_moves(opponent):
+            return evaluator.evaluate_terminal(game, player)
+        return -naive_negamax(game, opponent, depth - 1, evaluator)
+    best = -float('inf')
+    for r, c in moves:
+        flipped = game.apply_move(r, c, player)
+        best = max(best, -naive_negamax(game, opponent, depth - 1, evaluator))
+        game.undo_move(r, c, player, flipped)
+    return best
+
+def make_pass_position(rng):
+    """手番側がパスするしかない（相手は打てる）局面"""
+    while True:
+        game, player = make_random_position(rng, rng.randint(40, 60))
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        if not game.get_valid_moves(player) and game.get_valid_moves(opponent):
+            return game, player
+
+def test_alphabeta_matches_minimax():
+    """深さ1〜3のαβ探索の評価値が、枝刈りしない探索と同じで、最善手もその値になるか（パスする局面を含む）"""
+    rng = random.Random(11)
+    positions = [make_random_position(rng, rng.randint(4, 56)) for _ in range(8)]
+    positions += [make_pass_position(rng) for _ in range(2)]
+    for game, player in positions:
+        opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+        for depth in (1, 2, 3):
+            searcher = AlphaBetaSearch(depth=depth)
+            move, score = searcher.search(game, player)
+            assert score == naive_negamax(game, player, depth, searcher.evaluator)
+            if move is None:
+                assert not game.get_valid_moves(player)
+                continue
+            flipped = game.apply_move(move[0], move[1], player)
+            assert -naive_negamax(game, opponent, depth - 1, searcher.evaluator) == score
+            game.undo_move(move[0], move[1], player, flipped)
+
+def test_stop_is_sticky_between_searches():
+    """探索と探索の間に stop() しても、clear_stop() までの反復深化は読まずにすぐ返るか"""
+    game, player = make_random_position(random.Random(3), 12)
+    searcher = AlphaBetaSearch(endgame=EndgameSolver())
+    searcher.stop()
+    for _ in range(3):
+        start_time = time.perf_counter()
+        move, score, depth = searcher.iterative_deepening(game, player, 5000)
+        assert move in game.get_valid_moves(player) and score is None and depth == 0
+        assert time.perf_counter() - start_time < 1.0
+
+    # 読んでいる途中の stop() も効き、読み終えた深さまでの結果を返す
+    searcher.clear_stop()
+    timer = threading.Timer(0.2, searcher.stop)
+    timer.start()
+    start_time = time.perf_counter()
+    move, score, depth = searcher.iterative_deepening(game, player, 60000, max_depth=30)
+    timer.join()
+    assert time.perf_counter() - start_time < 5.0
+    assert move in game.get_valid_moves(player) and depth >= 1
+    assert searcher.stopped and searcher.endgame.stopped
+
+    searcher.clear_stop()
+    assert searcher.iterative_deepening(game, player, 5000, max_depth=2)[2] == 2
+
+if __name__ == "__main__":
+    test_alphabeta_matches_minimax()
+    test_stop_is_sticky_between_searches()
+    print("探索のテストが全て通りました。")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constants import *
+from game_logic import OthelloGame
+from search import AlphaBetaSearch, make_random_position
+from transposition import (
+    TranspositionTable, zobrist_hash, zobrist_update, zobrist_pass,
+    TT_EXACT, TT_LOWER, TT_UPPER
+)
+
+def test_search_same_with_and_without_tt():
+    """置換表（入れ替えが起きる小さいもの）を使っても、固定の深さの探索結果が変わらないか"""
+    rng = random.Random(5)
+    for _ in range(8):
+        game, player = make_random_position(rng, rng.randint(6, 50))
+        for depth in (3, 4):
+            expected = AlphaBetaSearch(depth=depth).search(game, player)
+            assert AlphaBetaSearch(depth=depth, tt=TranspositionTable(0.002)).search(game, player) == expected
+        # 浅い探索の結果が残った置換表で深く読み直しても評価値は同じ
+        searcher = AlphaBetaSearch(tt=TranspositionTable(0.002))
+        for depth in (1, 2, 3, 4):
+            assert searcher.search(game, player, depth)[1] == AlphaBetaSearch(depth=depth).search(game, player)[1]
+
+def test_zobrist_update_matches_full_hash():
+    """打った手とパスで差分更新したハッシュ値が、盤面から計算し直した値と同じか"""
+    rng = random.Random(8)
+    for _ in range(5):
+        game = OthelloGame()
+        player = PLAYER_BLACK
+        h = zobrist_hash(game.board, player)
+        passed = False
+        while True:
+            opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+            moves = game.get_valid_moves(player)
+            if moves:
+                passed = False
+                r, c = rng.choice(moves)
+                h = zobrist_update(h, r, c, player, game.apply_move(r, c, player))
+            elif passed:
+                break
+            else:
+                passed = True
+                h = zobrist_pass(h)
+            player = opponent
+            assert h == zobrist_hash(game.board, player)
+
+def test_store_probe_and_replacement():
+    """保存した深さ・種類・評価値・最善手がそのまま引けるか、深さ優先スロットに深い方が残るか"""
+    tt = TranspositionTable(0.001)
+    key = 0x123456789ABCDEF
+    assert tt.probe(key) is None
+    tt.store(key, 5, TT_LOWER, 12.75, (2, 3))
+    assert tt.probe(key) == (5, TT_LOWER, 12.75, (2, 3))
+    tt.store(key, 6, TT_EXACT, -3.5)
+    assert tt.probe(key) == (6, TT_EXACT, -3.5, None)
+    tt.store(0, 1, TT_UPPER, 1.0, (7, 7))
+    assert tt.probe(0) == (1, TT_UPPER, 1.0, (7, 7))
+
+    # 同じバケットに入る別のキー
+    deep, shallow, newer, deeper = (key + i * tt.bucket_count for i in range(1, 5))
+    tt.clear()
+    tt.store(deep, 6, TT_EXACT, 1.0)
+    tt.store(shallow, 2, TT_EXACT, 2.0)
+    assert tt.probe(deep)[0] == 6 and tt.probe(shallow)[0] == 2
+    # 浅い結果は常時上書きスロットを入れ替えるだけで、深い結果は残る
+    tt.store(newer, 1, TT_EXACT, 3.0)
+    assert tt.probe(deep) is not None and tt.probe(shallow) is None and tt.probe(newer) is not None
+    # より深い結果は深さ優先スロットに入る
+    tt.store(deeper, 7, TT_EXACT, 4.0)
+    assert tt.probe(deeper) == (7, TT_EXACT, 4.0, None) and tt.probe(deep) is None
+
+if __name__ == "__main__":
+    test_search_same_with_and_without_tt()
+    test_zobrist_update_matches_full_hash()
+    test_store_probe_and_replacement()
+    print("置換表のテストが全て通りました。")
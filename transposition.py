@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""置換表（トランスポジションテーブル）とZobristハッシュ
+
+探索中に同じ局面へ別の手順でたどり着いた時、前に読んだ結果（深さ・評価値の種類・評価値・最善手）を再利用する。
+メモリ使用量はMB単位で指定し、dict ではなく事前確保した array に格納するのでヒープが断片化しない。
+"""
+
+import random
+from array import array
+
+from constants import *
+
+# Zobristハッシュ用の乱数（再現性のためシードは固定）
+ZOBRIST_SEED = 20240601
+_zobrist_rng = random.Random(ZOBRIST_SEED)
+# ZOBRIST_KEYS[マス番号][石の色] （石の色は PLAYER_BLACK / PLAYER_WHITE、0 は未使用）
+ZOBRIST_KEYS = [[0, _zobrist_rng.getrandbits(64), _zobrist_rng.getrandbits(64)] for _ in range(BOARD_SIZE * BOARD_SIZE)]
+# 白番の時に XOR する値
+ZOBRIST_WHITE_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+def zobrist_hash(board, player):
+    """盤面と手番から64bitのハッシュ値を計算"""
+    h = ZOBRIST_WHITE_TO_MOVE if player == PLAYER_WHITE else 0
+    i = 0
+    for row in board:
+        for cell in row:
+            if cell:
+                h ^= ZOBRIST_KEYS[i][cell]
+            i += 1
+    return h
+
+def zobrist_update(h, row, col, player, flipped_stones):
+    """player が (row, col) に打って flipped_stones を裏返した後のハッシュ値（手番も交代する）"""
+    opponent = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+    h ^= ZOBRIST_KEYS[row * BOARD_SIZE + col][player] ^ ZOBRIST_WHITE_TO_MOVE
+    for fr, fc in flipped_stones:
+        keys = ZOBRIST_KEYS[fr * BOARD_SIZE + fc]
+        h ^= keys[player] ^ keys[opponent]
+    return h
+
+def zobrist_pass(h):
+    """パスした後のハッシュ値（手番だけが交代する）"""
+    return h ^ ZOBRIST_WHITE_TO_MOVE
+
+# 評価値の種類
+TT_EXACT = 0  # 正確な値
+TT_LOWER = 1  # 下限（βカットした）
+TT_UPPER = 2  # 上限（どの手もαを超えなかった）
+
+# 1エントリあたりのバイト数（キー8 + 評価値8 + 深さ1 + 種類1 + 最善手1）
+TT_ENTRY_BYTES = 19
+
+class TranspositionTable:
+    """固定サイズの置換表
+
+    バケットごとに2スロットを持ち、スロット0は深さ優先（より深く読んだ結果を残す）、
+    スロット1は常に上書きする。キーは64bitのハッシュ値をそのまま保存して照合する（0は空きを表す）。
+    """
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        entries = max(2, int(size_mb * 1024 * 1024) // TT_ENTRY_BYTES)
+        self.bucket_count = entries // 2
+        self.capacity = self.bucket_count * 2
+        self.keys = array('Q', bytes(8 * self.capacity))
+        self.scores = array('d', bytes(8 * self.capacity))
+        self.depths = array('b', bytes(self.capacity))
+        self.flags = array('B', bytes(self.capacity))
+        self.moves = array('b', [-1]) * self.capacity
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def clear(self):
+        """全エントリを消去"""
+        for a in (self.keys, self.scores, self.depths, self.flags):
+            a[:] = array(a.typecode, bytes(a.itemsize * self.capacity))
+        self.moves[:] = array('b', [-1]) * self.capacity
+        self.reset_stats()
+
+    def _slot(self, key):
+        return (key % self.bucket_count) * 2
+
+    def probe(self, key):
+        """ハッシュ値 key のエントリを探し (深さ, 種類, 評価値, 最善手) を返す（無ければ None）
+
+        最善手は (行, 列)、記録されていなければ None。
+        """
+        key = key or 1
+        self.probes += 1
+        slot = self._slot(key)
+        keys = self.keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+        self.hits += 1
+        move = self.moves[slot]
+        best_move = divmod(move, BOARD_SIZE) if move >= 0 else None
+        return self.depths[slot], self.flags[slot], self.scores[slot], best_move
+
+    def store(self, key, depth, flag, score, best_move=None):
+        """探索結果を保存（深さ優先スロットに入らなければ常時上書きスロットへ）"""
+        key = key or 1
+        self.stores += 1
+        slot = self._slot(key)
+        keys = self.keys
+        if keys[slot] != key and keys[slot] != 0 and depth < self.depths[slot]:
+            # 深さ優先スロットにはより深い別の局面が入っているので常時上書きスロットへ
+            slot += 1
+        if keys[slot] != key and keys[slot] != 0:
+            self.collisions += 1
+        keys[slot] = key
+        self.depths[slot] = max(-128, min(127, depth))
+        self.flags[slot] = flag
+        self.scores[slot] = score
+        self.moves[slot] = best_move[0] * BOARD_SIZE + best_move[1] if best_move is not None else -1
+
+    def get_usage(self):
+        """使用中のエントリの割合"""
+        return (self.capacity - self.keys.tolist().count(0)) / self.capacity
+
+    def get_stats(self):
+        """チューニング用の統計（ヒット率・衝突率など）"""
+        return {
+            "size_mb": self.size_mb,
+            "capacity": self.capacity,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "collisions": self.collisions,
+            "collision_rate": self.collisions / self.stores if self.stores else 0.0,
+        }
@@ -1,10 +1,6 @@
 import pygame
 from constants import *
 import math
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
 
 def get_japanese_font(size):
     """日本語フォントを取得"""
@@ -49,26 +45,91 @@ def get_emoji_font(size):
     # フォールバック: 通常の日本語フォント
     return get_japanese_font(size)
 
-def draw_board(screen, game_board, game):
-    """盤面を描画"""
+# 静的レイヤー（盤面グリッド・背景グラデーション）のキャッシュ
+# 名前 -> ((幅, 高さ), Surface)。サイズが変わった時だけ作り直す
+_static_surface_cache = {}
+
+def get_cached_surface(name, size, build_func):
+    """静的なサーフェスをキャッシュから取得（サイズ変更時のみ再生成）"""
+    cached = _static_surface_cache.get(name)
+    if cached is not None and cached[0] == size:
+        return cached[1]
+    surface = build_func()
+    _static_surface_cache[name] = (size, surface)
+    return surface
+
+def get_vertical_gradient_surface(width, height, top_color, bottom_color):
+    """縦方向グラデーションのサーフェスを取得（1列だけ描いて横に引き伸ばす）"""
+    def build():
+        column = pygame.Surface((1, height))
+        for y in range(height):
+            ratio = y / height
+            column.set_at((0, y), tuple(int(t + (b - t) * ratio) for t, b in zip(top_color, bottom_color)))
+        return pygame.transform.scale(column, (width, height))
+    return get_cached_surface(("gradient", top_color, bottom_color), (width, height), build)
+
+# 学習進捗パネルの簡易グラフ3段分の高さ（勝率60 + Qテーブル50 + 平均報酬50 + 間隔）
+PROGRESS_GRAPHS_HEIGHT = 200
+
+class HistoryChart:
+    """学習履歴のグラフをオフスクリーンのサーフェスに描いてキャッシュするコンポーネント
+
+    LearningHistory.version が変わった時（記録の追加・読み込み・削除時）だけ
+    render_func(surface, learning_history, x, y, width, height) で描き直し、
+    それ以外のフレームはサーフェスを貼り付けるだけにする。
+    """
+    def __init__(self, render_func, margin=(45, 25, 10, 25)):
+        self.render_func = render_func
+        # 左・上・右・下の余白（軸ラベルやタイトルはグラフ枠の外側に描かれるため）
+        self.margin = margin
+        self.surface = None
+        self.cache_key = None
+
+    def draw(self, screen, learning_history, x, y, width, height):
+        left, top, right, bottom = self.margin
+        cache_key = (id(learning_history), learning_history.version, width, height)
+        if self.surface is None or self.cache_key != cache_key:
+            self.surface = pygame.Surface((left + width + right, top + height + bottom), pygame.SRCALPHA)
+            self.render_func(self.surface, learning_history, left, top, width, height)
+            self.cache_key = cache_key
+        screen.blit(self.surface, (x - left, y - top))
+
+def _build_board_surface():
+    """盤面のマス目（緑の升と黒枠）を描いたサーフェスを作成"""
+    surface = pygame.Surface((BOARD_PIXEL_SIZE, BOARD_PIXEL_SIZE))
     for r in range(BOARD_SIZE):
         for c in range(BOARD_SIZE):
-            x = c * SQUARE_SIZE + BOARD_OFFSET_X
-            y = r * SQUARE_SIZE + BOARD_OFFSET_Y
-            pygame.draw.rect(screen, GREEN, (x, y, SQUARE_SIZE, SQUARE_SIZE))
-            pygame.draw.rect(screen, BLACK, (x, y, SQUARE_SIZE, SQUARE_SIZE), 1)
+            x = c * SQUARE_SIZE
+            y = r * SQUARE_SIZE
+            pygame.draw.rect(surface, GREEN, (x, y, SQUARE_SIZE, SQUARE_SIZE))
+            pygame.draw.rect(surface, BLACK, (x, y, SQUARE_SIZE, SQUARE_SIZE), 1)
+    return surface
 
-            # マウスオーバーしているマスをハイライト
-            if game.highlighted_square == (r, c):
-                pygame.draw.rect(screen, LIGHT_GREEN, (x, y, SQUARE_SIZE, SQUARE_SIZE), 3)
+def draw_board(screen, game_board, game):
+    """盤面を描画"""
+    board_surface = get_cached_surface("board", (BOARD_PIXEL_SIZE, BOARD_PIXEL_SIZE), _build_board_surface)
+    screen.blit(board_surface, (BOARD_OFFSET_X, BOARD_OFFSET_Y))
+
+    # マウスオーバーしているマスをハイライト
+    if game.highlighted_square:
+        r, c = game.highlighted_square
+        x = c * SQUARE_SIZE + BOARD_OFFSET_X
+        y = r * SQUARE_SIZE + BOARD_OFFSET_Y
+        pygame.draw.rect(screen, LIGHT_GREEN, (x, y, SQUARE_SIZE, SQUARE_SIZE), 3)
 
-            # 直前のAIの手を赤枠でハイライト
-            if game.last_ai_move == (r, c):
-                pygame.draw.rect(screen, RED, (x, y, SQUARE_SIZE, SQUARE_SIZE), 4)
+    # 直前のAIの手を赤枠でハイライト
+    if game.last_ai_move:
+        r, c = game.last_ai_move
+        x = c * SQUARE_SIZE + BOARD_OFFSET_X
+        y = r * SQUARE_SIZE + BOARD_OFFSET_Y
+        pygame.draw.rect(screen, RED, (x, y, SQUARE_SIZE, SQUARE_SIZE), 4)
 
-            # 有効な手を薄い点で表示 (人間プレイヤーの番のみ)
-            if (r, c) in game.get_valid_moves(PLAYER_BLACK) and game.current_player == PLAYER_BLACK:
-                 pygame.draw.circle(screen, GREY, (x + SQUARE_SIZE // 2, y + SQUARE_SIZE // 2), 5)
+    # 有効な手を薄い点で表示 (人間プレイヤーの番のみ)
+    if game.current_player == PLAYER_BLACK:
+        for r, c in game.get_valid_moves(PLAYER_BLACK):
+            x = c * SQUARE_SIZE + BOARD_OFFSET_X
+            y = r * SQUARE_SIZE + BOARD_OFFSET_Y
+            pygame.draw.circle(screen, GREY, (x + SQUARE_SIZE // 2, y + SQUARE_SIZE // 2), 5)
 
 def draw_stones(screen, game_board, game):
     """石を描画"""
@@ -103,6 +164,29 @@ def draw_current_player_indicator(screen, current_player):
     text_surface = get_japanese_font(20).render(f"{player_text}の番", True, (0, 0, 0))
     screen.blit(text_surface, (indicator_x + 45, indicator_y + 10))
 
+def draw_ai_thinking_indicator(screen, elapsed_ms, animation_time):
+    """AI思考中の表示（盤面の右側、回転する点と経過時間）"""
+    panel_x = BOARD_OFFSET_X + BOARD_PIXEL_SIZE + 20
+    panel_y = BOARD_OFFSET_Y
+    panel_width = 180
+    panel_height = 40
+    pygame.draw.rect(screen, (240, 240, 240), (panel_x, panel_y, panel_width, panel_height), border_radius=6)
+    pygame.draw.rect(screen, (100, 100, 100), (panel_x, panel_y, panel_width, panel_height), 2, border_radius=6)
+
+    # 回転する点（3秒周期のアニメーションを8分割）
+    center_x = panel_x + 20
+    center_y = panel_y + panel_height // 2
+    active = int(animation_time * 24) % 8
+    for i in range(8):
+        angle = i * math.pi / 4
+        dot_x = center_x + int(math.cos(angle) * 10)
+        dot_y = center_y + int(math.sin(angle) * 10)
+        color = (0, 100, 200) if i == active else (180, 180, 180)
+        pygame.draw.circle(screen, color, (dot_x, dot_y), 3 if i == active else 2)
+
+    text_surface = get_japanese_font(16).render(f"AI思考中... {elapsed_ms / 1000:.1f}秒", True, (0, 0, 0))
+    screen.blit(text_surface, (panel_x + 40, panel_y + (panel_height - text_surface.get_height()) // 2))
+
 def display_error_message(screen, message):
     """エラーメッセージを表示"""
     if not message:
@@ -229,6 +313,23 @@ def draw_progress_bar(screen, current, total, x, y, width, height):
     text_rect = text_surface.get_rect(center=(x + width // 2, y + height // 2))
     screen.blit(text_surface, text_rect)
 
+def draw_qtable_loading_progress(screen, progress, x, y, width, loaded_bytes=0, total_bytes=0):
+    """Qテーブル読み込み中の進捗バーを描画"""
+    label_font = get_japanese_font(14)
+    label = f"Qテーブル読み込み中... {progress * 100:.0f}%"
+    if total_bytes > 0:
+        label += f" ({loaded_bytes / 1048576:.1f}/{total_bytes / 1048576:.1f}MB)"
+    label_surf = label_font.render(label, True, (60, 60, 60))
+    screen.blit(label_surf, (x, y))
+
+    bar_y = y + label_surf.get_height() + 4
+    bar_height = 10
+    pygame.draw.rect(screen, (220, 220, 220), (x, bar_y, width, bar_height), border_radius=4)
+    fill_width = int(width * progress)
+    if fill_width > 0:
+        pygame.draw.rect(screen, (100, 150, 255), (x, bar_y, fill_width, bar_height), border_radius=4)
+    pygame.draw.rect(screen, (100, 100, 100), (x, bar_y, width, bar_height), 1, border_radius=4)
+
 def draw_learn_count(screen, font, ai_learn_count):
     """AI学習回数を表示（左側に配置）"""
     text = font.render(f"AI学習回数: {ai_learn_count}", True, (0,0,0))
@@ -379,178 +480,187 @@ def draw_learning_graphs(screen, learning_history, game_count, ai_learn_count, a
     # グラフエリアの開始位置を調整（より下に）
     graph_start_y = y_offset + 10
     
-    # 簡易グラフ（勝率の推移）
+    # 簡易グラフ（勝率の推移など）は履歴が増えた時だけ再描画される
     if len(learning_history.history) > 1:
-        win_rates = learning_history.get_win_rate_history()
+        _progress_chart.draw(screen, learning_history, graph_x + 10, graph_start_y, graph_area_width - 20, PROGRESS_GRAPHS_HEIGHT)
+
+    return btn_rect
+
+def _render_progress_graphs(screen, learning_history, left, top, width, height):
+    """学習進捗パネルの簡易グラフ（勝率・Qテーブル・平均報酬）を描画"""
+    graph_start_y = top
+    
+    # 簡易グラフ（勝率の推移）
+    win_rates = learning_history.get_win_rate_history()
+    if len(win_rates) > 1:
+        graph_width = width
+        graph_height = 60  # 高さを小さく
+        graph_x_inner = left
+        graph_y_inner = graph_start_y
+        
+        # グラフ背景
+        pygame.draw.rect(screen, (255, 255, 255), (graph_x_inner, graph_y_inner, graph_width, graph_height))
+        pygame.draw.rect(screen, (100, 100, 100), (graph_x_inner, graph_y_inner, graph_width, graph_height), 1)
+        
+        # グリッド線を描画
+        grid_font = get_japanese_font(7)  # フォントサイズを小さく
+        for i in range(5):
+            # 水平グリッド線
+            y_pos = graph_y_inner + (i * graph_height // 4)
+            pygame.draw.line(screen, (220, 220, 220), (graph_x_inner, y_pos), (graph_x_inner + graph_width, y_pos), 1)
+            
+            # Y軸ラベル（勝率）
+            label_value = 100 - (i * 25)
+            label_text = grid_font.render(f"{label_value}%", True, (100, 100, 100))
+            screen.blit(label_text, (graph_x_inner - 20, y_pos - 4))  # 位置を調整
+        
+        # 勝率グラフ
+        if len(win_rates) > 1:
+            points = []
+            for i, rate in enumerate(win_rates):
+                x = graph_x_inner + (i / (len(win_rates) - 1)) * graph_width
+                y = graph_y_inner + graph_height - (rate / 100) * graph_height
+                points.append((x, y))
+            
+            if len(points) > 1:
+                # 太い線で折れ線グラフを描画
+                pygame.draw.lines(screen, (0, 100, 200), False, points, 2)  # 線を細く
+                
+                # 各データポイントを小さな円で表示
+                for point in points:
+                    pygame.draw.circle(screen, (0, 100, 200), (int(point[0]), int(point[1])), 1)  # 円を小さく
+                
+                # 最新の点を強調
+                if points:
+                    pygame.draw.circle(screen, (255, 0, 0), (int(points[-1][0]), int(points[-1][1])), 3)  # 円を小さく
+                    pygame.draw.circle(screen, (255, 255, 255), (int(points[-1][0]), int(points[-1][1])), 1)
+        
+        # グラフラベル
+        label_font = get_japanese_font(9)  # フォントサイズを小さく
+        label_text = label_font.render("勝率推移", True, (0, 0, 0))
+        screen.blit(label_text, (graph_x_inner, graph_y_inner - 12))
+        
+        # X軸ラベル（ゲーム数）
         if len(win_rates) > 1:
-            graph_width = graph_area_width - 20
-            graph_height = 60  # 高さを小さく
-            graph_x_inner = graph_x + 10
-            graph_y_inner = graph_start_y
+            x_label_text = grid_font.render(f"ゲーム数: {len(win_rates)}", True, (100, 100, 100))
+            screen.blit(x_label_text, (graph_x_inner, graph_y_inner + graph_height + 3))
+        
+        graph_start_y += graph_height + 20
+        
+        # Qテーブル成長グラフを追加
+        qtable_sizes = learning_history.get_qtable_size_history()
+        if len(qtable_sizes) > 1:
+            q_graph_width = width
+            q_graph_height = 50  # 高さを小さく
+            q_graph_x_inner = left
+            q_graph_y_inner = graph_start_y
             
             # グラフ背景
-            pygame.draw.rect(screen, (255, 255, 255), (graph_x_inner, graph_y_inner, graph_width, graph_height))
-            pygame.draw.rect(screen, (100, 100, 100), (graph_x_inner, graph_y_inner, graph_width, graph_height), 1)
+            pygame.draw.rect(screen, (255, 255, 255), (q_graph_x_inner, q_graph_y_inner, q_graph_width, q_graph_height))
+            pygame.draw.rect(screen, (100, 100, 100), (q_graph_x_inner, q_graph_y_inner, q_graph_width, q_graph_height), 1)
+            
+            # Qテーブルサイズグラフ
+            points = []
+            max_size = max(qtable_sizes) if qtable_sizes else 1
+            for i, size in enumerate(qtable_sizes):
+                x = q_graph_x_inner + (i / (len(qtable_sizes) - 1)) * q_graph_width
+                y = q_graph_y_inner + q_graph_height - (size / max_size) * q_graph_height
+                points.append((x, y))
             
             # グリッド線を描画
-            grid_font = get_japanese_font(7)  # フォントサイズを小さく
             for i in range(5):
                 # 水平グリッド線
-                y_pos = graph_y_inner + (i * graph_height // 4)
-                pygame.draw.line(screen, (220, 220, 220), (graph_x_inner, y_pos), (graph_x_inner + graph_width, y_pos), 1)
+                y_pos = q_graph_y_inner + (i * q_graph_height // 4)
+                pygame.draw.line(screen, (220, 220, 220), (q_graph_x_inner, y_pos), (q_graph_x_inner + q_graph_width, y_pos), 1)
                 
-                # Y軸ラベル（勝率）
-                label_value = 100 - (i * 25)
-                label_text = grid_font.render(f"{label_value}%", True, (100, 100, 100))
-                screen.blit(label_text, (graph_x_inner - 20, y_pos - 4))  # 位置を調整
+                # Y軸ラベル（Qテーブルサイズ）
+                label_value = max_size - (i * max_size // 4)
+                label_text = grid_font.render(f"{label_value:,}", True, (100, 100, 100))
+                screen.blit(label_text, (q_graph_x_inner - 25, y_pos - 4))  # 位置を調整
             
-            # 勝率グラフ
-            if len(win_rates) > 1:
-                points = []
-                for i, rate in enumerate(win_rates):
-                    x = graph_x_inner + (i / (len(win_rates) - 1)) * graph_width
-                    y = graph_y_inner + graph_height - (rate / 100) * graph_height
-                    points.append((x, y))
+            if len(points) > 1:
+                # 太い線で折れ線グラフを描画
+                pygame.draw.lines(screen, (100, 200, 100), False, points, 2)  # 緑色で線を細く
                 
-                if len(points) > 1:
-                    # 太い線で折れ線グラフを描画
-                    pygame.draw.lines(screen, (0, 100, 200), False, points, 2)  # 線を細く
-                    
-                    # 各データポイントを小さな円で表示
-                    for point in points:
-                        pygame.draw.circle(screen, (0, 100, 200), (int(point[0]), int(point[1])), 1)  # 円を小さく
-                    
-                    # 最新の点を強調
-                    if points:
-                        pygame.draw.circle(screen, (255, 0, 0), (int(points[-1][0]), int(points[-1][1])), 3)  # 円を小さく
-                        pygame.draw.circle(screen, (255, 255, 255), (int(points[-1][0]), int(points[-1][1])), 1)
+                # 各データポイントを小さな円で表示
+                for point in points:
+                    pygame.draw.circle(screen, (100, 200, 100), (int(point[0]), int(point[1])), 1)  # 円を小さく
+                
+                # 最新の点を強調
+                if points:
+                    pygame.draw.circle(screen, (255, 0, 0), (int(points[-1][0]), int(points[-1][1])), 3)  # 円を小さく
+                    pygame.draw.circle(screen, (255, 255, 255), (int(points[-1][0]), int(points[-1][1])), 1)
             
             # グラフラベル
             label_font = get_japanese_font(9)  # フォントサイズを小さく
-            label_text = label_font.render("勝率推移", True, (0, 0, 0))
-            screen.blit(label_text, (graph_x_inner, graph_y_inner - 12))
+            label_text = label_font.render("Qテーブル成長", True, (0, 0, 0))
+            screen.blit(label_text, (q_graph_x_inner, q_graph_y_inner - 12))
             
             # X軸ラベル（ゲーム数）
-            if len(win_rates) > 1:
-                x_label_text = grid_font.render(f"ゲーム数: {len(win_rates)}", True, (100, 100, 100))
-                screen.blit(x_label_text, (graph_x_inner, graph_y_inner + graph_height + 3))
+            if len(qtable_sizes) > 1:
+                x_label_text = grid_font.render(f"ゲーム数: {len(qtable_sizes)}", True, (100, 100, 100))
+                screen.blit(x_label_text, (q_graph_x_inner, q_graph_y_inner + q_graph_height + 3))
             
-            graph_start_y += graph_height + 20
+            graph_start_y += q_graph_height + 20
             
-            # Qテーブル成長グラフを追加
-            qtable_sizes = learning_history.get_qtable_size_history()
-            if len(qtable_sizes) > 1:
-                q_graph_width = graph_area_width - 20
-                q_graph_height = 50  # 高さを小さく
-                q_graph_x_inner = graph_x + 10
-                q_graph_y_inner = graph_start_y
+            # 平均報酬グラフを追加
+            avg_rewards = learning_history.get_avg_reward_history()
+            if len(avg_rewards) > 1:
+                r_graph_width = width
+                r_graph_height = 50  # 高さを小さく
+                r_graph_x_inner = left
+                r_graph_y_inner = graph_start_y
                 
                 # グラフ背景
-                pygame.draw.rect(screen, (255, 255, 255), (q_graph_x_inner, q_graph_y_inner, q_graph_width, q_graph_height))
-                pygame.draw.rect(screen, (100, 100, 100), (q_graph_x_inner, q_graph_y_inner, q_graph_width, q_graph_height), 1)
+                pygame.draw.rect(screen, (255, 255, 255), (r_graph_x_inner, r_graph_y_inner, r_graph_width, r_graph_height))
+                pygame.draw.rect(screen, (100, 100, 100), (r_graph_x_inner, r_graph_y_inner, r_graph_width, r_graph_height), 1)
+                
+                # 平均報酬グラフ
+                r_points = []
+                max_reward = max(avg_rewards) if avg_rewards else 1
+                min_reward = min(avg_rewards) if avg_rewards else 0
+                reward_range = max_reward - min_reward if max_reward != min_reward else 1
                 
-                # Qテーブルサイズグラフ
-                points = []
-                max_size = max(qtable_sizes) if qtable_sizes else 1
-                for i, size in enumerate(qtable_sizes):
-                    x = q_graph_x_inner + (i / (len(qtable_sizes) - 1)) * q_graph_width
-                    y = q_graph_y_inner + q_graph_height - (size / max_size) * q_graph_height
-                    points.append((x, y))
+                for i, reward in enumerate(avg_rewards):
+                    x = r_graph_x_inner + (i / (len(avg_rewards) - 1)) * r_graph_width
+                    y = r_graph_y_inner + r_graph_height - ((reward - min_reward) / reward_range) * r_graph_height
+                    r_points.append((x, y))
                 
                 # グリッド線を描画
                 for i in range(5):
                     # 水平グリッド線
-                    y_pos = q_graph_y_inner + (i * q_graph_height // 4)
-                    pygame.draw.line(screen, (220, 220, 220), (q_graph_x_inner, y_pos), (q_graph_x_inner + q_graph_width, y_pos), 1)
+                    y_pos = r_graph_y_inner + (i * r_graph_height // 4)
+                    pygame.draw.line(screen, (220, 220, 220), (r_graph_x_inner, y_pos), (r_graph_x_inner + r_graph_width, y_pos), 1)
                     
-                    # Y軸ラベル（Qテーブルサイズ）
-                    label_value = max_size - (i * max_size // 4)
-                    label_text = grid_font.render(f"{label_value:,}", True, (100, 100, 100))
-                    screen.blit(label_text, (q_graph_x_inner - 25, y_pos - 4))  # 位置を調整
+                    # Y軸ラベル（平均報酬）
+                    label_value = max_reward - (i * reward_range // 4)
+                    label_text = grid_font.render(f"{label_value:.1f}", True, (100, 100, 100))
+                    screen.blit(label_text, (r_graph_x_inner - 20, y_pos - 4))
                 
-                if len(points) > 1:
+                if len(r_points) > 1:
                     # 太い線で折れ線グラフを描画
-                    pygame.draw.lines(screen, (100, 200, 100), False, points, 2)  # 緑色で線を細く
+                    pygame.draw.lines(screen, (200, 100, 100), False, r_points, 2)  # 赤色で線を細く
                     
                     # 各データポイントを小さな円で表示
-                    for point in points:
-                        pygame.draw.circle(screen, (100, 200, 100), (int(point[0]), int(point[1])), 1)  # 円を小さく
+                    for point in r_points:
+                        pygame.draw.circle(screen, (200, 100, 100), (int(point[0]), int(point[1])), 1)  # 円を小さく
                     
                     # 最新の点を強調
-                    if points:
-                        pygame.draw.circle(screen, (255, 0, 0), (int(points[-1][0]), int(points[-1][1])), 3)  # 円を小さく
-                        pygame.draw.circle(screen, (255, 255, 255), (int(points[-1][0]), int(points[-1][1])), 1)
-                
+                    if r_points:
+                        pygame.draw.circle(screen, (255, 0, 0), (int(r_points[-1][0]), int(r_points[-1][1])), 3)  # 円を小さく
+                        pygame.draw.circle(screen, (255, 255, 255), (int(r_points[-1][0]), int(r_points[-1][1])), 1)
+                    
                 # グラフラベル
                 label_font = get_japanese_font(9)  # フォントサイズを小さく
-                label_text = label_font.render("Qテーブル成長", True, (0, 0, 0))
-                screen.blit(label_text, (q_graph_x_inner, q_graph_y_inner - 12))
+                label_text = label_font.render("平均報酬推移", True, (0, 0, 0))
+                screen.blit(label_text, (r_graph_x_inner, r_graph_y_inner - 12))
                 
                 # X軸ラベル（ゲーム数）
-                if len(qtable_sizes) > 1:
-                    x_label_text = grid_font.render(f"ゲーム数: {len(qtable_sizes)}", True, (100, 100, 100))
-                    screen.blit(x_label_text, (q_graph_x_inner, q_graph_y_inner + q_graph_height + 3))
-                
-                graph_start_y += q_graph_height + 20
-                
-                # 平均報酬グラフを追加
-                avg_rewards = learning_history.get_avg_reward_history()
                 if len(avg_rewards) > 1:
-                    r_graph_width = graph_area_width - 20
-                    r_graph_height = 50  # 高さを小さく
-                    r_graph_x_inner = graph_x + 10
-                    r_graph_y_inner = graph_start_y
-                    
-                    # グラフ背景
-                    pygame.draw.rect(screen, (255, 255, 255), (r_graph_x_inner, r_graph_y_inner, r_graph_width, r_graph_height))
-                    pygame.draw.rect(screen, (100, 100, 100), (r_graph_x_inner, r_graph_y_inner, r_graph_width, r_graph_height), 1)
-                    
-                    # 平均報酬グラフ
-                    r_points = []
-                    max_reward = max(avg_rewards) if avg_rewards else 1
-                    min_reward = min(avg_rewards) if avg_rewards else 0
-                    reward_range = max_reward - min_reward if max_reward != min_reward else 1
-                    
-                    for i, reward in enumerate(avg_rewards):
-                        x = r_graph_x_inner + (i / (len(avg_rewards) - 1)) * r_graph_width
-                        y = r_graph_y_inner + r_graph_height - ((reward - min_reward) / reward_range) * r_graph_height
-                        r_points.append((x, y))
-                    
-                    # グリッド線を描画
-                    for i in range(5):
-                        # 水平グリッド線
-                        y_pos = r_graph_y_inner + (i * r_graph_height // 4)
-                        pygame.draw.line(screen, (220, 220, 220), (r_graph_x_inner, y_pos), (r_graph_x_inner + r_graph_width, y_pos), 1)
-                        
-                        # Y軸ラベル（平均報酬）
-                        label_value = max_reward - (i * reward_range // 4)
-                        label_text = grid_font.render(f"{label_value:.1f}", True, (100, 100, 100))
-                        screen.blit(label_text, (r_graph_x_inner - 20, y_pos - 4))
-                    
-                    if len(r_points) > 1:
-                        # 太い線で折れ線グラフを描画
-                        pygame.draw.lines(screen, (200, 100, 100), False, r_points, 2)  # 赤色で線を細く
-                        
-                        # 各データポイントを小さな円で表示
-                        for point in r_points:
-                            pygame.draw.circle(screen, (200, 100, 100), (int(point[0]), int(point[1])), 1)  # 円を小さく
-                        
-                        # 最新の点を強調
-                        if r_points:
-                            pygame.draw.circle(screen, (255, 0, 0), (int(r_points[-1][0]), int(r_points[-1][1])), 3)  # 円を小さく
-                            pygame.draw.circle(screen, (255, 255, 255), (int(r_points[-1][0]), int(r_points[-1][1])), 1)
-                        
-                    # グラフラベル
-                    label_font = get_japanese_font(9)  # フォントサイズを小さく
-                    label_text = label_font.render("平均報酬推移", True, (0, 0, 0))
-                    screen.blit(label_text, (r_graph_x_inner, r_graph_y_inner - 12))
-                    
-                    # X軸ラベル（ゲーム数）
-                    if len(avg_rewards) > 1:
-                        x_label_text = grid_font.render(f"ゲーム数: {len(avg_rewards)}", True, (100, 100, 100))
-                        screen.blit(x_label_text, (r_graph_x_inner, r_graph_y_inner + r_graph_height + 3))
+                    x_label_text = grid_font.render(f"ゲーム数: {len(avg_rewards)}", True, (100, 100, 100))
+                    screen.blit(x_label_text, (r_graph_x_inner, r_graph_y_inner + r_graph_height + 3))
 
-    return btn_rect
+_progress_chart = HistoryChart(_render_progress_graphs)
 
 def draw_battle_history_list(screen, learning_history, font):
     # 対戦履歴リストを表示
@@ -653,33 +763,42 @@ def draw_enhanced_button(screen, x, y, width, height, text, icon, description, c
     
     return is_hover and mouse_down
 
-def draw_gradient_background(screen, animation_time):
-    """オセロ盤面の背景を描画"""
+def _build_mode_select_background(width, height):
+    """モード選択画面の背景（緑の盤面とグリッド線）を描いたサーフェスを作成"""
+    surface = pygame.Surface((width, height))
     # オセロ盤の基本色（緑）
     board_color = (0, 128, 0)
-    screen.fill(board_color)
+    surface.fill(board_color)
     
     # 盤面のグリッド線（中央に配置）
     grid_color = (0, 100, 0)
     grid_width = 3
     
     # 盤面の中央位置を計算
-    board_center_x = WINDOW_WIDTH // 2
-    board_center_y = WINDOW_HEIGHT // 2
+    board_center_x = width // 2
+    board_center_y = height // 2
     board_start_x = board_center_x - BOARD_PIXEL_SIZE // 2
     board_start_y = board_center_y - BOARD_PIXEL_SIZE // 2
     
     # 縦線
     for i in range(BOARD_SIZE + 1):
         x = board_start_x + i * SQUARE_SIZE
-        pygame.draw.line(screen, grid_color, (x, board_start_y), 
+        pygame.draw.line(surface, grid_color, (x, board_start_y), 
                         (x, board_start_y + BOARD_PIXEL_SIZE), grid_width)
     
     # 横線
     for i in range(BOARD_SIZE + 1):
         y = board_start_y + i * SQUARE_SIZE
-        pygame.draw.line(screen, grid_color, (board_start_x, y), 
+        pygame.draw.line(surface, grid_color, (board_start_x, y), 
                         (board_start_x + BOARD_PIXEL_SIZE, y), grid_width)
+    return surface
+
+def draw_gradient_background(screen, animation_time):
+    """オセロ盤面の背景を描画"""
+    size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+    background = get_cached_surface("mode_select_background", size,
+                                    lambda: _build_mode_select_background(*size))
+    screen.blit(background, (0, 0))
 
 def draw_decorative_elements(screen, animation_time):
     """装飾要素を描画"""
@@ -720,12 +839,7 @@ def draw_learning_data_screen(screen, font, learning_history, qtable, ai_learn_c
     
     """学習データ管理画面を描画 + AI詳細統計・グラフ（大幅改善版）"""
     # グラデーション背景
-    for y in range(WINDOW_HEIGHT):
-        color_ratio = y / WINDOW_HEIGHT
-        r = int(240 + (255 - 240) * color_ratio)
-        g = int(245 + (255 - 245) * color_ratio)
-        b = int(250 + (255 - 250) * color_ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+    screen.blit(get_vertical_gradient_surface(WINDOW_WIDTH, WINDOW_HEIGHT, (240, 245, 250), (255, 255, 255)), (0, 0))
     
     # タイトル（装飾付き）
     title_bg = pygame.Surface((WINDOW_WIDTH, 80))
@@ -1091,7 +1205,7 @@ def draw_enhanced_learning_graphs(screen, learning_history, game_count, ai_learn
         screen.blit(no_data_text, (inner_x + 50, inner_y + inner_height // 2 - 20))
         screen.blit(no_data_text2, (inner_x + 20, inner_y + inner_height // 2 + 10))
 
-def draw_win_rate_graph(screen, learning_history, x, y, width, height):
+def _render_win_rate_graph(screen, learning_history, x, y, width, height):
     """勝率推移グラフを描画"""
     # タイトル
     title_font = get_japanese_font(14)
@@ -1130,7 +1244,13 @@ def draw_win_rate_graph(screen, learning_history, x, y, width, height):
             for point in points:
                 pygame.draw.circle(screen, (0, 100, 200), (int(point[0]), int(point[1])), 3)
 
-def draw_reward_graph(screen, learning_history, x, y, width, height):
+_win_rate_chart = HistoryChart(_render_win_rate_graph)
+
+def draw_win_rate_graph(screen, learning_history, x, y, width, height):
+    """勝率推移グラフを描画"""
+    _win_rate_chart.draw(screen, learning_history, x, y, width, height)
+
+def _render_reward_graph(screen, learning_history, x, y, width, height):
     """平均報酬推移グラフを描画"""
     # タイトル
     title_font = get_japanese_font(14)
@@ -1184,7 +1304,13 @@ def draw_reward_graph(screen, learning_history, x, y, width, height):
             x_label_text = label_font.render(f"ゲーム数: {len(avg_rewards)}", True, (100, 100, 100))
             screen.blit(x_label_text, (x, y + height + 5))
 
-def draw_qtable_growth_graph(screen, learning_history, x, y, width, height):
+_reward_chart = HistoryChart(_render_reward_graph)
+
+def draw_reward_graph(screen, learning_history, x, y, width, height):
+    """平均報酬推移グラフを描画"""
+    _reward_chart.draw(screen, learning_history, x, y, width, height)
+
+def _render_qtable_growth_graph(screen, learning_history, x, y, width, height):
     """Qテーブル成長グラフを描画"""
     # グラフ背景
     pygame.draw.rect(screen, (250, 250, 250), (x, y, width, height))
@@ -1237,6 +1363,12 @@ def draw_qtable_growth_graph(screen, learning_history, x, y, width, height):
         x_label_text = x_label_font.render(f"ゲーム数: {len(qtable_sizes)}", True, (100, 100, 100))
         screen.blit(x_label_text, (x, y + height + 5))
 
+_qtable_growth_chart = HistoryChart(_render_qtable_growth_graph)
+
+def draw_qtable_growth_graph(screen, learning_history, x, y, width, height):
+    """Qテーブル成長グラフを描画"""
+    _qtable_growth_chart.draw(screen, learning_history, x, y, width, height)
+
 def draw_battle_history_screen(screen, font):
     """対戦記録画面を描画（大幅改善版）"""
     # mainモジュールをインポートしてlearning_historyを取得
@@ -1244,12 +1376,7 @@ def draw_battle_history_screen(screen, font):
     learning_history = main.learning_history
     
     # グラデーション背景
-    for y in range(WINDOW_HEIGHT):
-        color_ratio = y / WINDOW_HEIGHT
-        r = int(230 + (255 - 230) * color_ratio)
-        g = int(240 + (255 - 240) * color_ratio)
-        b = int(255 + (255 - 255) * color_ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+    screen.blit(get_vertical_gradient_surface(WINDOW_WIDTH, WINDOW_HEIGHT, (230, 240, 255), (255, 255, 255)), (0, 0))
     
     # タイトル（装飾付き）
     title_bg = pygame.Surface((WINDOW_WIDTH, 80))
@@ -1552,6 +1679,18 @@ def draw_move_count(screen, font, move_count, last_move_count):
         return move_count
     return last_move_count
 
+def draw_instrumentation_overlay(screen, lines):
+    """デバッグモードでフェーズ別の時間（instrumentation.format_summary() の行）を盤面の下に重ねて表示"""
+    if not lines:
+        return
+    small_font = get_japanese_font(12)
+    line_h = 15
+    panel = pygame.Surface((BOARD_PIXEL_SIZE, line_h * len(lines) + 8), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 170))
+    for i, line in enumerate(lines):
+        panel.blit(small_font.render(line, True, (255, 255, 255)), (6, 4 + i * line_h))
+    screen.blit(panel, (BOARD_OFFSET_X, BOARD_OFFSET_Y + BOARD_PIXEL_SIZE - panel.get_height()))
+
 def draw_ai_stats(screen, font, ai_win_count, ai_lose_count, ai_draw_count, ai_avg_reward):
     """AI統計情報を描画（改善版）"""
     # 統計パネルの背景